@@ -0,0 +1,95 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Dict, List
+
+from loguru import logger
+
+from config import config
+from interfaces.iPathProcessor import IPathProcessor
+from models.path import PathModel
+
+_compute_processors: List[IPathProcessor] = []  # The CPU-bound processors, in each worker process of the pool
+
+
+def _init_compute_worker(processors: List[IPathProcessor]):
+    global _compute_processors
+    _compute_processors = processors
+
+
+def _compute(processor_index: int, payload: dict) -> dict:
+    return _compute_processors[processor_index].compute(payload)
+
+
+class ComputePool:
+    """
+    Runs the `compute` of the `cpu_bound` processors in worker processes, out of the GIL.
+    The processors are sent once to each process when it starts; then only the payloads and results of the paths are
+    exchanged (see `IPathProcessor.build_payload`).
+    The processes are spawned (not forked): the consumers are multithreaded, and locks could be copied while held.
+    """
+
+    def __init__(self, processors: List[IPathProcessor], nb_processes: int = None) -> None:
+        """
+        :param processors: the processors to run in the pool: the ones not `cpu_bound` are ignored
+        :param nb_processes: the number of worker processes (defaults to `CONSUMER_PROCESSES_COUNT`, or the number of
+        cores)
+        """
+        super().__init__()
+        self.processors: List[IPathProcessor] = [p for p in processors if p.cpu_bound]
+        self._indexes: Dict[int, int] = {id(p): i for i, p in enumerate(self.processors)}
+        self.nb_processes: int = nb_processes if nb_processes else config.CONSUMER_PROCESSES_COUNT or os.cpu_count()
+        self._executor: ProcessPoolExecutor = None
+
+    def __bool__(self) -> bool:
+        return len(self.processors) > 0
+
+    def start(self):
+        if not self.processors or self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(max_workers=self.nb_processes,
+                                             mp_context=multiprocessing.get_context('spawn'),
+                                             initializer=_init_compute_worker, initargs=(self.processors,))
+        logger.info(f"Running {[p.__class__.__name__ for p in self.processors]} in {self.nb_processes} processes")
+
+    def runs(self, processor: IPathProcessor) -> bool:
+        """
+        :return: whether the processor is to be computed in the pool
+        """
+        return self._executor is not None and id(processor) in self._indexes
+
+    def submit(self, processor: IPathProcessor, path_model: PathModel) -> Future:
+        """
+        :return: the future result of `processor.compute`, to be merged with `processor.apply_result`
+        """
+        return self._executor.submit(_compute, self._indexes[id(processor)], processor.build_payload(path_model))
+
+    def process(self, processor: IPathProcessor, path_model: PathModel):
+        """
+        Compute the path in the pool, wait for the result and merge it into the path model.
+        """
+        processor.apply_result(path_model=path_model, result=self.submit(processor, path_model).result())
+
+    def process_batch(self, processor: IPathProcessor, path_models: List[PathModel]) -> Dict[str, str]:
+        """
+        Compute all the given paths at once in the pool, then merge the results into their models.
+        :return: the errors raised while processing the files, as <full_path, error message>
+        """
+        errors: Dict[str, str] = {}
+        futures = [(path_model, self.submit(processor, path_model)) for path_model in path_models]
+        for path_model, future in futures:
+            try:
+                processor.apply_result(path_model=path_model, result=future.result())
+            except Exception as ex:
+                errors[path_model.full_path] = str(ex)
+                logger.error(f"Unable to process {path_model.path_type} '{path_model.full_path}' "
+                             f"({processor.__class__.__name__}): {ex}")
+        return errors
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,158 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+import threading
+import time
+from collections import deque
+from typing import Deque, Tuple
+
+from loguru import logger
+
+from config import config
+
+
+class ConcurrencyController:
+    """
+    Limits the number of tasks running concurrently, and adapts the limit to the throughput (AIMD):
+    the throughput (items/s) and the latency of the tasks are measured over windows of `sample_interval` seconds, then
+     - the limit is increased by `increase_step` while it increases the throughput,
+     - the limit is multiplied by `decrease_factor` when the throughput drops, or when the latency grows without any
+       gain of throughput (the storage is saturated: more tasks only wait longer),
+     - the limit is kept when the tasks do not even reach it (the workers are waiting for the producer).
+    The limit giving the best throughput is reported (see `to_stats`), so that it can be pinned for known hardware
+    (`CONCURRENCY_ADAPTIVE=False` and the number of workers of the consumer or of the stage).
+    """
+
+    def __init__(self, name: str, initial_limit: int, min_limit: int = None, max_limit: int = None,
+                 adaptive: bool = None, sample_interval: float = None, increase_step: int = None,
+                 decrease_factor: float = None, tolerance: float = None) -> None:
+        """
+        :param name: the name of the controlled workers, for the logs
+        :param initial_limit: the number of concurrent tasks to start with (the fixed limit when not adaptive)
+        :param min_limit: the floor of the limit (defaults to `CONCURRENCY_MIN_WORKERS`)
+        :param max_limit: the ceiling of the limit (defaults to `CONCURRENCY_MAX_WORKERS`)
+        :param adaptive: whether the limit is adapted to the throughput (defaults to `CONCURRENCY_ADAPTIVE`)
+        :param sample_interval: the seconds between two adjustments (defaults to `CONCURRENCY_SAMPLE_INTERVAL`)
+        :param increase_step: the additive increase of the limit (defaults to `CONCURRENCY_INCREASE_STEP`)
+        :param decrease_factor: the multiplicative decrease of the limit (defaults to `CONCURRENCY_DECREASE_FACTOR`)
+        :param tolerance: the relative change of throughput or latency considered as noise (defaults to
+        `CONCURRENCY_TOLERANCE`)
+        """
+        super().__init__()
+        self.name: str = name
+        self.adaptive: bool = config.CONCURRENCY_ADAPTIVE if adaptive is None else adaptive
+        self.min_limit: int = max(1, min_limit if min_limit else config.CONCURRENCY_MIN_WORKERS)
+        self.max_limit: int = max(self.min_limit, max_limit if max_limit else config.CONCURRENCY_MAX_WORKERS)
+        if not self.adaptive:
+            self.min_limit = self.max_limit = max(1, initial_limit)
+        self._limit: int = min(self.max_limit, max(self.min_limit, initial_limit))
+        self.sample_interval: float = sample_interval if sample_interval else config.CONCURRENCY_SAMPLE_INTERVAL
+        self.increase_step: int = max(1, increase_step if increase_step else config.CONCURRENCY_INCREASE_STEP)
+        self.decrease_factor: float = decrease_factor if decrease_factor else config.CONCURRENCY_DECREASE_FACTOR
+        self.tolerance: float = config.CONCURRENCY_TOLERANCE if tolerance is None else tolerance
+        self._condition = threading.Condition()
+        self.nb_running: int = 0
+        self.nb_completed_items: int = 0
+        self.completed_bytes: int = 0
+        # Current window
+        self._window_start: float = time.perf_counter()
+        self._window_items: int = 0
+        self._window_bytes: int = 0
+        self._window_tasks: int = 0
+        self._window_latency: float = 0.0
+        self._window_max_running: int = 0
+        # Previous window, and the best one
+        self._last_throughput: float = None
+        self._last_latency: float = None
+        self._last_limit: int = self._limit
+        self.best_limit: int = self._limit
+        self.best_throughput: float = 0.0
+        self.best_bytes_rate: float = 0.0
+        self.adjustments: Deque[Tuple[int, int, float]] = deque(maxlen=32)  # <from, to, throughput>
+
+    @property
+    def limit(self) -> int:
+        return self._limit
+
+    def acquire(self) -> float:
+        """
+        Wait for the number of running tasks to be below the limit, and count the calling task as running.
+        :return: the start time of the task, to be given back to `release`
+        """
+        with self._condition:
+            while self.nb_running >= self._limit:
+                self._condition.wait()
+            self.nb_running += 1
+            if self.nb_running > self._window_max_running:
+                self._window_max_running = self.nb_running
+        return time.perf_counter()
+
+    def release(self, start: float, nb_items: int = 1, nb_bytes: int = 0):
+        """
+        Count the task as completed, and adapt the limit at the end of the sampling window.
+        :param start: the start time returned by `acquire`
+        :param nb_items: the number of paths processed by the task
+        :param nb_bytes: the size of the paths processed by the task
+        """
+        now = time.perf_counter()
+        with self._condition:
+            self.nb_running -= 1
+            self.nb_completed_items += nb_items
+            self.completed_bytes += nb_bytes
+            self._window_items += nb_items
+            self._window_bytes += nb_bytes
+            self._window_tasks += 1
+            self._window_latency += now - start
+            if now - self._window_start >= self.sample_interval:
+                self._end_window(now)
+            self._condition.notify()
+
+    def _end_window(self, now: float):
+        elapsed = now - self._window_start
+        throughput = self._window_items / elapsed
+        bytes_rate = self._window_bytes / elapsed
+        latency = self._window_latency / self._window_tasks
+        saturated = self._window_max_running >= self._limit
+        if throughput > self.best_throughput:
+            self.best_throughput, self.best_bytes_rate, self.best_limit = throughput, bytes_rate, self._limit
+        if self.adaptive and saturated:
+            if self._last_throughput is None or self._limit < self._last_limit:
+                limit = self._limit + self.increase_step  # Nothing to compare with: a lower limit is slower anyway
+            elif throughput < self._last_throughput * (1 - self.tolerance) \
+                    or (latency > self._last_latency * (1 + self.tolerance)
+                        and throughput <= self._last_throughput * (1 + self.tolerance)):
+                limit = int(self._limit * self.decrease_factor)
+            else:
+                limit = self._limit + self.increase_step  # Better, or the same: probe further
+            self._last_limit = self._limit
+            self._set_limit(limit, throughput)
+        self._last_throughput, self._last_latency = throughput, latency
+        self._window_start = now
+        self._window_items = self._window_bytes = self._window_tasks = 0
+        self._window_latency = 0.0
+        self._window_max_running = self.nb_running
+
+    def _set_limit(self, limit: int, throughput: float):
+        limit = min(self.max_limit, max(self.min_limit, limit))
+        if limit == self._limit:
+            return
+        logger.debug(f"{self.name}: concurrency {self._limit} -> {limit} ({throughput:.1f} items/s)")
+        self.adjustments.append((self._limit, limit, round(throughput, 1)))
+        if limit > self._limit:
+            self._condition.notify(limit - self._limit)
+        self._limit = limit
+
+    def to_stats(self) -> dict:
+        with self._condition:
+            return {
+                "adaptive": self.adaptive,
+                "limit": self._limit,
+                "min_limit": self.min_limit,
+                "max_limit": self.max_limit,
+                "best_limit": self.best_limit,
+                "best_throughput": round(self.best_throughput, 1),
+                "best_bytes_rate": round(self.best_bytes_rate),
+                "completed_items": self.nb_completed_items,
+                "completed_bytes": self.completed_bytes,
+                "adjustments": list(self.adjustments)
+            }
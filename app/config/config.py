@@ -65,7 +65,7 @@ DATABASE_URL: str = config("DB_CONNECTION", default='postgresql://{user}:{passwo
                                    port=DATABASE_PORT, db=DATABASE_NAME))
 
 MAX_CONNECTIONS_COUNT: int = config("MAX_CONNECTIONS_COUNT", cast=int, default=10)
-MIN_CONNECTIONS_COUNT: int = config("MIN_CONNECTIONS_COUNT", cast=int, default=10)
+MIN_CONNECTIONS_COUNT: int = config("MIN_CONNECTIONS_COUNT", cast=int, default=1)  # Opened by each process of the crawl
 
 DRY_RUN: bool = config("DRY_RUN", cast=bool, default=True)
 
@@ -126,8 +126,51 @@ logging.getLogger('requests').setLevel(logging.INFO if DEBUG else logging.ERROR)
 logging.getLogger('urllib3').setLevel(logging.INFO if DEBUG else logging.ERROR)
 logging.getLogger('botocore').setLevel(logging.INFO if DEBUG else logging.WARNING)
 
-QUEUE_MAX_SIZE: int = config("QUEUE_MAX_SIZE", default=200000)
-QUEUE_MIN_SIZE: int = config("QUEUE_MIN_SIZE", default=100)
-QUEUE_WAIT_TIME: int = config("QUEUE_WAIT_TIME", cast=int, default=10)  # seconds to wait for queue to get new items when empty
+QUEUE_MAX_SIZE: int = config("QUEUE_MAX_SIZE", cast=int, default=200000)  # high watermark: queued paths blocking the crawler
+QUEUE_MIN_SIZE: int = config("QUEUE_MIN_SIZE", cast=int, default=100)  # low watermark: queued paths releasing the blocked crawler
+QUEUE_WAIT_TIME: int = config("QUEUE_WAIT_TIME", cast=int, default=10)  # seconds between two checks of the stop flag while the queue is empty
 
 CURRENT_MAX_AGE: int = config("CURRENT_MAX_AGE", default=16)
+
+CRAWLER_WORKERS_COUNT: int = config("CRAWLER_WORKERS_COUNT", cast=int, default=1)  # threads listing directories concurrently
+CRAWLER_PROCESSES_COUNT: int = config("CRAWLER_PROCESSES_COUNT", cast=int, default=1)  # independent roots crawled concurrently, one process each
+CRAWLER_BATCH_EVENTS: bool = config("CRAWLER_BATCH_EVENTS", cast=bool, default=False)  # one event per directory listing instead of one per file
+CRAWLER_ASYNC_OBSERVERS: bool = config("CRAWLER_ASYNC_OBSERVERS", cast=bool, default=False)  # each observer notified from its own thread
+CRAWLER_OBSERVERS_MAILBOX_SIZE: int = config("CRAWLER_OBSERVERS_MAILBOX_SIZE", cast=int, default=10000)  # events waiting for an asynchronous observer before the crawl is blocked
+
+FILTERS_SAMPLING_RATE: int = config("FILTERS_SAMPLING_RATE", cast=int, default=16)  # 1 path out of N is used to measure the skip filters (0: no reordering)
+FILTERS_REORDER_INTERVAL: int = config("FILTERS_REORDER_INTERVAL", cast=int, default=4096)  # paths checked between two reorderings of the skip filters
+FILTERS_VERDICT_CACHE_SIZE: int = config("FILTERS_VERDICT_CACHE_SIZE", cast=int, default=100000)  # verdicts of the name-pure filters kept in memory (0: no cache)
+
+CONSUMER_WORKERS_COUNT: int = config("CONSUMER_WORKERS_COUNT", cast=int, default=32)  # threads processing the crawled paths
+CONSUMER_MAX_PENDING_TASKS: int = config("CONSUMER_MAX_PENDING_TASKS", cast=int, default=10000)  # tasks submitted to the consumer workers before it stops popping the queue
+CONSUMER_PROCESSES_COUNT: int = config("CONSUMER_PROCESSES_COUNT", cast=int, default=0)  # processes running the CPU-bound processors (0: one per core)
+CONSUMER_USE_PIPELINE: bool = config("CONSUMER_USE_PIPELINE", cast=bool, default=False)  # process the paths stage after stage, each stage having its own queue and workers
+PIPELINE_STAGE_WORKERS_COUNT: int = config("PIPELINE_STAGE_WORKERS_COUNT", cast=int, default=8)  # threads of each I/O-bound pipeline stage
+PIPELINE_STAGE_QUEUE_SIZE: int = config("PIPELINE_STAGE_QUEUE_SIZE", cast=int, default=10000)  # paths waiting for a pipeline stage before the previous one is blocked
+
+CONCURRENCY_ADAPTIVE: bool = config("CONCURRENCY_ADAPTIVE", cast=bool, default=False)  # adapt the number of concurrent tasks of the consumer and pipeline stages to their throughput
+CONCURRENCY_MIN_WORKERS: int = config("CONCURRENCY_MIN_WORKERS", cast=int, default=2)  # floor of the adaptive concurrency
+CONCURRENCY_MAX_WORKERS: int = config("CONCURRENCY_MAX_WORKERS", cast=int, default=128)  # ceiling of the adaptive concurrency
+CONCURRENCY_SAMPLE_INTERVAL: float = config("CONCURRENCY_SAMPLE_INTERVAL", cast=float, default=2.0)  # seconds of throughput measured between two adjustments
+CONCURRENCY_INCREASE_STEP: int = config("CONCURRENCY_INCREASE_STEP", cast=int, default=2)  # tasks added while the throughput increases
+CONCURRENCY_DECREASE_FACTOR: float = config("CONCURRENCY_DECREASE_FACTOR", cast=float, default=0.75)  # factor applied when the throughput drops or the latency grows
+CONCURRENCY_TOLERANCE: float = config("CONCURRENCY_TOLERANCE", cast=float, default=0.05)  # relative change of throughput or latency ignored as noise
+
+MEMORY_BUDGET_MB: int = config("MEMORY_BUDGET_MB", cast=int, default=0)  # RSS not to exceed by a crawling process (0: MEMORY_BUDGET_RATIO of the physical memory)
+MEMORY_BUDGET_RATIO: float = config("MEMORY_BUDGET_RATIO", cast=float, default=0.75)  # part of the physical memory used as budget when MEMORY_BUDGET_MB is 0 (0: no budget)
+MEMORY_PRESSURE_RATIO: float = config("MEMORY_PRESSURE_RATIO", cast=float, default=0.8)  # part of the budget above which the crawling channel shrinks
+MEMORY_PRESSURE_QUEUE_SIZE: int = config("MEMORY_PRESSURE_QUEUE_SIZE", cast=int, default=1000)  # high watermark of the crawling channel while the memory is under pressure
+MEMORY_SAMPLE_INTERVAL: float = config("MEMORY_SAMPLE_INTERVAL", cast=float, default=0.5)  # seconds between two samples of the RSS
+MEMORY_MAX_PAUSE: float = config("MEMORY_MAX_PAUSE", cast=float, default=5.0)  # seconds after which a traversal paused by the memory budget resumes anyway (at most QUEUE_WAIT_TIME / 2)
+
+DATABASE_POOL_WAIT_TIMEOUT: float = config("DATABASE_POOL_WAIT_TIMEOUT", cast=float, default=60.0)  # seconds to wait for a pooled DB connection before failing
+DATABASE_HEALTH_CHECK_INTERVAL: float = config("DATABASE_HEALTH_CHECK_INTERVAL", cast=float, default=30.0)  # seconds of inactivity after which a pooled DB connection is checked before use
+
+PATH_WRITER_BATCH_SIZE: int = config("PATH_WRITER_BATCH_SIZE", cast=int, default=1000)  # paths upserted into DB per multi-row statement
+PATH_WRITER_FLUSH_INTERVAL: float = config("PATH_WRITER_FLUSH_INTERVAL", cast=float, default=5.0)  # seconds after which the buffered paths are upserted, even if the batch is not full
+PATH_WRITER_QUEUE_SIZE: int = config("PATH_WRITER_QUEUE_SIZE", cast=int, default=20000)  # paths waiting for the DB writer thread above which the crawling and processing threads wait
+
+PATH_PREFETCH_BATCH_SIZE: int = config("PATH_PREFETCH_BATCH_SIZE", cast=int, default=1000)  # saved paths fetched per query to detect the unchanged paths
+PATH_PREFETCH_MAX_DIRECTORIES: int = config("PATH_PREFETCH_MAX_DIRECTORIES", cast=int, default=256)  # directories whose saved paths are kept in memory by the consumer
+PATH_STREAM_PAGE_SIZE: int = config("PATH_STREAM_PAGE_SIZE", cast=int, default=2000)  # paths fetched per page when streaming the paths of a stage
@@ -0,0 +1,203 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, Dict, List
+
+from loguru import logger
+
+from config import config
+from helpers.filesize_helper import format_file_size
+
+PROGRESS_REPORT_INTERVAL = 10  # seconds between two combined progress reports
+# How the statistics of the shards are merged (see `ShardedCrawlCoordinator.merge_stats`): the others are summed
+_PER_SHARD_KEYS = frozenset({'budget', 'pressure_level'})  # Each process has its own memory budget
+_MAX_PREFIXES = ('max_', 'peak_', 'best_')
+_MAX_SUFFIXES = ('limit', 'watermark')
+_SETTING_KEYS = frozenset({'batch_size', 'flush_interval', 'sample_interval'})
+_MEAN_PREFIXES = ('average_',)
+_MEAN_SUFFIXES = ('_rate', '_ratio')
+
+
+class ShardedCrawlCoordinator:
+    """
+    Crawls independent shards (i.e. roots located on different physical disks) in parallel, one worker process per
+    shard, so that the crawl scales with the number of disks instead of being capped by a single interpreter.
+
+    A shard runner is a module-level function `runner(shard: dict, progress_queue) -> dict`, executed in the worker
+    process: it builds its own filters and DB connection, crawls the shard and returns its statistics.
+    While crawling, the runner may put progress dicts `{'shard': <name>, 'files': <int>, 'size': <int>}` into the
+    progress queue; the coordinator combines them into a global progress report.
+    """
+
+    def __init__(self, shards: List[dict], shard_runner: Callable[[dict, object], dict],
+                 nb_processes: int = None) -> None:
+        """
+        :param shards: the shards to be crawled. Each shard is a picklable dict, having at least a 'name' key
+        :param shard_runner: the function crawling a shard (see class documentation)
+        :param nb_processes: how many shards are crawled at the same time (defaults to `CRAWLER_PROCESSES_COUNT`).
+        With a single process, the shards are crawled one after the other in the current process.
+        """
+        super().__init__()
+        self.shards: List[dict] = shards if shards else []
+        self.shard_runner = shard_runner
+        self.nb_processes: int = max(1, min(len(self.shards),
+                                            nb_processes if nb_processes else config.CRAWLER_PROCESSES_COUNT))
+        self.shards_progress: Dict[str, dict] = {}
+        self.shards_stats: Dict[str, dict] = {}
+        self._completed: bool = False
+
+    def run(self) -> dict:
+        """
+        Crawl all the shards and wait for them to complete.
+        :return: the statistics of all the shards, merged together
+        """
+        start = time.time()
+        if not self.shards:
+            logger.warning("No shard found to be crawled!")
+            return {'duration': time.time() - start}
+        logger.success(f"Crawling {len(self.shards)} shards using {self.nb_processes} processes...")
+        if self.nb_processes <= 1:
+            progress_queue = queue.Queue()
+            reporter = self._start_progress_reporter(progress_queue)
+            for shard in self.shards:
+                self._shard_completed(shard, self._run_shard(shard, progress_queue))
+            self._stop_progress_reporter(reporter)
+        else:
+            with multiprocessing.Manager() as manager:
+                progress_queue = manager.Queue()
+                reporter = self._start_progress_reporter(progress_queue)
+                with ProcessPoolExecutor(max_workers=self.nb_processes) as executor:
+                    futures = {executor.submit(self.shard_runner, shard, progress_queue): shard
+                               for shard in self.shards}
+                    for future in as_completed(futures):
+                        shard = futures[future]
+                        try:
+                            stats = future.result()
+                        except Exception as ex:
+                            logger.error(f"Unable to crawl shard '{shard.get('name')}': {ex}")
+                            stats = {'errored_paths': {shard.get('name'): str(ex)}}
+                        self._shard_completed(shard, stats)
+                self._stop_progress_reporter(reporter)
+
+        merged_stats = ShardedCrawlCoordinator.merge_stats(list(self.shards_stats.values()))
+        merged_stats['duration'] = time.time() - start
+        logger.success(f"Crawled {len(self.shards)} shards in {merged_stats['duration']:.2f} sec - "
+                       f"Total size: {format_file_size(merged_stats.get('total_size', 0))}")
+        return merged_stats
+
+    def _run_shard(self, shard: dict, progress_queue) -> dict:
+        try:
+            return self.shard_runner(shard, progress_queue)
+        except Exception as ex:
+            logger.error(f"Unable to crawl shard '{shard.get('name')}': {ex}")
+            return {'errored_paths': {shard.get('name'): str(ex)}}
+
+    def _shard_completed(self, shard: dict, stats: dict):
+        name = shard.get('name')
+        self.shards_stats[name] = stats or {}
+        logger.success(f"Shard '{name}' completed ({len(self.shards_stats)}/{len(self.shards)})")
+
+    def _start_progress_reporter(self, progress_queue) -> threading.Thread:
+        self._completed = False
+        reporter = threading.Thread(target=self._report_progress, args=(progress_queue,),
+                                    name="Crawl coordinator - progress", daemon=True)
+        reporter.start()
+        return reporter
+
+    def _stop_progress_reporter(self, reporter: threading.Thread):
+        self._completed = True
+        reporter.join()
+
+    def _report_progress(self, progress_queue):
+        last_report = time.time()
+        while not self._completed:
+            try:
+                progress: dict = progress_queue.get(timeout=1)
+                self.shards_progress[progress.get('shard')] = progress
+            except queue.Empty:
+                pass
+            except (EOFError, OSError):
+                break  # The manager has been shut down
+            if time.time() - last_report >= PROGRESS_REPORT_INTERVAL:
+                last_report = time.time()
+                total_files = sum(p.get('files', 0) for p in self.shards_progress.values())
+                total_size = sum(p.get('size', 0) for p in self.shards_progress.values())
+                logger.success(f"Crawled {total_files} files ({format_file_size(total_size)}) so far - "
+                               f"{len(self.shards_stats)}/{len(self.shards)} shards completed")
+
+    @staticmethod
+    def merge_stats(shards_stats: List[dict]) -> dict:
+        """
+        Merge the statistics of several shards, key by key:
+         - the counters are summed,
+         - the peaks, limits, watermarks and settings are the maximum of the shards, the averages and rates their mean,
+         - the budgets of each process are kept per shard (as a list),
+         - dicts are merged recursively, the measures of the filters by filter name, other lists and sets are
+           concatenated.
+        """
+        merged: dict = {}
+        for stats in shards_stats:
+            for key in (stats or {}):
+                if key not in merged:
+                    merged[key] = None  # Keeps the order of the keys
+        for key in merged:
+            values = [stats[key] for stats in shards_stats if stats and stats.get(key) is not None]
+            merged[key] = ShardedCrawlCoordinator._merge_values(key, values)
+        return merged
+
+    @staticmethod
+    def _merge_values(key, values: list):
+        if not values:
+            return None
+        if all(isinstance(value, dict) for value in values):
+            return ShardedCrawlCoordinator.merge_stats(values)
+        if key == 'filters' and all(isinstance(value, list) for value in values):
+            return ShardedCrawlCoordinator._merge_filters_stats(values)
+        if all(isinstance(value, (list, set, tuple)) for value in values):
+            return [item for value in values for item in value]
+        if not all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+            return values[0]
+        key = str(key)  # Some dicts are keyed by numbers (e.g. the metrics by depth)
+        if key in _PER_SHARD_KEYS:
+            return values
+        if key.startswith(_MAX_PREFIXES) or key.endswith(_MAX_SUFFIXES) or key in _SETTING_KEYS:
+            return max(values)
+        if key.startswith(_MEAN_PREFIXES) or key.endswith(_MEAN_SUFFIXES) or key == 'rank':
+            return sum(values) / len(values)
+        return sum(values)
+
+    @staticmethod
+    def _merge_filters_stats(shards_filters: List[List[dict]]) -> List[dict]:
+        """
+        Merge the measures of the filters having the same name (see `FilterChain.to_stats`), weighted by their number
+        of samples.
+        """
+        merged: Dict[str, dict] = {}
+        for filters in shards_filters:
+            for filter_stats in filters:
+                if not isinstance(filter_stats, dict) or 'filter' not in filter_stats:
+                    continue
+                current = merged.setdefault(filter_stats['filter'], {"filter": filter_stats['filter'], "samples": 0,
+                                                                     "rejections": 0.0, "cost_us": 0.0})
+                samples = filter_stats.get('samples', 0)
+                current["samples"] += samples
+                current["rejections"] += filter_stats.get('rejection_rate', 0.0) * samples
+                current["cost_us"] += filter_stats.get('average_cost_us', 0.0) * samples
+        filters_stats = []
+        for current in merged.values():
+            samples = current["samples"]
+            rejection_rate = current["rejections"] / samples if samples else 0.0
+            average_cost_us = current["cost_us"] / samples if samples else 0.0
+            filters_stats.append({
+                "filter": current["filter"],
+                "samples": samples,
+                "rejection_rate": round(rejection_rate, 4),
+                "average_cost_us": round(average_cost_us, 3),
+                "rank": rejection_rate / max(average_cost_us * 1000, 1.0)
+            })
+        return sorted(filters_stats, key=lambda f: f["rank"], reverse=True)
@@ -6,12 +6,10 @@ import sys
 import threading
 from datetime import datetime
 from pathlib import Path
-from queue import Queue
 from typing import List
 import platform
 
 from loguru import logger
-import xxhash
 
 from interfaces.iFilter import IFilter
 from observers.empty_directory_observer import EmptyDirectoryObserver
@@ -19,9 +17,9 @@ from observers.empty_directory_observer import EmptyDirectoryObserver
 root_folder = os.path.abspath(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 sys.path.append(root_folder)
 
-from config import config
 from helpers.filesize_helper import format_file_size
 from crawler.file_system_crawler import FileSystemCrawler
+from crawling_channel import CrawlingChannel
 from crawling_queue_consumer import CrawlingQueueConsumer
 from database.data_manager import PathDataManager
 from interfaces.iPathProcessor import IPathProcessor
@@ -93,10 +91,10 @@ def build_filters() -> List[IFilter]:
 def build_processors(category: ContentCategory) -> List[IPathProcessor]:
     processors: List[IPathProcessor] = []
 
-    hash_algos = {}
-    hash_algos['xxh3_64'] = xxhash.xxh3_64()  # 15 sec to hash 10 Go
-    # hash_algos['md5'] = hashlib.md5()         # 22 sec to hash 10 Go
-    # hash_algos['sha256'] = hashlib.sha256()   # 28 sec to hash 10 Go - Avoids risk of collisions, but much slower
+    hash_algos: List[str] = []
+    hash_algos.append('xxh3_64')                # 15 sec to hash 10 Go
+    # hash_algos.append('md5')                  # 22 sec to hash 10 Go
+    # hash_algos.append('sha256')               # 28 sec to hash 10 Go - Avoids risk of collisions, but much slower
     # processors.append(HashFileProcessor(hash_algorithms=hash_algos))
     processors.append(ExtendedAttributesFileProcessor())
     if category == ContentCategory.ADULT or category == ContentCategory.MUSIC:
@@ -120,7 +118,7 @@ def crawl_directory(base_dir_path: str, category: ContentCategory, min_age: Cont
     crawler = FileSystemCrawler(roots=roots)
     crawler.add_skip_filters(build_filters())
 
-    crawling_queue: Queue = Queue(maxsize=config.QUEUE_MAX_SIZE)
+    crawling_queue: CrawlingChannel = CrawlingChannel()
     crawler.add_observer(EmptyDirectoryObserver())
     metrics_observer = MetricsObserver()
     crawler.add_observer(metrics_observer)
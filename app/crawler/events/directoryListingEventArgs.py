@@ -0,0 +1,77 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+import os
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Iterator, List
+
+from crawler.events.crawlerEventArgs import CrawlerEventArgs
+from crawler.events.fileCrawledEventArgs import FileCrawledEventArgs
+from helpers.serializationHelper import JsonDumper
+from interfaces.iCrawler import ICrawler
+from models.content import ContentCategory, ContentClassificationPegi
+from models.file import FileModel
+from models.path import PathModel
+
+
+class DirectoryListingEventArgs(CrawlerEventArgs):
+    """
+    The crawled files of a single directory, sent at once instead of one `FileCrawledEventArgs` per file.
+    The files are stored as parallel arrays (names, sizes and modification times): no event nor `PathModel` is built
+    until a consumer asks for them.
+    """
+
+    def __init__(self, crawler: ICrawler, path: Path, root_dir_path: str, root_category: ContentCategory = None,
+                 root_min_age: ContentClassificationPegi = None, root_target_table: str = None) -> None:
+        super().__init__(crawler=crawler)
+        self.path: Path = path
+        self.root_dir_path: str = root_dir_path
+        self.root_category: ContentCategory = root_category
+        self.root_min_age: ContentClassificationPegi = root_min_age
+        self.root_target_table: str = root_target_table
+        self.names: List[str] = []
+        self.sizes: array = array('q')
+        self.mtimes: array = array('d')
+        self.size: int = 0  # Total size of the listed files
+
+    def add_file(self, name: str, size: int, mtime: float):
+        self.names.append(name)
+        self.sizes.append(size)
+        self.mtimes.append(mtime)
+        self.size += size
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def full_path(self, index: int) -> str:
+        return os.path.join(self.path, self.names[index])
+
+    def path_model(self, index: int) -> PathModel:
+        path_model = FileModel(root=self.root_dir_path, path=self.full_path(index), size=self.sizes[index])
+        path_model.modify_time = datetime.fromtimestamp(self.mtimes[index])
+        path_model.content_category = self.root_category
+        path_model.content_min_age = self.root_min_age
+        return path_model
+
+    def path_models(self) -> List[PathModel]:
+        return [self.path_model(index) for index in range(len(self.names))]
+
+    def file_event(self, index: int, path_model: PathModel = None) -> FileCrawledEventArgs:
+        """
+        Build the `FileCrawledEventArgs` of a single file of the listing, for the components not handling batches.
+        :param path_model: the model of the file, if already built (defaults to `path_model`)
+        """
+        return FileCrawledEventArgs(crawler=self.crawler, path=Path(self.full_path(index)),
+                                    root_dir_path=self.root_dir_path, size=self.sizes[index],
+                                    root_category=self.root_category, root_min_age=self.root_min_age,
+                                    root_target_table=self.root_target_table,
+                                    path_model=path_model if path_model is not None else self.path_model(index))
+
+    def file_events(self) -> Iterator[FileCrawledEventArgs]:
+        for index in range(len(self.names)):
+            yield self.file_event(index)
+
+    def __str__(self) -> str:
+        return JsonDumper.dumps({'path': str(self.path), 'files': len(self), 'size': self.size})
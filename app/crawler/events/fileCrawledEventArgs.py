@@ -1,21 +1,24 @@
 #  Copyright (c) 2023. Manuel LANG
 #  Software under GNU AGPLv3 licence
+import os
 from pathlib import Path
 
 from crawler.events.pathEventArgs import PathEventArgs
 from helpers.serializationHelper import JsonDumper
 from interfaces.iCrawler import ICrawler
 from models.content import ContentCategory, ContentClassificationPegi
+from models.path import PathModel
 
 
 class FileCrawledEventArgs(PathEventArgs):
 
     def __init__(self, crawler: ICrawler, path: Path, root_dir_path: str, size: int,
                  root_category: ContentCategory = None, root_min_age: ContentClassificationPegi = None,
-                 root_target_table: str = None) -> None:
+                 root_target_table: str = None, stat: os.stat_result = None,
+                 path_model: PathModel = None) -> None:
         super().__init__(crawler=crawler, path=path, is_dir=False, is_file=True, size=size,
                          root_dir_path=root_dir_path, root_category=root_category, root_min_age=root_min_age,
-                         root_target_table=root_target_table)
+                         root_target_table=root_target_table, stat=stat, path_model=path_model)
 
     def __str__(self) -> str:
         return JsonDumper.dumps(self.__dict__)
@@ -1,6 +1,7 @@
 #  Copyright (c) 2023. Manuel LANG
 #  Software under GNU AGPLv3 licence
 
+import os
 from pathlib import Path
 from loguru import logger
 
@@ -10,23 +11,31 @@ from crawler.events.crawlerEventArgs import CrawlerEventArgs
 from models.content import ContentCategory, ContentClassificationPegi
 from models.file import FileModel
 from models.directory import DirectoryModel
+from models.path import PathModel
 
 
 class PathEventArgs(CrawlerEventArgs):
 
     def __init__(self, crawler: ICrawler, path: Path, root_dir_path: str, is_dir: bool, is_file: bool,
                  size: int, root_category: ContentCategory = None,
-                 root_min_age: ContentClassificationPegi = None, root_target_table: str = None) -> None:
+                 root_min_age: ContentClassificationPegi = None, root_target_table: str = None,
+                 stat: os.stat_result = None, path_model: PathModel = None) -> None:
         super().__init__(crawler=crawler)
         self.path: Path = path
-        self.is_dir = is_dir or self.path and self.path.is_dir()
-        self.is_file = is_file or self.path and self.path.is_file()
+        if not is_dir and not is_file and self.path:  # The path type is not known by the crawler
+            is_dir = self.path.is_dir()
+            is_file = not is_dir and self.path.is_file()
+        self.is_dir = is_dir
+        self.is_file = is_file
         self.size = size
         self.root_dir_path = root_dir_path
-        if self.is_file:
-            self.path_model = FileModel(root=self.root_dir_path, path=self.path, size=self.size)
+        if path_model is not None:
+            self.path_model = path_model
+        elif self.is_file:
+            self.path_model = FileModel(root=self.root_dir_path, path=self.path, size=self.size, stat=stat)
         elif self.is_dir:
-            self.path_model = DirectoryModel(root=self.root_dir_path, path=self.path, size=self.size, files_in_dir=0)
+            self.path_model = DirectoryModel(root=self.root_dir_path, path=self.path, size=self.size, files_in_dir=0,
+                                             stat=stat)
         else:
             logger.error(f"Unable to determine whether the path '{self.path}' is a file or a directory")
 
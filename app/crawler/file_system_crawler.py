@@ -1,10 +1,12 @@
 #  Copyright (c) 2023. Manuel LANG
 #  Software under GNU AGPLv3 licence
 
+import os
+import threading
 from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, NamedTuple
 
 from loguru import logger
 
@@ -14,17 +16,25 @@ from crawler.events.crawlErrorEventArgs import CrawlErrorEventArgs
 from crawler.events.crawlProgressEventArgs import CrawlProgessEventArgs
 from crawler.events.crawlStartingEventArgs import CrawlStartingEventArgs
 from crawler.events.crawlStoppedEventArgs import CrawlStoppedEventArgs
+from crawler.events.crawlerEventArgs import CrawlerEventArgs
 from crawler.events.directoryCrawledEventArgs import DirectoryCrawledEventArgs
 from crawler.events.directoryFoundEventArgs import DirectoryFoundEventArgs
+from crawler.events.directoryListingEventArgs import DirectoryListingEventArgs
 from crawler.events.fileCrawledEventArgs import FileCrawledEventArgs
 from crawler.events.fileFoundEventArgs import FileFoundEventArgs
 from crawler.events.pathFoundEventArgs import PathFoundEventArgs
 from crawler.events.pathSkippedEventArgs import PathSkippedEventArgs
+from crawler.observer_bus import ObserverBus
+from crawler.work_stealing_walker import DirectoryTask, WorkStealingWalker
+from filters.entry_record import EntryRecord
+from filters.filter_chain import FilterChain
+from filters.filter_compiler import FilterCompiler
 from helpers.filesize_helper import *
 from helpers.serializationHelper import JsonDumper
 from interfaces.iCrawler import ICrawler
 from interfaces.iCrawlerObserver import ICrawlerObserver
 from interfaces.iFilter import IFilter
+from memory_governor import MemoryGovernor
 
 from helpers.filesize_helper import format_file_size
 
@@ -34,27 +44,74 @@ MIN_BLOCK_SIZE = 1024 * 4
 MAX_LAST_N_ITEMS_TO_KEEP = 2000
 
 
+class _CrawlContext(NamedTuple):
+    root_dir: str
+    category: ContentCategory
+    min_age: ContentClassificationPegi
+    target_table: str
+
+
+class _DirectoryFrame:
+    """
+    A directory being walked through: its children are listed once, then visited one after the other.
+    """
+    __slots__ = ('path', 'depth', 'children', 'index', 'should_notify', 'pruned_by', 'size', 'files_in_dir',
+                 'listing')
+
+    def __init__(self, path: Path, depth: int, should_notify: bool, pruned_by: IFilter = None) -> None:
+        self.path: Path = path
+        self.depth: int = depth
+        self.pruned_by: IFilter = pruned_by  # The directory-scope filter rejecting all its entries, if any
+        self.children: List[os.DirEntry] = []
+        self.index: int = 0
+        self.should_notify: bool = should_notify
+        self.size: int = 0
+        self.files_in_dir: int = 0
+        self.listing: DirectoryListingEventArgs = None  # The crawled files, when events are batched
+
+
 class FileSystemCrawler(ICrawler):
 
     def __init__(self, roots: Dict[str, dict], skip_filters: List[IFilter] = [], notify_filters: List[IFilter] = [],
-                 observers: List[ICrawlerObserver] = []) -> None:
+                 observers: List[ICrawlerObserver] = [], nb_workers: int = None, batch_events: bool = None,
+                 async_observers: bool = None, memory_governor: MemoryGovernor = None) -> None:
         """
         Create a new instance of crawler to browse  file system on a machine
         :param roots: the base directories to scan. A dict is expected as <Base_Directory, Path_Part_To_Ignore>.
         The `Path_Part_To_Ignore` is useful when workingon network drive, mapped volumes or any case when you want to get rid of path prefix
         :param skip_filters: a set of rules to teach the crawler to ignore some paths based on criterion. This crawler will walk through the directories and subdirs as long a no filters prevents it.
          When a filter prevents it, all sub-dirs are ignored. Notifications are sent each time a file/directory is authorized by all skip_filters (applies AND amongst filters).
-        :param observers: defines what  component to notify when files/directories are found
+        :param observers: defines what  component to notify when files/directories are found. The events no observer
+        subscribed to are not raised (see `ICrawlerObserver.subscribed_events`).
         :param notify_filters: This crawler will walk through all the directories and subdirs (as allowed by skip_filters).
         If notify_filters is set, notifications are sent only when the current path matches any of the filters.
+        :param nb_workers: number of threads listing directories concurrently (defaults to `CRAWLER_WORKERS_COUNT`).
+        With more than one worker, the events of a directory are raised as soon as it is listed, so they are not
+        ordered depth-first anymore; but a directory is still reported as crawled after all its sub-directories.
+        :param batch_events: instead of raising the path_found, processing_file and processed_file events for every
+        single file, report the crawled files of each directory at once with a `DirectoryListingEventArgs`
+        (defaults to `CRAWLER_BATCH_EVENTS`). Skipped paths and directories are still reported one by one.
+        :param async_observers: notify each observer from its own thread, through a bounded mailbox, instead of the
+        crawling threads (defaults to `CRAWLER_ASYNC_OBSERVERS`, or True with more than one worker). The events are
+        still handled in order by each observer, and all of them are handled when `start` returns. The crawling
+        threads do not serialize the notifications: synchronous observers of several workers are called concurrently.
+        :param memory_governor: pauses the traversal before listing a directory while the process is over its memory
+        budget (defaults to the governor of the process)
         """
         super().__init__()
         self.roots: Dict[str, dict] = roots
         self._skip_filters: List[IFilter] = skip_filters
+        self._skip_filter_chain: FilterChain = FilterChain(skip_filters)
         self._notify_filters: List[IFilter] = notify_filters
-        self._observers: List[ICrawlerObserver] = observers
+        self._nb_workers: int = nb_workers if nb_workers else config.CRAWLER_WORKERS_COUNT
+        if async_observers is None:
+            async_observers = config.CRAWLER_ASYNC_OBSERVERS or self._nb_workers > 1
+        self._observer_bus: ObserverBus = ObserverBus(observers, on_stop=self.stop, asynchronous=async_observers)
         self._require_stop = False
         self._paths_to_crawl: Dict[Path, dict] = {}
+        self._batch_events: bool = config.CRAWLER_BATCH_EVENTS if batch_events is None else batch_events
+        self._lock = threading.RLock()  # Stats may be updated from several workers
+        self._memory_governor: MemoryGovernor = memory_governor if memory_governor else MemoryGovernor.shared()
 
         # stats
         self._paths_found: List[Path] = []
@@ -97,13 +154,12 @@ class FileSystemCrawler(ICrawler):
     def add_observer(self, observer: ICrawlerObserver):
         if not observer:
             raise ValueError("Missing argument 'observer'")
-        if observer not in self._observers:
-            self._observers.append(observer)
+        self._observer_bus.subscribe(observer)
         return self
 
     @property
     def observers(self) -> List[ICrawlerObserver]:
-        return self._observers
+        return self._observer_bus.observers
 
     @property
     def require_stop(self) -> bool:
@@ -175,7 +231,7 @@ class FileSystemCrawler(ICrawler):
 
     @property
     def errored_paths(self) -> Dict[str, str]:
-        self._errored_paths = self._errored_paths[-MAX_LAST_N_ITEMS_TO_KEEP:]
+        self._errored_paths = dict(list(self._errored_paths.items())[-MAX_LAST_N_ITEMS_TO_KEEP:])
         return self._errored_paths
 
     @property
@@ -233,121 +289,97 @@ class FileSystemCrawler(ICrawler):
 
     # region notifications
 
+    def _notify_observers(self, callback_name: str, crawl_event: CrawlerEventArgs):
+        """
+        Publish the event without holding the lock of the crawler: the workers are not serialized through the
+        observers (an observer needing it is serialized by its own mailbox, see `ObserverBus.asynchronous`).
+        """
+        if self._observer_bus.publish(callback_name, crawl_event):
+            self.stop()
+
+    def _should_notify(self, callback_name: str) -> bool:
+        """
+        :return: whether any observer subscribed to the event: otherwise, the event does not need to be built
+        """
+        return self._observer_bus.has_subscribers(callback_name)
+
+    def _add_crawled_path(self, path: str):
+        """
+        Remember the last crawled paths: to be called with the lock held.
+        """
+        self._crawled_paths.append(path)
+        if len(self._crawled_paths) > MAX_LAST_N_ITEMS_TO_KEEP:
+            self._crawled_paths = self.crawled_paths
+
+    def _count_path_found(self, path: Path):
+        with self._lock:
+            self.paths_found.append(path)
+            self._nb_paths_found += 1
+
+    def _count_path_skipped(self, path: Path, is_dir: bool, is_file: bool):
+        with self._lock:
+            self.paths_skipped.append(path)
+            self._nb_paths_skipped += 1
+            if is_file:
+                self._nb_ignored_files += 1
+            elif is_dir:
+                self._nb_ignored_dirs += 1
+
+    def _count_processed_file(self, path: Path, size: int):
+        with self._lock:
+            self._processed_files_size += size
+            self._nb_files_processed += 1
+            self.files_processed.append(path)
+
+    def _count_processed_directory(self, path: Path):
+        with self._lock:
+            self._nb_directories_processed += 1
+            self.directories_processed.append(path)
+
     def notify_crawl_starting(self, crawl_event: CrawlStartingEventArgs):
-        for observer in self.observers:
-            try:
-                observer.crawl_starting(crawl_event)
-                if crawl_event.should_stop:
-                    self.stop()
-            except Exception as ex:
-                logger.error(f"Unable to notify observer '{observer}' for crawl_starting event {crawl_event}: {ex}")
+        self._notify_observers('crawl_starting', crawl_event)
 
     def notify_path_found(self, crawl_event: PathFoundEventArgs):
-        self.paths_found.append(crawl_event.path)
-        self._nb_paths_found += 1
-        for observer in self.observers:
-            try:
-                observer.path_found(crawl_event)
-                if crawl_event.should_stop:
-                    self.stop()
-            except Exception as ex:
-                logger.error(f"Unable to notify observer '{observer}' for path_found event {crawl_event}: {ex}")
+        self._count_path_found(crawl_event.path)
+        self._notify_observers('path_found', crawl_event)
 
     def notify_path_skipped(self, crawl_event: PathSkippedEventArgs):
-        self.paths_skipped.append(crawl_event.path)
-        self._nb_paths_skipped += 1
-        if crawl_event.is_file:
-            self._nb_ignored_files += 1
-        elif crawl_event.is_dir:
-            self._nb_ignored_dirs += 1
-        for observer in self.observers:
-            try:
-                observer.path_skipped(crawl_event)
-                if crawl_event.should_stop:
-                    self.stop()
-            except Exception as ex:
-                logger.error(f"Unable to notify observer '{observer}' for path_skipped event {crawl_event}: {ex}")
+        self._count_path_skipped(crawl_event.path, is_dir=crawl_event.is_dir, is_file=crawl_event.is_file)
+        self._notify_observers('path_skipped', crawl_event)
 
     def notify_processing_file(self, crawl_event: FileFoundEventArgs):
-        self._crawled_files_size += crawl_event.size
-        for observer in self.observers:
-            try:
-                observer.processing_file(crawl_event)
-                if crawl_event.should_stop:
-                    self.stop()
-            except Exception as ex:
-                logger.error(f"Unable to notify observer '{observer}' for processing_file event {crawl_event}: {ex}")
+        with self._lock:
+            self._crawled_files_size += crawl_event.size
+        self._notify_observers('processing_file', crawl_event)
 
     def notify_processed_file(self, crawl_event: FileCrawledEventArgs):
-        self._processed_files_size += crawl_event.size
-        self._nb_files_processed += 1
-        self.files_processed.append(crawl_event.path)
-        for observer in self.observers:
-            try:
-                observer.processed_file(crawl_event)
-                if crawl_event.should_stop:
-                    self.stop()
-            except Exception as ex:
-                logger.error(
-                    f"Unable to notify observer '{observer}' for notify_processed_file event {crawl_event}: {ex}")
+        self._count_processed_file(crawl_event.path, size=crawl_event.size)
+        self._notify_observers('processed_file', crawl_event)
+
+    def notify_directory_listed(self, crawl_event: DirectoryListingEventArgs):
+        with self._lock:
+            self._processed_files_size += crawl_event.size
+            self._nb_files_processed += len(crawl_event)
+        self._notify_observers('directory_listed', crawl_event)
 
     def notify_processing_directory(self, crawl_event: DirectoryFoundEventArgs):
-        for observer in self.observers:
-            try:
-                observer.processing_directory(crawl_event)
-                if crawl_event.should_stop:
-                    self.stop()
-            except Exception as ex:
-                logger.error(f"Unable to notify observer '{observer}' for processing_directory event {crawl_event}: "
-                             f"{ex}")
+        self._notify_observers('processing_directory', crawl_event)
 
     def notify_processed_directory(self, crawl_event: DirectoryCrawledEventArgs):
-        self._nb_directories_processed += 1
-        self.directories_processed.append(crawl_event.path)
-        for observer in self.observers:
-            try:
-                observer.processed_directory(crawl_event)
-                if crawl_event.should_stop:
-                    self.stop()
-            except Exception as ex:
-                logger.error(f"Unable to notify observer '{observer}' for notify_processed_directory event "
-                             f"{crawl_event}: {ex}")
+        self._count_processed_directory(crawl_event.path)
+        self._notify_observers('processed_directory', crawl_event)
 
     def notify_crawl_progress(self, crawl_event: CrawlProgessEventArgs):
-        for observer in self.observers:
-            try:
-                observer.crawl_progress(crawl_event)
-                if crawl_event.should_stop:
-                    self.stop()
-            except Exception as ex:
-                logger.error(f"Unable to notify observer '{observer}' for crawl_progress event {crawl_event}: {ex}")
+        self._notify_observers('crawl_progress', crawl_event)
 
     def notify_crawl_error(self, crawl_event: CrawlErrorEventArgs):
-        for observer in self.observers:
-            try:
-                observer.crawl_error(crawl_event)
-                if crawl_event.should_stop:
-                    self.stop()
-            except Exception as ex:
-                logger.error(f"Unable to notify observer '{observer}' for crawl_error event {crawl_event}: {ex}")
+        self._notify_observers('crawl_error', crawl_event)
 
     def notify_crawl_stopped(self, crawl_event: CrawlStoppedEventArgs):
-        for observer in self.observers:
-            try:
-                observer.crawl_stopped(crawl_event)
-                if crawl_event.should_stop:
-                    self.stop()
-            except Exception as ex:
-                logger.error(f"Unable to notify observer '{observer}' for crawl_stopped event {crawl_event}: {ex}")
+        self._notify_observers('crawl_stopped', crawl_event)
 
     def notify_crawl_completed(self, crawl_event: CrawlCompletedEventArgs):
-        for observer in self.observers:
-            try:
-                observer.crawl_completed(crawl_event)
-                if crawl_event.should_stop:
-                    self.stop()
-            except Exception as ex:
-                logger.error(f"Unable to notify observer '{observer}' for crawl_completed event {crawl_event}: {ex}")
+        self._notify_observers('crawl_completed', crawl_event)
 
     # endregion
 
@@ -364,6 +396,8 @@ class FileSystemCrawler(ICrawler):
         logger.info("Filters applied:")
         for f in self.skip_filters:
             logger.info(f)
+        self._skip_filter_chain = FilterChain(FilterCompiler.compile(self.skip_filters))
+        logger.info(f"Events subscribed by the observers: {self._observer_bus.to_json()}")
         logger.info("Start browsing files...")
         self.notify_crawl_starting(crawl_event=CrawlStartingEventArgs(crawler=self))
 
@@ -395,114 +429,290 @@ class FileSystemCrawler(ICrawler):
                     f"\t- {self._nb_files_processed} files processed (total of {format_file_size(self._processed_files_size)})\n"
                     f"\t- {self._nb_ignored_files} ignored files, {self._nb_ignored_dirs} "
                     f"director{'y' if self._nb_ignored_dirs <= 1 else 'ies'} skipped")
+        logger.info(f"Skip filters: {self._skip_filter_chain}")
 
         if self.require_stop:
             self.notify_crawl_stopped(crawl_event=CrawlStoppedEventArgs(crawler=self))
         else:
             self.notify_crawl_completed(crawl_event=CrawlCompletedEventArgs(crawler=self))
+        self._observer_bus.close()
+        if self._observer_bus.asynchronous:
+            logger.info(f"Observers mailboxes: {self._observer_bus.to_json().get('mailboxes')}")
 
     def crawl_path(self, path: Path, root_dir: str, category: ContentCategory, min_age: ContentClassificationPegi,
                    target_table: str) -> (int, int):
+        """
+        Walk the given root path, depth-first, using an explicit stack of directories instead of recursion.
+        Directories are listed with `os.scandir`, so the type of the entries comes from the listing itself (d_type)
+        and at most one `stat` is made per file (cached by the `os.DirEntry`).
+        :return: the total size of the files found under the path, and their number
+        """
+        context = _CrawlContext(root_dir=root_dir, category=category, min_age=min_age, target_table=target_table)
+        try:
+            root_record = EntryRecord.from_path(str(path))
+        except OSError as ex:
+            self._path_error(path=path, error=ex)
+            return 0, 0
+        visited = self._visit_entry(entry=root_record, found_path=path, context=context)
+        if not isinstance(visited, _DirectoryFrame):
+            return visited
+
+        if self._nb_workers > 1:
+            return self._crawl_path_parallel(root_frame=visited, context=context)
+
+        visited.children = self._list_directory(visited)
+        stack: List[_DirectoryFrame] = [visited]
+        while stack:
+            frame = stack[-1]
+            if frame.index < len(frame.children):
+                child = frame.children[frame.index]
+                frame.index += 1
+                visited = self._visit_entry(entry=child, found_path=Path(child.path), context=context,
+                                            parent_frame=frame)
+                if isinstance(visited, _DirectoryFrame):
+                    visited.children = self._list_directory(visited)
+                    stack.append(visited)
+                else:
+                    frame.size += visited[0]
+                    frame.files_in_dir += visited[1]
+                continue
+
+            stack.pop()
+            self._directory_crawled(frame=frame, context=context)
+            if not stack:
+                return frame.size, frame.files_in_dir
+            stack[-1].size += frame.size
+            stack[-1].files_in_dir += frame.files_in_dir
+
+    def _visit_entry(self, entry: os.DirEntry | EntryRecord, found_path: Path, context: '_CrawlContext',
+                     parent_frame: '_DirectoryFrame' = None):
+        """
+        Raise the events of a single file system entry.
+        The entry is parsed once into an `EntryRecord`, handed to the filters: directories are stat-ed only if a
+        filter requires it.
+        When events are batched, the crawled files are added to the listing of the parent directory instead.
+        :return: a `_DirectoryFrame` if the entry is a directory to be walked through, otherwise the size and number
+        of files of the entry
+        """
         path_size = 0
         files_in_directory = 0
         if self._require_stop:
             return path_size, files_in_directory
-        #try:
-        entry = path.expanduser().resolve()
-        entry_str = str(entry)
-        self._crawled_paths.append(entry_str)
-        if len(self._crawled_paths) > MAX_LAST_N_ITEMS_TO_KEEP:
-            self._crawled_paths = self.crawled_paths
 
-        if not entry.exists():
-            logger.debug(f"File: '{entry_str}' does not exists. Ignoring.")
+        record = entry
+        if not isinstance(entry, EntryRecord):
+            try:
+                is_file = entry.is_file()
+                is_dir = not is_file and entry.is_dir()
+            except OSError as ex:
+                self._path_error(path=found_path, error=ex)
+                return path_size, files_in_directory
+            record = EntryRecord.from_dir_entry(entry, is_dir=is_dir, is_file=is_file,
+                                                depth=parent_frame.depth + 1 if parent_frame else None)
+
+        entry_str = record.path
+        if record.is_symlink:
+            entry_str = os.path.realpath(entry_str)
+            parent_dir = os.path.dirname(record.path)
+            if parent_dir == entry_str or parent_dir.startswith(f"{entry_str}{os.sep}"):
+                logger.warning(f"Symlink '{record.path}' points to one of its parent directories. Ignoring.")
+                return path_size, files_in_directory
+        is_file = record.is_file
+        is_dir = record.is_dir
+        if not is_file and not is_dir:
+            with self._lock:
+                self._add_crawled_path(entry_str)
+            logger.debug(f"File: '{entry_str}' does not exists or is not a regular file. Ignoring.")
             return path_size, files_in_directory
 
-        self.notify_path_found(crawl_event=PathFoundEventArgs(crawler=self, path=path, root_dir_path=root_dir,
-                                                              is_dir=None, is_file=None, size=-1))
-        self._nb_processed_paths += 1
-        if entry.is_file():
+        entry_path = Path(entry_str)
+        batched = is_file and self._batch_events and parent_frame is not None
+        if not batched:
+            if self._should_notify('path_found'):
+                self.notify_path_found(crawl_event=PathFoundEventArgs(crawler=self, path=found_path,
+                                                                      root_dir_path=context.root_dir,
+                                                                      is_dir=is_dir, is_file=is_file, size=-1))
+            else:
+                self._count_path_found(found_path)
+        with self._lock:  # A single lock for the counters of the entry (the batched files are found here)
+            self._add_crawled_path(entry_str)
+            if batched:
+                self._nb_paths_found += 1
+            self._nb_processed_paths += 1
+            should_report_progress = self._nb_paths_found % 1000 == 0 and self._nb_paths_found > 0
+        entry_stat = None
+        if is_file:
             logger.debug(f"Crawling file: '{entry_str}'")
             files_in_directory = 1
-            file_size = entry.lstat().st_size
-            # size_on_disk = ((int)(file_size / MIN_BLOCK_SIZE)) * MIN_BLOCK_SIZE + MIN_BLOCK_SIZE
-            # path_size = convert_size_to_mb(size_on_disk)
-            path_size = file_size
-            self.notify_processing_file(crawl_event=FileFoundEventArgs(crawler=self, path=entry,
-                                                                       size=path_size,
-                                                                       root_dir_path=root_dir))
+            try:
+                entry_stat = record.stat()
+            except OSError as ex:
+                self._path_error(path=entry_path, error=ex)
+                return path_size, files_in_directory
+            path_size = entry_stat.st_size
+            if batched or not self._should_notify('processing_file'):
+                with self._lock:
+                    self._crawled_files_size += path_size
+            else:
+                self.notify_processing_file(crawl_event=FileFoundEventArgs(crawler=self, path=entry_path,
+                                                                           size=path_size,
+                                                                           root_dir_path=context.root_dir))
         else:
-            if entry.is_dir():
-                logger.debug(f"Crawling directory: '{entry_str}'")
-                self.notify_processing_directory(crawl_event=DirectoryFoundEventArgs(crawler=self, path=entry,
+            logger.debug(f"Crawling directory: '{entry_str}'")
+            if self._should_notify('processing_directory'):
+                self.notify_processing_directory(crawl_event=DirectoryFoundEventArgs(crawler=self, path=entry_path,
                                                                                      size=path_size,
-                                                                                     root_dir_path=root_dir))
-        if self._nb_paths_found % 1000 == 0 and self._nb_paths_found > 0:
-            self.notify_crawl_progress(crawl_event=CrawlProgessEventArgs(crawler=self))
+                                                                                     root_dir_path=context.root_dir))
+        if should_report_progress:
+            if self._should_notify('crawl_progress'):
+                self.notify_crawl_progress(crawl_event=CrawlProgessEventArgs(crawler=self))
             if config.LOGGING_LEVEL >= config.LOG_LEVEL_WARNING:
                 print(".", end="")  # Show progress indicator
             else:
                 logger.success(f"Found {self._nb_paths_found} paths so far...")
 
-        should_skip = False
-        for f in self.skip_filters:
-            if not f.authorize(path=entry):
-                should_skip = True
-                logger.debug(f"should_skip set to True by {f} for path {entry}")
-                break
-        if should_skip:
-            self.notify_path_skipped(crawl_event=PathSkippedEventArgs(crawler=self, path=entry,
-                                                                      is_dir=entry.is_dir(),
-                                                                      is_file=entry.is_file(),
-                                                                      size=path_size,
-                                                                      root_dir_path=root_dir))
+        if parent_frame is not None and parent_frame.pruned_by is not None:
+            rejecting_filter = parent_frame.pruned_by  # Known to reject all the entries of the directory
+        else:
+            rejecting_filter = self._skip_filter_chain.first_rejecting(record, is_root=parent_frame is None)
+        if rejecting_filter is not None:
+            logger.debug(f"should_skip set to True by {rejecting_filter} for path {entry_str}")
+            if self._should_notify('path_skipped'):
+                self.notify_path_skipped(crawl_event=PathSkippedEventArgs(crawler=self, path=entry_path,
+                                                                          is_dir=is_dir,
+                                                                          is_file=is_file,
+                                                                          size=path_size,
+                                                                          root_dir_path=context.root_dir))
+            else:
+                self._count_path_skipped(entry_path, is_dir=is_dir, is_file=is_file)
             logger.debug(f"Path '{entry_str}' skipped...")
             return path_size, files_in_directory
 
         # FIND mode: notify when path matches any of the notify_filters
         should_notify = not self._notify_filters
         for f in self._notify_filters:
-            if f.authorize(path=entry):
+            if f.authorize(record):
                 should_notify = True
-                logger.debug(f"should_notify set to True by {f} for path {entry}")
+                logger.debug(f"should_notify set to True by {f} for path {entry_str}")
                 break
 
-        if entry.is_file():
+        if is_file:
             logger.debug(f"Found file: '{entry_str}'")
-            if should_notify:
-                self.notify_processed_file(crawl_event=FileCrawledEventArgs(crawler=self, path=entry,
-                                                                            root_dir_path=root_dir,
+            if should_notify and batched and self._should_notify('directory_listed'):
+                if parent_frame.listing is None:
+                    parent_frame.listing = DirectoryListingEventArgs(crawler=self, path=parent_frame.path,
+                                                                     root_dir_path=context.root_dir,
+                                                                     root_category=context.category,
+                                                                     root_min_age=context.min_age,
+                                                                     root_target_table=context.target_table)
+                parent_frame.listing.add_file(name=record.name, size=path_size, mtime=entry_stat.st_mtime)
+            elif should_notify and self._should_notify('processed_file'):
+                self.notify_processed_file(crawl_event=FileCrawledEventArgs(crawler=self, path=entry_path,
+                                                                            root_dir_path=context.root_dir,
                                                                             size=path_size,
-                                                                            root_category=category,
-                                                                            root_min_age=min_age,
-                                                                            root_target_table=target_table))
-        elif entry.is_dir():
-            logger.debug(f"Found directory: '{entry_str}'")
-            dir_direct_children_files: List[str] = []
-            for dir_item in entry.iterdir():
-                if not dir_item.is_dir():
-                    dir_direct_children_files.append(dir_item.name)
-
-                sub_item_size, files_in_sub_directory = self.crawl_path(dir_item, root_dir, category, min_age, target_table)
-                path_size += sub_item_size
-                files_in_directory += files_in_sub_directory
-
-            logger.info(f"Crawled directory '{entry_str}', size: {format_file_size(path_size)}")
-            if should_notify:
-                self.notify_processed_directory(crawl_event=
-                                                DirectoryCrawledEventArgs(crawler=self, path=entry,
-                                                                          size=path_size,
-                                                                          files_in_dir=files_in_directory,
-                                                                          root_dir_path=root_dir,
-                                                                          file_names=dir_direct_children_files,
-                                                                          root_category=category,
-                                                                          root_min_age=min_age,
-                                                                          root_target_table=target_table))
-        # except Exception as ex:
-        #     logger.error(ex)
-        #     self._errored_paths[str(path)] = str(ex)
-        #     self.notify_crawl_error(crawl_event=CrawlErrorEventArgs(crawler=self, error=ex, path=path))
-        return path_size, files_in_directory
+                                                                            root_category=context.category,
+                                                                            root_min_age=context.min_age,
+                                                                            root_target_table=context.target_table,
+                                                                            stat=entry_stat))
+            elif should_notify:
+                self._count_processed_file(entry_path, size=path_size)
+            return path_size, files_in_directory
+
+        logger.debug(f"Found directory: '{entry_str}'")
+        # The entries of a pruned directory are still listed, to be skipped without being evaluated by the filters:
+        # its files keep counting in the size of the directory
+        pruning_filter = self._skip_filter_chain.first_rejecting_children(record)
+        if pruning_filter is not None:
+            logger.debug(f"Content of directory '{entry_str}' skipped by {pruning_filter.__class__.__name__}...")
+        return _DirectoryFrame(path=entry_path, depth=record.depth, should_notify=should_notify,
+                               pruned_by=pruning_filter)
+
+    def _list_directory(self, frame: _DirectoryFrame) -> List[os.DirEntry]:
+        self._memory_governor.wait_for_memory(should_stop=lambda: self.require_stop)
+        try:
+            with os.scandir(frame.path) as dir_entries:
+                return list(dir_entries)  # Do not keep file descriptors open while walking through sub-dirs
+        except OSError as ex:
+            self._path_error(path=frame.path, error=ex)
+        return []
+
+    def _crawl_path_parallel(self, root_frame: _DirectoryFrame, context: _CrawlContext) -> (int, int):
+        def list_directory(task: DirectoryTask) -> List[DirectoryTask]:
+            frame: _DirectoryFrame = task.payload
+            frame.children = self._list_directory(frame)
+            sub_dirs: List[DirectoryTask] = []
+            for child in frame.children:
+                visited = self._visit_entry(entry=child, found_path=Path(child.path), context=context,
+                                            parent_frame=frame)
+                if isinstance(visited, _DirectoryFrame):
+                    sub_dirs.append(DirectoryTask(path=child.path, parent=task, payload=visited))
+                else:
+                    task.size += visited[0]
+                    task.files_in_dir += visited[1]
+            self._flush_listing(frame=frame)  # No need to wait for the sub-directories
+            return sub_dirs
+
+        def complete_directory(task: DirectoryTask):
+            frame: _DirectoryFrame = task.payload
+            frame.size = task.size
+            frame.files_in_dir = task.files_in_dir
+            self._directory_crawled(frame=frame, context=context)
+
+        walker = WorkStealingWalker(nb_workers=self._nb_workers, list_directory=list_directory,
+                                    complete_directory=complete_directory, name="FileCrawler")
+        root_task = walker.walk(DirectoryTask(path=str(root_frame.path), payload=root_frame))
+        logger.debug(f"{walker.nb_stolen_tasks} directories stolen by idle workers")
+        return root_task.size, root_task.files_in_dir
+
+    def _flush_listing(self, frame: '_DirectoryFrame'):
+        if frame.listing is not None:
+            listing, frame.listing = frame.listing, None
+            self.notify_directory_listed(crawl_event=listing)
+
+    def _directory_crawled(self, frame: '_DirectoryFrame', context: '_CrawlContext'):
+        logger.info(f"Crawled directory '{frame.path}', size: {format_file_size(frame.size)}")
+        self._flush_listing(frame=frame)
+        if frame.should_notify and not self._should_notify('processed_directory'):
+            self._count_processed_directory(frame.path)
+        elif frame.should_notify:
+            dir_direct_children_files: List[str] = [c.name for c in frame.children if not c.is_dir()]
+            self.notify_processed_directory(crawl_event=
+                                            DirectoryCrawledEventArgs(crawler=self, path=frame.path,
+                                                                      size=frame.size,
+                                                                      files_in_dir=frame.files_in_dir,
+                                                                      root_dir_path=context.root_dir,
+                                                                      file_names=dir_direct_children_files,
+                                                                      root_category=context.category,
+                                                                      root_min_age=context.min_age,
+                                                                      root_target_table=context.target_table))
+
+    def _path_error(self, path: Path, error: Exception):
+        logger.error(f"Unable to crawl path '{path}': {error}")
+        with self._lock:
+            self._errored_paths[str(path)] = str(error)
+            self._nb_errored_paths += 1
+        if self._should_notify('crawl_error'):
+            self.notify_crawl_error(crawl_event=CrawlErrorEventArgs(crawler=self, error=error, path=path))
+
+    def to_stats(self) -> dict:
+        """
+        :return: the crawl statistics, as plain (picklable) values, to be merged with the statistics of other crawlers
+        """
+        return {
+            "paths_found": self.nb_paths_found,
+            "paths_skipped": self.nb_paths_skipped,
+            "files_processed": self.nb_files_processed,
+            "directories_processed": self.nb_directories_processed,
+            "crawled_paths": self.nb_crawled_paths,
+            "total_size": self.crawled_files_size,
+            "processed_files_size": self.processed_files_size,
+            "nb_errored_paths": self.nb_errored_paths,
+            "errored_paths": dict(self.errored_paths),
+            "nb_files_skipped": self.nb_files_skipped,
+            "nb_directories_skipped": self.nb_directories_skipped,
+            "filters_stats": self._skip_filter_chain.to_stats(),
+            "memory": self._memory_governor.to_stats()
+        }
 
     def to_json(self) -> dict:
         return {
@@ -0,0 +1,101 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+from typing import Callable, Dict, List, Tuple
+
+from loguru import logger
+
+from config import config
+from crawler.events.crawlerEventArgs import CrawlerEventArgs
+from crawler.observer_mailbox import ObserverMailbox
+from interfaces.iCrawlerObserver import ICrawlerObserver, CRAWLER_EVENTS
+
+
+class ObserverBus:
+    """
+    Dispatches the crawler events to the observers subscribed to them (see `ICrawlerObserver.subscribed_events`).
+    The subscribers of each event are resolved when an observer is added, so that publishing an event only calls the
+    observers actually handling it; and the crawler can tell with `has_subscribers` whether an event is worth being
+    built at all.
+    When asynchronous, each observer is notified from its own dispatcher thread (see `ObserverMailbox`): the crawl is
+    not slowed down by the observers, as long as their mailbox is not full.
+    """
+
+    def __init__(self, observers: List[ICrawlerObserver] = None, asynchronous: bool = False, mailbox_size: int = None,
+                 on_stop: Callable[[], None] = None) -> None:
+        """
+        :param observers: the observers to subscribe
+        :param asynchronous: whether the observers are notified from their own thread
+        :param mailbox_size: the number of events waiting for an asynchronous observer above which the publisher is
+        blocked (defaults to `CRAWLER_OBSERVERS_MAILBOX_SIZE`)
+        :param on_stop: called when an asynchronous observer asks to stop the crawl
+        """
+        super().__init__()
+        self.asynchronous: bool = asynchronous
+        self._mailbox_size: int = mailbox_size if mailbox_size else config.CRAWLER_OBSERVERS_MAILBOX_SIZE
+        self._on_stop = on_stop
+        self._observers: List[ICrawlerObserver] = []
+        self._mailboxes: List[ObserverMailbox] = []
+        self._subscribers: Dict[str, Tuple[Tuple[ICrawlerObserver, Callable, ObserverMailbox], ...]] = {}
+        for observer in observers or []:
+            self.subscribe(observer)
+
+    @property
+    def observers(self) -> List[ICrawlerObserver]:
+        return self._observers
+
+    @staticmethod
+    def get_subscribed_events(observer: ICrawlerObserver) -> frozenset:
+        events = set(getattr(observer, 'subscribed_events', CRAWLER_EVENTS))
+        unknown_events = events - CRAWLER_EVENTS
+        if unknown_events:
+            logger.warning(f"Observer '{observer.__class__.__name__}' subscribed to unknown events: {unknown_events}")
+        if 'processed_file' in events:
+            events.add('directory_listed')  # By default, the listings are notified as processed files
+        return frozenset(events & CRAWLER_EVENTS)
+
+    def subscribe(self, observer: ICrawlerObserver):
+        if observer in self._observers:
+            return
+        self._observers.append(observer)
+        mailbox = None
+        if self.asynchronous:
+            mailbox = ObserverMailbox(observer, max_size=self._mailbox_size, on_stop=self._on_stop)
+            self._mailboxes.append(mailbox)
+        for event_name in ObserverBus.get_subscribed_events(observer):
+            callback = getattr(observer, event_name)
+            self._subscribers[event_name] = self._subscribers.get(event_name, ()) + ((observer, callback, mailbox),)
+
+    def has_subscribers(self, event_name: str) -> bool:
+        return event_name in self._subscribers
+
+    def publish(self, event_name: str, crawl_event: CrawlerEventArgs) -> bool:
+        """
+        Notify the subscribers of the event, in the order they were added.
+        :return: whether a subscriber asked to stop the crawl (see `CrawlerEventArgs.should_stop`). The asynchronous
+        subscribers did not handle the event yet: they call `on_stop` instead.
+        """
+        for observer, callback, mailbox in self._subscribers.get(event_name, ()):
+            if mailbox is not None:
+                mailbox.post(callback, event_name, crawl_event)
+                continue
+            try:
+                callback(crawl_event)
+            except Exception as ex:
+                logger.error(f"Unable to notify observer '{observer}' for {event_name} event {crawl_event}: {ex}")
+        return crawl_event.should_stop
+
+    def close(self):
+        """
+        Wait for the asynchronous observers to handle all the published events.
+        """
+        for mailbox in self._mailboxes:
+            mailbox.close()
+
+    def to_json(self) -> dict:
+        json_dict = {event_name: [observer.__class__.__name__ for observer, _, _ in subscribers]
+                     for event_name, subscribers in sorted(self._subscribers.items())}
+        if self._mailboxes:
+            json_dict['mailboxes'] = {mailbox.observer.__class__.__name__: mailbox.to_json()
+                                      for mailbox in self._mailboxes}
+        return json_dict
@@ -0,0 +1,98 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+import threading
+import time
+from queue import Queue
+from typing import Callable
+
+from loguru import logger
+
+from crawler.events.crawlerEventArgs import CrawlerEventArgs
+from interfaces.iCrawlerObserver import ICrawlerObserver
+
+_CLOSE_MAILBOX = None  # Posted to the mailbox to end its dispatcher thread
+
+
+class ObserverMailbox:
+    """
+    The events of a single observer, notified from its own dispatcher thread instead of the crawling threads: a slow
+    observer only slows down the crawl once its (bounded) mailbox is full.
+    The events are notified in the order they were posted. As the crawler does not wait for the observer, an event
+    whose `should_stop` is set by the observer stops the crawl through `on_stop`.
+    """
+
+    def __init__(self, observer: ICrawlerObserver, max_size: int, on_stop: Callable[[], None] = None) -> None:
+        """
+        :param observer: the observer to notify
+        :param max_size: the number of events waiting in the mailbox above which the crawler is blocked
+        :param on_stop: called (from the dispatcher thread) when the observer asks to stop the crawl
+        """
+        super().__init__()
+        self.observer: ICrawlerObserver = observer
+        self._mailbox: Queue = Queue(maxsize=max(1, max_size))
+        self._on_stop = on_stop
+        self._dispatcher: threading.Thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.nb_posted_events: int = 0
+        self.max_depth: int = 0
+        self.blocked_time: float = 0.0  # Time the crawler spent waiting for the observer
+
+    def post(self, callback: Callable[[CrawlerEventArgs], None], event_name: str, crawl_event: CrawlerEventArgs):
+        """
+        Queue the event for the observer, waiting for a free slot if the mailbox is full.
+        """
+        if self._dispatcher is None:
+            self._start()
+        blocked_time = 0.0
+        if self._mailbox.full():
+            start = time.perf_counter()
+            self._mailbox.put((callback, event_name, crawl_event))
+            blocked_time = time.perf_counter() - start
+        else:
+            self._mailbox.put((callback, event_name, crawl_event))
+        depth = self._mailbox.qsize()
+        with self._stats_lock:  # Posted from several crawling workers
+            self.nb_posted_events += 1
+            self.blocked_time += blocked_time
+            if depth > self.max_depth:
+                self.max_depth = depth
+
+    def _start(self):
+        with self._start_lock:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, daemon=True,
+                                                    name=f"Observer - {self.observer.__class__.__name__}")
+                self._dispatcher.start()
+
+    def _dispatch(self):
+        while True:
+            message = self._mailbox.get()
+            if message is _CLOSE_MAILBOX:
+                return
+            callback, event_name, crawl_event = message
+            try:
+                callback(crawl_event)
+            except Exception as ex:
+                logger.error(f"Unable to notify observer '{self.observer}' for {event_name} event {crawl_event}: {ex}")
+            if crawl_event.should_stop and self._on_stop:
+                self._on_stop()
+
+    def close(self):
+        """
+        Wait for the observer to be notified of all the posted events, and end the dispatcher thread.
+        """
+        with self._start_lock:
+            dispatcher, self._dispatcher = self._dispatcher, None
+        if dispatcher is None:
+            return
+        self._mailbox.put(_CLOSE_MAILBOX)
+        dispatcher.join()
+
+    def to_json(self) -> dict:
+        return {
+            "posted_events": self.nb_posted_events,
+            "max_depth": self.max_depth,
+            "blocked_time": round(self.blocked_time, 3)
+        }
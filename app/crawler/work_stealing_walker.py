@@ -0,0 +1,141 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+import threading
+from collections import deque
+from typing import Callable, Deque, List
+
+from loguru import logger
+
+IDLE_WAIT_TIME = 0.05  # seconds an idle worker waits before looking for work to steal again
+
+
+class DirectoryTask:
+    """
+    A directory to be listed by the walker.
+    Once listed, the directory stays pending until all its sub-directories are completed: its size and number of files
+    then include the whole sub-tree and are added to the parent directory.
+    """
+    __slots__ = ('path', 'parent', 'payload', 'size', 'files_in_dir', 'pending')
+
+    def __init__(self, path: str, parent: 'DirectoryTask' = None, payload=None) -> None:
+        self.path: str = path
+        self.parent: DirectoryTask = parent
+        self.payload = payload  # Any crawler-specific data attached to the directory
+        self.size: int = 0
+        self.files_in_dir: int = 0
+        self.pending: int = 1  # The listing of the directory itself
+
+
+class WorkStealingWalker:
+    """
+    Walks through a directory tree using a pool of threads.
+    Each worker pushes the sub-directories it finds on its own deque and pops them back in LIFO order (depth-first),
+    idle workers steal the oldest directories from the other deques (breadth-first). Listing directories is bound to
+    I/O latency (network shares, SSD arrays), so the GIL is released most of the time.
+    """
+
+    def __init__(self, nb_workers: int,
+                 list_directory: Callable[[DirectoryTask], List[DirectoryTask]],
+                 complete_directory: Callable[[DirectoryTask], None],
+                 name: str = "Walker") -> None:
+        """
+        :param nb_workers: the number of threads listing directories concurrently
+        :param list_directory: lists the given directory: adds the size and number of its files to the task and
+        returns the sub-directories to walk through. Called concurrently from the worker threads.
+        :param complete_directory: called once a directory and all its sub-directories have been walked through.
+        Called concurrently from the worker threads.
+        :param name: prefix of the worker threads name
+        """
+        super().__init__()
+        if nb_workers < 1:
+            raise ValueError(f"At least one worker is required (got {nb_workers})")
+        self._nb_workers: int = nb_workers
+        self._list_directory = list_directory
+        self._complete_directory = complete_directory
+        self._name: str = name
+        self._deques: List[Deque[DirectoryTask]] = [deque() for _ in range(nb_workers)]
+        self._aggregation_lock = threading.Lock()
+        self._work_available = threading.Condition()
+        self._outstanding: int = 0  # Directories pushed but not listed yet
+        self.nb_stolen_tasks: int = 0
+
+    def walk(self, root: DirectoryTask) -> DirectoryTask:
+        """
+        Walk through the tree starting at the given root, and wait for all the directories to be completed.
+        :return: the root task, holding the size and number of files of the whole tree
+        """
+        self._outstanding = 1
+        self._deques[0].append(root)
+        workers = [threading.Thread(target=self._run_worker, args=(i,), name=f"{self._name} - worker {i}")
+                   for i in range(self._nb_workers)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return root
+
+    def _run_worker(self, index: int):
+        while True:
+            task = self._next_task(index)
+            if task is None:
+                with self._work_available:
+                    if self._outstanding <= 0:
+                        return
+                    if not any(self._deques):
+                        self._work_available.wait(timeout=IDLE_WAIT_TIME)
+                continue
+
+            sub_dirs: List[DirectoryTask] = []
+            try:
+                sub_dirs = self._list_directory(task) or []
+            except Exception as ex:
+                logger.error(f"Unable to list directory '{task.path}': {ex}")
+
+            if sub_dirs:
+                with self._aggregation_lock:
+                    task.pending += len(sub_dirs)
+                with self._work_available:
+                    self._outstanding += len(sub_dirs)
+                    self._deques[index].extend(sub_dirs)
+                    self._work_available.notify(len(sub_dirs))
+
+            self._task_done(task)
+            with self._work_available:
+                self._outstanding -= 1
+                if self._outstanding <= 0:
+                    self._work_available.notify_all()
+
+    def _next_task(self, index: int) -> DirectoryTask | None:
+        try:
+            return self._deques[index].pop()
+        except IndexError:
+            pass
+        for offset in range(1, self._nb_workers):
+            try:
+                task = self._deques[(index + offset) % self._nb_workers].popleft()
+                self.nb_stolen_tasks += 1
+                return task
+            except IndexError:
+                continue
+        return None
+
+    def _task_done(self, task: DirectoryTask):
+        """
+        Completion counting: the last sub-directory (or listing) to complete completes its parent directory.
+        """
+        while task is not None:
+            with self._aggregation_lock:
+                task.pending -= 1
+                if task.pending > 0:
+                    return
+            try:
+                self._complete_directory(task)
+            except Exception as ex:
+                logger.error(f"Unable to complete directory '{task.path}': {ex}")
+            parent = task.parent
+            if parent is not None:
+                with self._aggregation_lock:
+                    parent.size += task.size
+                    parent.files_in_dir += task.files_in_dir
+            task = parent
@@ -6,7 +6,6 @@ import sys
 import threading
 from datetime import datetime
 from pathlib import Path
-from queue import Queue
 from typing import List
 
 from loguru import logger
@@ -16,6 +15,7 @@ sys.path.append(root_folder)
 
 from helpers.filesize_helper import format_file_size
 from crawler.file_system_crawler import FileSystemCrawler
+from crawling_channel import CrawlingChannel
 from crawling_queue_consumer import CrawlingQueueConsumer
 from filters.path_pattern_filter import PatternFilter
 from interfaces.iFilter import IFilter
@@ -50,7 +50,7 @@ def process_path(roots: dict, skip_filters: List[IFilter] = [], notify_filters:
                  processors: List[IPathProcessor] = []) -> object:
     crawler = FileSystemCrawler(roots=roots, skip_filters=skip_filters, notify_filters=notify_filters)
 
-    crawling_queue: Queue = Queue()
+    crawling_queue: CrawlingChannel = CrawlingChannel()
     metricsObserver = MetricsObserver()
     crawler.add_observer(metricsObserver)
     crawler.add_observer(QueueObserver(crawling_queue=crawling_queue))
@@ -6,13 +6,10 @@ import re
 import sys
 import threading
 import time
-from datetime import datetime
-from queue import Queue
 from typing import List
 import platform
 
 from loguru import logger
-import xxhash
 
 from crawler.crawl_directory import crawl_directory
 from observers.empty_directory_observer import EmptyDirectoryObserver
@@ -22,11 +19,14 @@ sys.path.append(root_folder)
 
 from config import config
 from helpers.filesize_helper import format_file_size
+from crawl_coordinator import ShardedCrawlCoordinator
 from crawler.file_system_crawler import FileSystemCrawler
+from crawling_channel import CrawlingChannel
 from crawling_queue_consumer import CrawlingQueueConsumer
 from database.data_manager import PathDataManager
 from interfaces.iPathProcessor import IPathProcessor
 from observers.metrics_observer import MetricsObserver
+from observers.progress_observer import ProgressObserver
 from observers.queue_observer import QueueObserver
 from processors.hash_file_processor import HashFileProcessor
 from processors.metadata_extractor.extended_attributes_file_processor import ExtendedAttributesFileProcessor
@@ -52,18 +52,7 @@ if platform.system() == "Darwin":
 #     drives = []
 
 
-def main():
-    roots: dict = {
-        # Path, Root part from the mapped volume
-
-        # '/media/sa-nas/1ca37148-c9db-4660-b617-2d797356e44b/Applications/': {
-        #     'root': '/media/sa-nas/1ca37148-c9db-4660-b617-2d797356e44b/',
-        #     'category': ContentCategory.APP,
-        #     'min_age': ContentClassificationPegi.TWELVE_OR_MORE,
-        #     'target_table': 'path_apps'
-        # },
-
-    }
+def build_crawler(roots: dict) -> FileSystemCrawler:
     crawler = FileSystemCrawler(roots=roots)
     crawler.add_skip_filter(RegexPatternFilter(excluded_path_pattern=".*\.ino$"))
     directories_to_skip: List[str] = [".idea", ".Trashes", "out", ".idea_modules", "build", "dist", "lib", "venv.*",
@@ -99,27 +88,42 @@ def main():
     ))
     # crawler.add_skip_filter(ExtensionFilter(authorized_extensions=['avi', 'mpg', 'mpeg', 'flv', 'mp4', 'wmv']))
     # crawler.add_skip_filter(ExtensionFilter(authorized_extensions=['nfo', 'txt']))
+    return crawler
 
-    crawling_queue: Queue = Queue(maxsize=config.QUEUE_MAX_SIZE)
-    # crawler.add_observer(LoggingObserver())
-    crawler.add_observer(EmptyDirectoryObserver())
-    metricsObserver = MetricsObserver()
-    crawler.add_observer(metricsObserver)
-    crawler.add_observer(QueueObserver(crawling_queue=crawling_queue))
 
+def build_processors() -> List[IPathProcessor]:
     processors: List[IPathProcessor] = []
 
-    hash_algos = {}
-    # hash_algos['xxh32'] = xxhash.xxh32()      # 15 sec to hash 10 Go
-    hash_algos['xxh3_64'] = xxhash.xxh3_64()    # 15 sec to hash 10 Go
-    # hash_algos['md5'] = hashlib.md5()         # 22 sec to hash 10 Go
-    # hash_algos['sha256'] = hashlib.sha256()   # 28 sec to hash 10 Go - Avoids risk of collisions, but much slower
+    hash_algos: List[str] = []
+    # hash_algos.append('xxh32')                # 15 sec to hash 10 Go
+    hash_algos.append('xxh3_64')                # 15 sec to hash 10 Go
+    # hash_algos.append('md5')                  # 22 sec to hash 10 Go
+    # hash_algos.append('sha256')               # 28 sec to hash 10 Go - Avoids risk of collisions, but much slower
     processors.append(HashFileProcessor(hash_algorithms=hash_algos))
     processors.append(RatingFileProcessor())
     processors.append(KeywordsFileProcessor())
     processors.append(ExtendedAttributesFileProcessor())
     if platform.system() == "Darwin":
         processors.append(MacFinderTagsExtractorFileProcessor())
+    return processors
+
+
+def crawl_roots_shard(shard: dict, progress_queue) -> dict:
+    """
+    Crawl the roots of a single shard (see `ShardedCrawlCoordinator`), from its own process: filters, processors and
+    DB connection are not shared with the other shards.
+    """
+    crawler = build_crawler(roots=shard['roots'])
+
+    crawling_queue: CrawlingChannel = CrawlingChannel()
+    # crawler.add_observer(LoggingObserver())
+    crawler.add_observer(EmptyDirectoryObserver())
+    metricsObserver = MetricsObserver()
+    crawler.add_observer(metricsObserver)
+    crawler.add_observer(QueueObserver(crawling_queue=crawling_queue))
+    crawler.add_observer(ProgressObserver(progress_queue=progress_queue, shard_name=shard['name']))
+
+    processors: List[IPathProcessor] = build_processors()
 
     data_manager: PathDataManager = PathDataManager()  # Providing the data manager will persist processed paths into DB
     queue_consumer = CrawlingQueueConsumer(crawling_queue=crawling_queue,
@@ -136,10 +140,46 @@ def main():
     producer_thread.join()
     consumer_thread.join()
 
-    crawl_duration = datetime.now() - crawler.start_time
+    stats = crawler.to_stats()
+    stats['metrics'] = metricsObserver.to_stats()
+    stats['crawling_channel'] = crawling_queue.to_stats()
+    stats['consumer'] = queue_consumer.to_stats()
+    return stats
+
+
+def main(nb_processes: int = None):
+    """
+    :param nb_processes: how many roots are crawled at the same time, each one in its own process
+    (defaults to `CRAWLER_PROCESSES_COUNT`). Only worth it when the roots are located on different physical disks.
+    """
+    roots: dict = {
+        # Path, Root part from the mapped volume
+
+        # '/media/sa-nas/1ca37148-c9db-4660-b617-2d797356e44b/Applications/': {
+        #     'root': '/media/sa-nas/1ca37148-c9db-4660-b617-2d797356e44b/',
+        #     'category': ContentCategory.APP,
+        #     'min_age': ContentClassificationPegi.TWELVE_OR_MORE,
+        #     'target_table': 'path_apps'
+        # },
+
+    }
+    if not roots:
+        logger.warning("No root location found to be crawled!")
+        return
+    nb_processes = nb_processes if nb_processes else config.CRAWLER_PROCESSES_COUNT
+    if nb_processes > 1:
+        shards = [{'name': path, 'roots': {path: root}} for path, root in roots.items()]
+    else:
+        shards = [{'name': 'roots', 'roots': roots}]
+
+    coordinator = ShardedCrawlCoordinator(shards=shards, shard_runner=crawl_roots_shard, nb_processes=nb_processes)
+    stats = coordinator.run()
+
     logger.warning(
-        f"Crawled {len(crawler.files_processed)} files (total of {format_file_size(crawler.crawled_files_size)}) "
-        f"in {crawl_duration} sec")
+        f"Crawled {stats.get('files_processed', 0)} files (total of {format_file_size(stats.get('total_size', 0))}) "
+        f"in {stats['duration']:.2f} sec")
+    metricsObserver = MetricsObserver()
+    metricsObserver.merge_stats(stats.get('metrics', {}))
     metricsObserver.print_statistics()
 
 
@@ -0,0 +1,152 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+import time
+from queue import Queue, Empty, Full
+
+from config import config
+from memory_governor import MemoryGovernor
+
+END_OF_STREAM = object()  # Returned by `CrawlingChannel.get` once the channel is closed and drained
+
+
+class ChannelClosedError(Exception):
+    pass
+
+
+class CrawlingChannel(Queue):
+    """
+    The bounded queue between the crawler (`QueueObserver`) and the `CrawlingQueueConsumer`.
+    Both sides wait on condition variables instead of polling:
+     - once `high_watermark` items are queued, the producer is blocked until the consumer drains the channel down to
+       `low_watermark` items (so that it is not woken up for every single popped item),
+     - the consumer is woken up as soon as an item is put, and gets `END_OF_STREAM` once the channel is closed.
+    While the memory is under pressure (see `MemoryGovernor`), the producer is blocked from `pressure_watermark`
+    items instead.
+    The time each side spent blocked and the depth of the channel are measured (see `to_stats`).
+    """
+
+    def __init__(self, high_watermark: int = None, low_watermark: int = None,
+                 memory_governor: MemoryGovernor = None) -> None:
+        """
+        :param high_watermark: the number of queued items blocking the producer (defaults to `QUEUE_MAX_SIZE`)
+        :param low_watermark: the number of queued items releasing the producer (defaults to `QUEUE_MIN_SIZE`)
+        :param memory_governor: tells whether the memory is under pressure (defaults to the governor of the process)
+        """
+        super().__init__(maxsize=0)  # The watermarks replace the max size of the queue
+        self.high_watermark: int = max(1, high_watermark if high_watermark else config.QUEUE_MAX_SIZE)
+        self.low_watermark: int = min(self.high_watermark - 1, max(0, low_watermark if low_watermark is not None
+                                                                   else config.QUEUE_MIN_SIZE))
+        self.pressure_watermark: int = max(self.low_watermark + 1,
+                                           min(self.high_watermark, config.MEMORY_PRESSURE_QUEUE_SIZE))
+        self._memory_governor: MemoryGovernor = memory_governor if memory_governor else MemoryGovernor.shared()
+        self._memory_governor.watch(self)  # The traversal is not paused once the channel is drained
+        self._saturated: bool = False
+        self._closed: bool = False
+        self.nb_put_items: int = 0
+        self.nb_got_items: int = 0
+        self.max_depth: int = 0
+        self._total_depth: int = 0  # Sum of the depths seen by the producer, for the average
+        self.nb_producer_waits: int = 0
+        self.nb_pressure_waits: int = 0  # Producer blocked below the high watermark, as the memory is under pressure
+        self.producer_blocked_time: float = 0.0
+        self.nb_consumer_waits: int = 0
+        self.consumer_blocked_time: float = 0.0
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def put(self, item, block: bool = True, timeout: float = None):
+        """
+        Queue an item, waiting for the consumer to drain the channel down to the low watermark if it is saturated.
+        :raise Full: if the channel is still saturated after `timeout` seconds
+        :raise ChannelClosedError: if the channel is (or gets) closed
+        """
+        with self.not_full:
+            if not self._closed and not self._saturated:
+                depth = self._qsize()
+                if depth >= self.high_watermark:
+                    self._saturated = True
+                elif depth >= self.pressure_watermark and self._memory_governor.under_pressure:
+                    self._saturated = True
+                    self.nb_pressure_waits += 1
+            if self._saturated and not self._closed:
+                if not block:
+                    raise Full
+                self.nb_producer_waits += 1
+                start = time.perf_counter()
+                deadline = start + timeout if timeout is not None else None
+                while self._saturated and not self._closed:
+                    remaining = deadline - time.perf_counter() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        self.producer_blocked_time += time.perf_counter() - start
+                        raise Full
+                    self.not_full.wait(remaining)
+                self.producer_blocked_time += time.perf_counter() - start
+            if self._closed:
+                raise ChannelClosedError("Unable to put an item into a closed channel")
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.nb_put_items += 1
+            depth = self._qsize()
+            self._total_depth += depth
+            if depth > self.max_depth:
+                self.max_depth = depth
+            self.not_empty.notify()
+
+    def get(self, block: bool = True, timeout: float = None):
+        """
+        :return: the next item, or `END_OF_STREAM` once the channel is closed and every item has been got
+        :raise Empty: if no item came within `timeout` seconds
+        """
+        with self.not_empty:
+            if not self._qsize() and not self._closed:
+                if not block:
+                    raise Empty
+                self.nb_consumer_waits += 1
+                start = time.perf_counter()
+                deadline = start + timeout if timeout is not None else None
+                while not self._qsize() and not self._closed:
+                    remaining = deadline - time.perf_counter() if deadline is not None else None
+                    if remaining is not None and remaining <= 0:
+                        self.consumer_blocked_time += time.perf_counter() - start
+                        raise Empty
+                    self.not_empty.wait(remaining)
+                self.consumer_blocked_time += time.perf_counter() - start
+            if not self._qsize():
+                return END_OF_STREAM
+            item = self._get()
+            self.nb_got_items += 1
+            if self._saturated and self._qsize() <= self.low_watermark:
+                self._saturated = False
+                self.not_full.notify_all()
+            return item
+
+    def close(self):
+        """
+        Mark the end of the stream: the consumer gets the remaining items then `END_OF_STREAM`, and the producer can
+        not put any more items (a blocked producer is released with a `ChannelClosedError`).
+        """
+        with self.mutex:
+            self._closed = True
+            self.not_empty.notify_all()
+            self.not_full.notify_all()
+
+    def to_stats(self) -> dict:
+        with self.mutex:
+            return {
+                "put_items": self.nb_put_items,
+                "got_items": self.nb_got_items,
+                "depth": self._qsize(),
+                "max_depth": self.max_depth,
+                "average_depth": round(self._total_depth / self.nb_put_items, 1) if self.nb_put_items else 0,
+                "high_watermark": self.high_watermark,
+                "pressure_watermark": self.pressure_watermark,
+                "low_watermark": self.low_watermark,
+                "producer_waits": self.nb_producer_waits,
+                "pressure_waits": self.nb_pressure_waits,
+                "producer_blocked_time": round(self.producer_blocked_time, 3),
+                "consumer_waits": self.nb_consumer_waits,
+                "consumer_blocked_time": round(self.consumer_blocked_time, 3)
+            }
@@ -1,41 +1,57 @@
 #  Copyright (c) 2023. Manuel LANG
 #  Software under GNU AGPLv3 licence
 import threading
-import time
-from concurrent.futures import ThreadPoolExecutor, as_completed, Future
-from queue import Queue
-from threading import Lock
+from concurrent.futures import ThreadPoolExecutor, Future
+from queue import Empty
 from typing import List, Dict
 
 from loguru import logger
 
+from compute_pool import ComputePool
+from concurrency_controller import ConcurrencyController
 from config import config
 from helpers.filesize_helper import format_file_size
 from crawler.events.crawlCompletedEventArgs import CrawlCompletedEventArgs
 from crawler.events.crawlStoppedEventArgs import CrawlStoppedEventArgs
 from crawler.events.crawlerEventArgs import CrawlerEventArgs
 from crawler.events.directoryCrawledEventArgs import DirectoryCrawledEventArgs
+from crawler.events.directoryListingEventArgs import DirectoryListingEventArgs
 from crawler.events.fileCrawledEventArgs import FileCrawledEventArgs
 from crawler.events.pathEventArgs import PathEventArgs
+from crawling_channel import CrawlingChannel, END_OF_STREAM
 from database.data_manager import PathDataManager
+from database.known_paths_cache import KnownPathsCache
+from database.write_behind_path_writer import WriteBehindPathWriter
 from interfaces.iCrawlingQueueConsumer import ICrawlingQueueConsumer
 from interfaces.iPathProcessor import IPathProcessor
 from models.directory import DirectoryModel
 from models.file import FileModel
+from models.known_path import KnownPath
 from models.path import PathModel
-from models.path_type import PathType
+from processing_pipeline import ProcessingPipeline
 
 
 class CrawlingQueueConsumer(ICrawlingQueueConsumer):
 
-    def __init__(self, crawling_queue: Queue, path_processors: List[IPathProcessor] = [],
-                 data_manager: PathDataManager = None, update_existing_paths: bool = False) -> None:
+    def __init__(self, crawling_queue: CrawlingChannel, path_processors: List[IPathProcessor] = [],
+                 data_manager: PathDataManager = None, update_existing_paths: bool = False,
+                 nb_workers: int = None, max_pending_tasks: int = None, nb_processes: int = None,
+                 use_pipeline: bool = None) -> None:
         """
 
         :param crawling_queue:
         :param path_processors:
         :param data_manager:
-        :param update_existing_paths: if
+        :param update_existing_paths: if False, the paths already saved into DB and unchanged since are not processed
+        again (the saved paths are prefetched directory by directory, see `KnownPathsCache`)
+        :param nb_workers: the number of paths processed concurrently (defaults to `CONSUMER_WORKERS_COUNT`): the
+        initial one when the concurrency is adaptive (see `ConcurrencyController`)
+        :param max_pending_tasks: the number of tasks submitted and not completed yet above which the consumer stops
+        popping items from the queue (defaults to `CONSUMER_MAX_PENDING_TASKS`)
+        :param nb_processes: the number of processes running the `compute` of the `cpu_bound` processors (defaults to
+        `CONSUMER_PROCESSES_COUNT`, or the number of cores). See `ComputePool`.
+        :param use_pipeline: hand the paths over to a `ProcessingPipeline` (one stage per `PathStage` of the
+        processors) instead of running all the processors within one task (defaults to `CONSUMER_USE_PIPELINE`)
         """
         super().__init__()
         if crawling_queue is None:
@@ -49,13 +65,28 @@ class CrawlingQueueConsumer(ICrawlingQueueConsumer):
         self._errored_paths: Dict[str, str] = {}
         self.data_manager = data_manager
         self._force_refresh = update_existing_paths
+        self._known_paths: KnownPathsCache = KnownPathsCache(data_manager) \
+            if data_manager and not update_existing_paths else None
         self.nb_processed_paths_count = 0
         self.nb_updated_paths_count = 0
         self.processed_files_size = 0
+        self._counters_lock = threading.Lock()  # The counters are updated from the workers (and pipeline stages)
         self.nb_running_threads: int = 0
         self.nb_completed_threads: int = 0
         self.nb_popped_items: int = 0
         self.nb_crawled_paths: int = 0
+        self.nb_workers: int = max(1, nb_workers if nb_workers else config.CONSUMER_WORKERS_COUNT)
+        self._concurrency: ConcurrencyController = ConcurrencyController("Consumer", initial_limit=self.nb_workers)
+        self.max_pending_tasks: int = max(self._concurrency.max_limit, max_pending_tasks if max_pending_tasks
+                                          else config.CONSUMER_MAX_PENDING_TASKS)
+        self._pending_tasks: threading.BoundedSemaphore = None  # Taken on submit, released when the task is done
+        self._tasks_done: threading.Condition = threading.Condition()  # Guards the running/completed counters
+        self._use_pipeline: bool = config.CONSUMER_USE_PIPELINE if use_pipeline is None else use_pipeline
+        self._pipeline: ProcessingPipeline = None
+        self._pipeline_stats: dict = None
+        self._compute_pool: ComputePool = ComputePool(path_processors, nb_processes=nb_processes)
+        self._path_writer: WriteBehindPathWriter = None  # Saves the processed paths, from its own thread
+        self._path_writer_stats: dict = None
 
     @property
     def processed_files(self) -> List[FileModel]:
@@ -74,26 +105,25 @@ class CrawlingQueueConsumer(ICrawlingQueueConsumer):
         self._should_stop = value
 
     def pop_item(self) -> CrawlerEventArgs:
+        """
+        :return: the next crawl event, waiting for the crawler to queue one as long as needed, or None once the crawl
+        is over (end of stream), or the consumer is stopped. A crawler may stay silent for a long time (e.g. walking
+        through a huge directory, or paused by the memory governor): the channel is only polled every
+        `QUEUE_WAIT_TIME` seconds to check whether the consumer was stopped meanwhile.
+        """
         item: CrawlerEventArgs = None
-        max_retries = config.QUEUE_WAIT_TIME
         try:
-            while self._crawling_queue.empty():
-                if self.should_stop:
-                    break
-                max_retries -= 1
-                if max_retries <= 0:
-                    self._should_stop = True
-                    logger.warning("No more items coming into queue. Still processing popped items... "
-                                   f"({self.nb_running_threads} running tasks)")
-                    if item and item.crawler:
-                        logger.success(f"Crawled {item.crawler.nb_files_processed} files and {item.crawler.nb_directories_processed} directories")
+            while True:
+                try:
+                    item = self._crawling_queue.get(timeout=config.QUEUE_WAIT_TIME)
                     break
-                logger.info(f"Queue emtpy, waiting for the files to be processed. "
-                            f"{max_retries} retry left...")
-                time.sleep(1)  # Wait for some data to come in
-
-            if not self._crawling_queue.empty():
-                item = self._crawling_queue.get()
+                except Empty:
+                    if self._should_stop:
+                        return None
+                    logger.info(f"No item came into queue for {config.QUEUE_WAIT_TIME} seconds, still waiting for "
+                                f"the crawler... ({self.nb_running_threads} running tasks)")
+            if item is END_OF_STREAM:
+                return None
         except Exception as ex:
             logger.error(f"Error while popping item '{item}' from queue for processing: {ex}")
             # stops the process
@@ -107,37 +137,13 @@ class CrawlingQueueConsumer(ICrawlingQueueConsumer):
         try:
             logger.debug(f"Processing {path_model.path_type.name} '{crawl_event.path}'... ({self.nb_running_threads} running tasks)")
 
-            path_need_update: bool = True
-            if not self._force_refresh and self.data_manager:
-                path: PathModel = self.data_manager.get_path(path=path_model.full_path)
-                if path and path == path_model:
-                    path_need_update = False  # Path exists and size still the same: nothing has changed
-                    logger.debug(f"Path already saved into DB: '{path_model.full_path}'. Skipping")
-            if path_need_update:
-                for processor in self._path_processors:
-                    if processor.processor_type.name == path_model.path_type.name or processor.processor_type.name == PathType.ALL.name:
-                        try:
-                            logger.debug(f"\tRunning {processor.__class__.__name__}...")
-                            processor.process_path(crawl_event=crawl_event, path_model=path_model)
-                            logger.debug(f"\tDone processing  '{path_model.full_path}' with {processor.__class__.__name__}!")
-                        except Exception as ex:
-                            self._errored_paths[str(crawl_event.path)] = str(ex)
-                            logger.error(f"Unable to process {path_model.path_type} '{path_model.full_path}' "
-                                         f"({processor.__class__.__name__}): {ex}")
-                self.nb_processed_paths_count += 1
-                self.processed_files_size += crawl_event.size
-                if self.data_manager:
-                    if path_model.mime_type == 'inode/x-empty' and path_model.size == 0:
-                        logger.debug(f"Skipping empty path '{path_model.full_path}' because it is empty")
-                    else:
-                        self.data_manager.save_path(path_model=path_model)
-                        self.nb_updated_paths_count += 1
-                        if config.LOGGING_LEVEL <= config.LOG_LEVEL_INFO:
-                            logger.info(f"Done saving path '{path_model.full_path}' into DB ({format_file_size(path_model.size)})")
-                        else:
-                            print(":", end="")  # Show progress indicator
+            if self._path_need_update(path_model):
+                if self._pipeline is not None:
+                    self._pipeline.submit(crawl_event=crawl_event, path_model=path_model)  # Saved stage after stage
                 else:
-                    logger.debug(f"Path not saved in DB (data_manager is None): {path_model.relative_path}")
+                    self._run_processors(crawl_event=crawl_event, path_model=path_model)
+                    self._save_path_model(path_model)
+                self._count_processed_path(crawl_event.size)
 
             if self.nb_completed_threads % 200 == 0 and self.nb_completed_threads > 0:
                 if config.LOGGING_LEVEL >= config.LOG_LEVEL_WARNING:
@@ -148,10 +154,147 @@ class CrawlingQueueConsumer(ICrawlingQueueConsumer):
             logger.error(f"Error while processing path '{crawl_event.path}': {exc}", exc)
         return path_model
 
+    def _run_processors(self, crawl_event: PathEventArgs, path_model: PathModel):
+        for processor in self._path_processors:
+            if not processor.applies_to(path_model):
+                continue
+            try:
+                logger.debug(f"\tRunning {processor.__class__.__name__}...")
+                if self._compute_pool.runs(processor):
+                    self._compute_pool.process(processor, path_model)
+                else:
+                    processor.process_path(crawl_event=crawl_event, path_model=path_model)
+                logger.debug(f"\tDone processing  '{path_model.full_path}' with {processor.__class__.__name__}!")
+            except Exception as ex:
+                self._errored_paths[str(crawl_event.path)] = str(ex)
+                logger.error(f"Unable to process {path_model.path_type} '{path_model.full_path}' "
+                             f"({processor.__class__.__name__}): {ex}")
+
+    def _process_listing(self, crawl_event: DirectoryListingEventArgs) -> List[PathModel]:
+        try:
+            logger.debug(f"Processing {len(crawl_event)} files listed in '{crawl_event.path}'... "
+                         f"({self.nb_running_threads} running tasks)")
+            path_models: List[PathModel] = crawl_event.path_models()
+            if self._known_paths is not None:  # A single query for the whole listing
+                known_paths: Dict[str, KnownPath] = self._known_paths.prefetch([p.full_path for p in path_models])
+                path_models = [path_model for path_model in path_models
+                               if self._path_need_update(path_model, known_path=known_paths.get(path_model.full_path))]
+            if not path_models:
+                return path_models
+            if self._pipeline is not None:
+                self._submit_listing(crawl_event, path_models)
+                return path_models
+            for processor in self._path_processors:
+                processed_models = [path_model for path_model in path_models if processor.applies_to(path_model)]
+                if not processed_models:
+                    continue
+                logger.debug(f"\tRunning {processor.__class__.__name__} on {len(processed_models)} files...")
+                if self._compute_pool.runs(processor):
+                    errors = self._compute_pool.process_batch(processor, processed_models)
+                else:
+                    errors = processor.process_batch(crawl_event=crawl_event, path_models=processed_models)
+                if errors:
+                    self._errored_paths.update(errors)
+            for path_model in path_models:
+                self._count_processed_path(path_model.size)
+                self._save_path_model(path_model)
+            logger.debug(f"Done processing {len(path_models)} files listed in '{crawl_event.path}'")
+            return path_models
+        except Exception as exc:
+            logger.error(f"Error while processing the files listed in '{crawl_event.path}': {exc}", exc)
+            return []
+
+    def _submit_listing(self, crawl_event: DirectoryListingEventArgs, path_models: List[PathModel]):
+        listing_indexes: Dict[str, int] = {crawl_event.full_path(i): i for i in range(len(crawl_event))}
+        for path_model in path_models:
+            file_event = crawl_event.file_event(listing_indexes[path_model.full_path], path_model=path_model)
+            self._pipeline.submit(crawl_event=file_event, path_model=path_model)
+            self._count_processed_path(path_model.size)
+
+    def _count_processed_path(self, size: int):
+        with self._counters_lock:
+            self.nb_processed_paths_count += 1
+            self.processed_files_size += size or 0
+
+    def _path_need_update(self, path_model: PathModel, known_path: KnownPath = None) -> bool:
+        """
+        :param known_path: the saved path, if already fetched (otherwise, it is looked up in the `KnownPathsCache`)
+        """
+        if self._known_paths is not None:
+            if known_path is None:
+                known_path = self._known_paths.get(path_model.full_path)
+            if known_path and known_path.matches(path_model):
+                logger.debug(f"Path already saved into DB: '{path_model.full_path}'. Skipping")
+                return False  # Path exists and size still the same: nothing has changed
+        return True
+
+    def _save_path_model(self, path_model: PathModel):
+        if self.data_manager:
+            if path_model.mime_type == 'inode/x-empty' and path_model.size == 0:
+                logger.debug(f"Skipping empty path '{path_model.full_path}' because it is empty")
+            else:
+                self._path_writer.add_path_model(path_model)
+                with self._counters_lock:
+                    self.nb_updated_paths_count += 1
+                logger.info(f"Queued path '{path_model.full_path}' for saving into DB ({format_file_size(path_model.size)})")
+        else:
+            logger.debug(f"Path not saved in DB (data_manager is None): {path_model.relative_path}")
+
+    def _submit(self, executor: ThreadPoolExecutor, fn, *args) -> bool:
+        """
+        Submit a task, once the number of pending tasks is below the high-water mark (`max_pending_tasks`).
+        :return: False if the consumer was stopped while waiting
+        """
+        while not self._pending_tasks.acquire(timeout=1):
+            if self._should_stop:
+                return False
+            logger.debug(f"Waiting for some of the {self.nb_running_threads} tasks to complete...")
+        with self._tasks_done:
+            self.nb_running_threads += 1
+        try:
+            future: Future = executor.submit(self._run_task, fn, *args)
+        except Exception:
+            self._task_done(None)
+            raise
+        future.add_done_callback(self._task_done)  # The future is not kept: nothing grows with the number of tasks
+        self.nb_popped_items += 1
+        return True
+
+    def _run_task(self, fn, *args):
+        """
+        Run the task once the concurrency controller lets it, and report the paths it processed.
+        """
+        start = self._concurrency.acquire()
+        result = None
+        try:
+            result = fn(*args)
+            return result
+        finally:
+            path_models: List[PathModel] = result if isinstance(result, list) else [result] if result else []
+            self._concurrency.release(start, nb_items=len(path_models),
+                                      nb_bytes=sum(path_model.size or 0 for path_model in path_models))
+
+    def _task_done(self, future: Future | None):
+        with self._tasks_done:
+            self.nb_running_threads -= 1
+            self.nb_completed_threads += 1
+            if self.nb_running_threads == 0:
+                self._tasks_done.notify_all()
+        self._pending_tasks.release()
+
     def start(self):
         self._in_progress = True
-        futures = []
-        with ThreadPoolExecutor(max_workers=1000) as executor:
+        self._pending_tasks = threading.BoundedSemaphore(self.max_pending_tasks)
+        if self.data_manager:
+            self._path_writer = WriteBehindPathWriter(data_manager=self.data_manager)
+            self._path_writer.start()
+        if self._use_pipeline and self._path_processors:
+            self._pipeline = ProcessingPipeline.from_processors(self._path_processors, save_path=self._save_path_model)
+            self._pipeline.start()
+        else:
+            self._compute_pool.start()
+        # The threads beyond the current limit of the concurrency controller wait for it to grow
+        with ThreadPoolExecutor(max_workers=self._concurrency.max_limit, thread_name_prefix="Consumer") as executor:
             while True:
                 if self._should_stop:
                     logger.error(f"Stopping current session... Remaining tasks: {self.nb_running_threads}")
@@ -164,40 +307,58 @@ class CrawlingQueueConsumer(ICrawlingQueueConsumer):
                     self._should_stop = True
                     break
 
-                if crawl_event.__class__.__name__ != FileCrawledEventArgs.__name__ and crawl_event.__class__.__name__ != DirectoryCrawledEventArgs.__name__:
+                is_listing = crawl_event.__class__.__name__ == DirectoryListingEventArgs.__name__
+                if not is_listing and crawl_event.__class__.__name__ != FileCrawledEventArgs.__name__ and crawl_event.__class__.__name__ != DirectoryCrawledEventArgs.__name__:
                     logger.debug(f"Not a crawled path event: {crawl_event.__class__.__name__}")
                     continue
-                path_model = crawl_event.path_model
-
-                self.nb_running_threads, self.nb_completed_threads = running_thread_count(futures)
-                logger.debug(f"Waiting for {self.nb_running_threads} tasks to complete...")
-                if self.nb_running_threads > 10000:
-                    while self.nb_running_threads > 1000:
-                        time.sleep(5)
-                        self.nb_running_threads, self.nb_completed_threads = running_thread_count(futures)
-                        logger.success(f"Waiting for {self.nb_running_threads} tasks to complete...")
-                futures.append(executor.submit(self._process_path, crawl_event, path_model))
-                self.nb_popped_items = len(futures)
-
-            self.nb_running_threads, self.nb_completed_threads = running_thread_count(futures)
+
+                if is_listing:
+                    submitted = self._submit(executor, self._process_listing, crawl_event)
+                else:
+                    submitted = self._submit(executor, self._process_path, crawl_event, crawl_event.path_model)
+                if not submitted:
+                    break
+            self._crawling_queue.close()  # End of stream or stop: releases a crawler blocked on a saturated channel
+
             logger.success(f"Done pulling all tasks: waiting for {self.nb_running_threads} tasks to complete...")
-            while self.nb_running_threads > 0:
-                time.sleep(5)
-                self.nb_running_threads, self.nb_completed_threads = running_thread_count(futures)
-                logger.success(f"Waiting for current tasks to complete... Running: {self.nb_running_threads} - Completed: {self.nb_completed_threads}/{self.nb_popped_items}")
+            with self._tasks_done:
+                while self.nb_running_threads > 0:
+                    self._tasks_done.wait(timeout=5)
+                    logger.success(f"Waiting for current tasks to complete... Running: {self.nb_running_threads} - Completed: {self.nb_completed_threads}/{self.nb_popped_items}")
 
+        if self._pipeline is not None:
+            logger.success("Waiting for the processing pipeline to complete...")
+            self._pipeline.close()
+            self._errored_paths.update(self._pipeline.errored_paths)
+            self._pipeline_stats = self._pipeline.to_stats()
+            logger.info(f"Processing pipeline: {self._pipeline_stats}")
+            self._pipeline = None
+        self._compute_pool.shutdown()
+        if self._path_writer is not None:
+            logger.success("Waiting for the processed paths to be saved into DB...")
+            self._path_writer.close()
+            self._path_writer_stats = self._path_writer.to_stats()
+            logger.info(f"DB writes: {self._path_writer_stats}")
         self._in_progress = False
-        # for future in as_completed(futures):
-        #     path_model = future.result()
         logger.success(f"Processing files completed! Processed {len(self.processed_files)} files")
+        logger.info(f"Crawling channel: {self._crawling_queue.to_stats()}")
+        logger.info(f"Consumer concurrency: {self._concurrency.to_stats()}")
+        if self._known_paths is not None:
+            logger.info(f"Known paths: {self._known_paths.to_stats()}")
 
-
-def running_thread_count(futures: List[Future]):
-    running: int = 0
-    completed: int = 0
-    for future in futures:
-        if future.running():
-            running += 1
-        elif future.done():
-            completed += 1
-    return running, completed
+    def to_stats(self) -> dict:
+        with self._counters_lock:
+            nb_processed_paths, processed_size = self.nb_processed_paths_count, self.processed_files_size
+        stats = {
+            "processed_paths": nb_processed_paths,
+            "processed_size": processed_size,
+            "errored_paths": len(self._errored_paths),
+            "concurrency": self._concurrency.to_stats()
+        }
+        if self._pipeline_stats is not None:
+            stats["pipeline"] = self._pipeline_stats
+        if self._path_writer_stats is not None:
+            stats["path_writer"] = self._path_writer_stats
+        if self._known_paths is not None:
+            stats["known_paths"] = self._known_paths.to_stats()
+        return stats
@@ -0,0 +1,159 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+import threading
+import time
+from typing import Dict, List, Tuple
+
+from loguru import logger
+
+from config import config
+from database.data_manager import PathDataManager
+from models.content import ContentCategory, ContentClassificationPegi
+from models.path import PathModel
+from models.path_stage import PathStage
+
+
+class BulkPathWriter:
+    """
+    Buffers the paths to be saved, and upserts them by batches (multi-row `INSERT ... VALUES ... ON CONFLICT`, see
+    `PathDataManager.save_crawled_path_rows`) instead of one statement and one round-trip per path.
+    A batch is written once `batch_size` paths are buffered, or once `flush_interval` seconds elapsed since the last
+    write (checked when adding a path): call `flush` (or `close`) to write the remaining paths.
+    A path added several times before being written is only written once, with its last values.
+    A batch failing as a whole is written again by halves, each within its own transaction, so that only the paths
+    really failing (i.e. a row breaking a constraint) are lost.
+    The writer can be shared by several threads: the batches are written in the order they were filled.
+    """
+
+    def __init__(self, data_manager: PathDataManager, batch_size: int = None, flush_interval: float = None) -> None:
+        """
+        :param data_manager: the data manager writing the batches
+        :param batch_size: the number of buffered paths triggering a write (defaults to `PATH_WRITER_BATCH_SIZE`)
+        :param flush_interval: the seconds after which the buffered paths are written, even if the batch is not full
+        (defaults to `PATH_WRITER_FLUSH_INTERVAL`)
+        """
+        super().__init__()
+        if data_manager is None:
+            raise ValueError("Please provide the data manager writing the paths")
+        self.data_manager: PathDataManager = data_manager
+        self.batch_size: int = max(1, batch_size if batch_size else config.PATH_WRITER_BATCH_SIZE)
+        self.flush_interval: float = flush_interval if flush_interval else config.PATH_WRITER_FLUSH_INTERVAL
+        self._lock = threading.Lock()  # Protects the buffers
+        self._flush_lock = threading.Lock()  # Writes the batches one at a time, in order
+        self._crawled_rows: Dict[str, tuple] = {}  # <path, row>: see `PathDataManager.crawled_path_row`
+        self._path_rows: Dict[str, tuple] = {}  # <path, row>: see `PathDataManager.path_row`
+        self._last_flush_time: float = time.monotonic()
+        self.nb_added_paths: int = 0
+        self.nb_written_paths: int = 0
+        self.nb_failed_paths: int = 0
+        self.nb_batches: int = 0
+        self.nb_retried_batches: int = 0
+        self.write_time: float = 0.0
+
+    def __enter__(self) -> 'BulkPathWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def nb_buffered_paths(self) -> int:
+        return len(self._crawled_rows) + len(self._path_rows)
+
+    def add_crawled_path(self, full_path: str, extension: str | None, name: str, is_dir: bool,
+                         files_in_dir: int | None, size: int | None, stage: PathStage, category: ContentCategory,
+                         min_age: ContentClassificationPegi):
+        """
+        Buffer a path found by a crawler (see `PathDataManager._save_path`).
+        """
+        row = PathDataManager.crawled_path_row(full_path=full_path, extension=extension, name=name, is_dir=is_dir,
+                                               files_in_dir=files_in_dir, size=size, stage=stage, category=category,
+                                               min_age=min_age)
+        self._buffer(full_path, row, crawled=True)
+
+    def add_path_model(self, path_model: PathModel):
+        """
+        Buffer a processed path (see `PathDataManager.save_path`).
+        """
+        row = PathDataManager.path_row(path_model)
+        self._buffer(path_model.full_path, row, crawled=False)
+
+    def _buffer(self, full_path: str, row: tuple, crawled: bool):
+        with self._lock:
+            if crawled:
+                self._crawled_rows[full_path] = row
+            else:
+                self._path_rows[full_path] = row
+            self.nb_added_paths += 1
+        self._flush_if_needed()
+
+    def _flush_if_needed(self):
+        if self.nb_buffered_paths >= self.batch_size \
+                or time.monotonic() - self._last_flush_time >= self.flush_interval:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Write all the buffered paths, within a single transaction (or several ones, if it fails).
+        :return: the number of paths written
+        """
+        with self._flush_lock:
+            with self._lock:
+                crawled_rows, self._crawled_rows = self._crawled_rows, {}
+                path_rows, self._path_rows = self._path_rows, {}
+                self._last_flush_time = time.monotonic()
+            rows = [(True, row) for row in crawled_rows.values()] + [(False, row) for row in path_rows.values()]
+            if not rows:
+                return 0
+            start = time.perf_counter()
+            try:
+                nb_written_rows = self._write_rows(rows)
+            finally:
+                self.write_time += time.perf_counter() - start
+            self.nb_written_paths += nb_written_rows
+            return nb_written_rows
+
+    def _write_rows(self, rows: List[Tuple[bool, tuple]]) -> int:
+        """
+        Write the given rows within a single transaction, or by halves if it fails.
+        :param rows: the rows to write, as <crawled, row>
+        :return: the number of rows written
+        """
+        try:
+            with self.data_manager.cursor() as cursor:
+                self.data_manager.save_crawled_path_rows(cursor=cursor, rows=[row for crawled, row in rows if crawled],
+                                                         page_size=self.batch_size)
+                self.data_manager.save_path_rows(cursor=cursor, rows=[row for crawled, row in rows if not crawled],
+                                                 page_size=self.batch_size)
+        except Exception as ex:
+            if len(rows) == 1:
+                self.nb_failed_paths += 1
+                logger.error(f"Unable to save path '{rows[0][1][0]}' into DB: {ex}")
+                return 0
+            logger.warning(f"Unable to save {len(rows)} paths into DB ({ex}): saving them by halves...")
+            self.nb_retried_batches += 1
+            middle = len(rows) // 2
+            return self._write_rows(rows[:middle]) + self._write_rows(rows[middle:])
+        self.nb_batches += 1
+        return len(rows)
+
+    def close(self):
+        """
+        Write the remaining buffered paths.
+        """
+        self.flush()
+
+    def to_stats(self) -> dict:
+        return {
+            "batch_size": self.batch_size,
+            "flush_interval": self.flush_interval,
+            "added_paths": self.nb_added_paths,
+            "written_paths": self.nb_written_paths,
+            "failed_paths": self.nb_failed_paths,
+            "buffered_paths": self.nb_buffered_paths,
+            "batches": self.nb_batches,
+            "retried_batches": self.nb_retried_batches,
+            "write_time": round(self.write_time, 3),
+            "average_batch_size": round(self.nb_written_paths / self.nb_batches, 1) if self.nb_batches else 0
+        }
@@ -0,0 +1,166 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+import threading
+import time
+from typing import Dict
+
+from loguru import logger
+from psycopg2 import extensions, pool, OperationalError, InterfaceError
+
+from config import config
+
+
+class ConnectionPool:
+    """
+    The DB connections shared by the threads of a process, so that a query does not pay for a new connection (TCP and
+    authentication handshakes).
+    Built on psycopg2's `ThreadedConnectionPool`, which fails as soon as all its connections are in use: here, the
+    callers wait for a connection to be given back instead (the time spent waiting is measured, see `to_stats`).
+    A connection left idle for more than `health_check_interval` seconds is checked before being handed out; a closed or
+    broken connection is replaced by a new one.
+    The pool is opened on first use, so that a process not accessing the DB never connects. Only `min_connections` are
+    opened with it: the other connections are opened when needed, up to `max_connections`.
+    """
+
+    def __init__(self, min_connections: int = None, max_connections: int = None, wait_timeout: float = None,
+                 health_check_interval: float = None) -> None:
+        """
+        :param min_connections: the connections opened with the pool and kept open (defaults to
+        `MIN_CONNECTIONS_COUNT`)
+        :param max_connections: the connections opened at most (defaults to `MAX_CONNECTIONS_COUNT`)
+        :param wait_timeout: the seconds to wait for a connection before giving up (defaults to
+        `DATABASE_POOL_WAIT_TIMEOUT`)
+        :param health_check_interval: the seconds of inactivity after which a connection is checked before being handed
+        out (defaults to `DATABASE_HEALTH_CHECK_INTERVAL`)
+        """
+        super().__init__()
+        self.max_connections: int = max(1, max_connections if max_connections else config.MAX_CONNECTIONS_COUNT)
+        self.min_connections: int = min(self.max_connections, min_connections if min_connections is not None
+                                        else config.MIN_CONNECTIONS_COUNT)
+        self.wait_timeout: float = wait_timeout if wait_timeout else config.DATABASE_POOL_WAIT_TIMEOUT
+        self.health_check_interval: float = config.DATABASE_HEALTH_CHECK_INTERVAL if health_check_interval is None \
+            else health_check_interval
+        self._pool: pool.ThreadedConnectionPool = None
+        self._pool_lock = threading.Lock()
+        self._available = threading.BoundedSemaphore(self.max_connections)
+        self._stats_lock = threading.Lock()
+        self._last_used: Dict[int, float] = {}  # <connection id, time it was given back>
+        self.nb_checkouts: int = 0
+        self.nb_waits: int = 0
+        self.wait_time: float = 0.0
+        self.max_wait_time: float = 0.0
+        self.nb_in_use: int = 0
+        self.max_in_use: int = 0
+        self.nb_health_checks: int = 0
+        self.nb_replaced_connections: int = 0
+
+    def _get_pool(self) -> pool.ThreadedConnectionPool:
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = pool.ThreadedConnectionPool(self.min_connections, self.max_connections,
+                                                             user=config.DATABASE_USER,
+                                                             password=config.DATABASE_PASSWORD,
+                                                             host=config.DATABASE_HOST,
+                                                             port=config.DATABASE_PORT,
+                                                             database=config.DATABASE_NAME)
+                    logger.info(f"Opened a pool of {self.min_connections}-{self.max_connections} connections to DB "
+                                f"{config.DATABASE_HOST}:{config.DATABASE_PORT}/{config.DATABASE_NAME}")
+        return self._pool
+
+    def getconn(self) -> extensions.connection:
+        """
+        :return: a healthy connection, waiting for one to be given back if all of them are in use. It must be given
+        back with `putconn`.
+        :raise PoolError: if no connection was given back within `wait_timeout` seconds
+        """
+        if not self._available.acquire(blocking=False):
+            start = time.perf_counter()
+            acquired = self._available.acquire(timeout=self.wait_timeout)
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.nb_waits += 1
+                self.wait_time += waited
+                self.max_wait_time = max(self.max_wait_time, waited)
+            if not acquired:
+                raise pool.PoolError(f"No DB connection available after {self.wait_timeout} sec "
+                                     f"({self.max_connections} connections in use)")
+        try:
+            connection = self._checkout()
+        except Exception:
+            self._available.release()
+            raise
+        with self._stats_lock:
+            self.nb_checkouts += 1
+            self.nb_in_use += 1
+            self.max_in_use = max(self.max_in_use, self.nb_in_use)
+        return connection
+
+    def _checkout(self) -> extensions.connection:
+        connection_pool = self._get_pool()
+        for _ in range(self.max_connections + 1):  # All the idle connections may be broken (i.e. DB restarted)
+            connection = connection_pool.getconn()
+            if not connection.closed and self._is_healthy(connection):
+                return connection
+            self._last_used.pop(id(connection), None)
+            connection_pool.putconn(connection, close=True)
+            with self._stats_lock:
+                self.nb_replaced_connections += 1
+        raise OperationalError("Unable to get a healthy DB connection from the pool")
+
+    def _is_healthy(self, connection: extensions.connection) -> bool:
+        last_used = self._last_used.get(id(connection))
+        if last_used is None or time.monotonic() - last_used < self.health_check_interval:
+            return True
+        with self._stats_lock:
+            self.nb_health_checks += 1
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.rollback()
+            return True
+        except (OperationalError, InterfaceError) as ex:
+            logger.warning(f"Replacing broken DB connection: {ex}")
+            return False
+
+    def putconn(self, connection: extensions.connection, close: bool = False):
+        """
+        Give a connection back to the pool. The pending changes of the connection are rolled back (see
+        `ThreadedConnectionPool.putconn`): commit them first.
+        :param close: close the connection instead of keeping it for another caller
+        """
+        close = close or bool(connection.closed)
+        if close:
+            self._last_used.pop(id(connection), None)
+        else:
+            self._last_used[id(connection)] = time.monotonic()
+        try:
+            self._get_pool().putconn(connection, close=close)
+        finally:
+            with self._stats_lock:
+                self.nb_in_use -= 1
+            self._available.release()
+
+    def closeall(self):
+        with self._pool_lock:
+            if self._pool is not None and not self._pool.closed:
+                self._pool.closeall()
+            self._pool = None
+            self._last_used.clear()
+
+    def to_stats(self) -> dict:
+        with self._stats_lock:
+            return {
+                "min_connections": self.min_connections,
+                "max_connections": self.max_connections,
+                "checkouts": self.nb_checkouts,
+                "in_use": self.nb_in_use,
+                "max_in_use": self.max_in_use,
+                "waits": self.nb_waits,
+                "wait_time": round(self.wait_time, 3),
+                "max_wait_time": round(self.max_wait_time, 3),
+                "average_wait_time": round(self.wait_time / self.nb_checkouts, 6) if self.nb_checkouts else 0,
+                "health_checks": self.nb_health_checks,
+                "replaced_connections": self.nb_replaced_connections
+            }
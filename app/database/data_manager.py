@@ -12,25 +12,34 @@ if __name__ == '__main__':
 
 import json
 import logging
+import threading
 from contextlib import contextmanager
-from typing import List, Dict
+from typing import List, Dict, Iterator
 
-import psycopg2 as database
+from psycopg2.extras import execute_values
 from loguru import logger
 
 from config import config
+from database.connection_pool import ConnectionPool
 from models.content import ContentFamily, ContentCategory, ContentClassificationPegi
 from models.path_stage import PathStage
 from models.directory import DirectoryModel
 from models.file import FileModel
+from models.known_path import KnownPath
 from models.path import PathModel
 from models.path_type import PathType
 
 
 class PathDataManager:
 
-    def __init__(self) -> None:
+    def __init__(self, connection_pool: ConnectionPool = None) -> None:
+        """
+        :param connection_pool: the connections to the DB (defaults to a new pool, see `MIN_CONNECTIONS_COUNT` and
+        `MAX_CONNECTIONS_COUNT`)
+        """
         super().__init__()
+        self._connection_pool: ConnectionPool = connection_pool if connection_pool else ConnectionPool()
+        self._thread_local = threading.local()  # The connection used by the `cursor` of each thread
         try:
             logger.info(f"Connecting to DB {config.DATABASE_HOST}:{config.DATABASE_PORT}/{config.DATABASE_NAME}...")
             with self.cursor():
@@ -38,41 +47,74 @@ class PathDataManager:
         except Exception as ex:
             logger.error(f"Unable to login to DB {config.DATABASE_HOST}:{config.DATABASE_PORT}/{config.DATABASE_NAME}: {ex}")
 
+    @property
+    def connection_pool(self) -> ConnectionPool:
+        return self._connection_pool
+
     def create_cursor(self):
-        connection = database.connect(
-            user=config.DATABASE_USER,
-            password=config.DATABASE_PASSWORD,
-            host=config.DATABASE_HOST,
-            port=config.DATABASE_PORT,
-            database=config.DATABASE_NAME
-        )
-        cursor = connection.cursor()
-        return cursor
+        """
+        :return: a cursor on a connection taken from the pool, for the callers managing their own transactions. It must
+        be given back with `release_cursor`.
+        """
+        connection = self._connection_pool.getconn()
+        return connection.cursor()
+
+    def release_cursor(self, cursor, commit: bool = True):
+        """
+        Close a cursor created by `create_cursor`, and give its connection back to the pool.
+        :param commit: commit the pending changes (otherwise, they are rolled back)
+        """
+        connection = cursor.connection
+        try:
+            if commit and not connection.closed:
+                connection.commit()
+        except Exception as ex:
+            logger.error(f"Unable to commit DB transaction: {ex}")
+        finally:
+            if not cursor.closed:
+                cursor.close()
+            self._connection_pool.putconn(connection)
 
     @contextmanager
     def cursor(self, *args, **kwargs):
-        connection = database.connect(
-            user=config.DATABASE_USER,
-            password=config.DATABASE_PASSWORD,
-            host=config.DATABASE_HOST,
-            port=config.DATABASE_PORT,
-            database=config.DATABASE_NAME
-        )
+        """
+        A cursor on a pooled connection, committed when leaving the context (rolled back on error).
+        The cursors nested within the same thread share the connection (and the transaction) of the outer one.
+        """
+        connection = getattr(self._thread_local, 'connection', None)
+        if connection is not None:
+            with connection.cursor() as cursor:
+                yield cursor
+            return
+        connection = self._connection_pool.getconn()
+        self._thread_local.connection = connection
         cursor = connection.cursor()
         try:
             yield cursor
+            connection.commit()
+        except Exception:
+            try:
+                connection.rollback()
+            except Exception as ex:
+                logger.error(ex)
+            raise
         finally:
+            self._thread_local.connection = None
             try:
-                if connection:
-                    connection.commit()
-                if cursor:
-                    cursor.close()
+                cursor.close()
             except Exception as ex:
                 logger.error(ex)
-                if connection:
-                    connection.rollback()
-                if cursor:
-                    cursor.close()
+            self._connection_pool.putconn(connection)
+
+    def close(self):
+        """
+        Close all the connections of the pool.
+        """
+        logger.info(f"DB connection pool: {self._connection_pool.to_stats()}")
+        self._connection_pool.closeall()
+
+    def to_stats(self) -> dict:
+        return {"connection_pool": self._connection_pool.to_stats()}
 
     # def __del__(self):
     #     try:
@@ -119,14 +161,10 @@ class PathDataManager:
                                          f"nor a dictionary. Row: {row}")
                     path_model.id = row[0]
                     path_model.extension = row[2]
-                    if not path_model.name:
-                        path_model.name = row[3]
-                    if not path_model.owner:
-                        path_model.owner = row[4]
-                    if not path_model.group:
-                        path_model.group = row[5]
-                    if not path_model.drive:
-                        path_model.drive = row[7]
+                    path_model.name = row[3]
+                    path_model.owner = row[4]
+                    path_model.group = row[5]
+                    path_model.drive = row[7]
                     path_model.size = row[8]
                     path_model.hash = row[9]
                     path_model.is_windows_path = row[10]
@@ -163,6 +201,34 @@ class PathDataManager:
     def get_path(self, path: str) -> PathModel:
         return self._get_path_by(column='path', operator='=', value=path)
 
+    def find_known_paths(self, paths: List[str], batch_size: int = None) -> Dict[str, KnownPath]:
+        """
+        Fetch what is needed to detect the changes of many paths, with one query per `batch_size` paths (on the unique
+        index of the path column), instead of one `get_path` per path.
+        :param paths: the full paths to look for
+        :param batch_size: the number of paths per query (defaults to `PATH_PREFETCH_BATCH_SIZE`)
+        :return: the paths found in DB, as <full path, known path>
+        """
+        sql_statement: str = 'SELECT path, path_type, size, hash, path_stage FROM path WHERE path = ANY(%s)'
+        batch_size = batch_size if batch_size else config.PATH_PREFETCH_BATCH_SIZE
+        known_paths: Dict[str, KnownPath] = {}
+        try:
+            with self.cursor() as cur:
+                for i in range(0, len(paths), batch_size):
+                    start = time.time()
+                    cur.execute(sql_statement, (paths[i:i + batch_size],))
+                    for row in cur.fetchall():
+                        known_paths[row[0]] = KnownPath(path_type=PathType(row[1]) if row[1] else None,
+                                                        size=row[2],
+                                                        hash=row[3],
+                                                        path_stage=PathStage(row[4]) if row[4] else None)
+                    duration = time.time() - start
+                    if duration > 0.5:
+                        logger.warning(f"SLOW: took {duration}s for fetching {len(paths[i:i + batch_size])} paths")
+        except Exception as ex:
+            logger.error(f"find_known_paths - Unable to execute SQL command:\n{sql_statement}\nError: {ex}")
+        return known_paths
+
     def find_paths_by_hash(self, hash: str) -> List[PathModel]:
         return self._find_paths(column='hash', operator='=', value=hash)
 
@@ -185,14 +251,11 @@ class PathDataManager:
                              f"nor a dictionary. Path: {path}")
         path_model.id = id
         path_model.extension = extension
-        if not path_model.name:
-            path_model.name = name
-        if not path_model.owner:
-            path_model.owner = owner
-        if not path_model.group:
-            path_model.group = group
-        if not path_model.drive:
-            path_model.drive = drive
+        # Use the DB values: hydrating a row must not access the file system
+        path_model.name = name
+        path_model.owner = owner
+        path_model.group = group
+        path_model.drive = drive
         path_model.size = size
         path_model.hash = hash
         path_model.is_windows_path = is_windows_path
@@ -216,55 +279,64 @@ class PathDataManager:
         path_model.date_updated = date_updated
         return path_model
 
+    _STAGE_COLUMNS = 'id, "path", "extension", "name", "owner", "group", root, drive, "size", ' \
+                     'hash, is_windows_path, hidden, archive, compressed, "encrypted", offline, readonly, ' \
+                     '"system", "temporary", content_family, content_category, content_rating, ' \
+                     'content_min_age, quality_rating, mime_type, path_type, files_in_dir, path_stage, tags, ' \
+                     'date_created, date_updated'
+
+    @staticmethod
+    def _convert_stage_row_to_path_model(row) -> PathModel:
+        """
+        :param row: the values of the `_STAGE_COLUMNS`
+        """
+        return PathDataManager._convert_rows_to_path_model(id=row[0],
+                                                           path=row[1],
+                                                           extension=row[2],
+                                                           name=row[3],
+                                                           owner=row[4],
+                                                           group=row[5],
+                                                           root=row[6],
+                                                           drive=row[7],
+                                                           size=row[8],
+                                                           hash=row[9],
+                                                           is_windows_path=row[10],
+                                                           hidden=row[11],
+                                                           archive=row[12],
+                                                           compressed=row[13],
+                                                           encrypted=row[14],
+                                                           offline=row[15],
+                                                           readonly=row[16],
+                                                           system=row[17],
+                                                           temporary=row[18],
+                                                           content_family=row[19],
+                                                           content_category=row[20],
+                                                           content_rating=row[21],
+                                                           content_min_age=row[22],
+                                                           quality_rating=row[23],
+                                                           mime_type=row[24],
+                                                           path_type=row[25],
+                                                           files_in_dir=row[26],
+                                                           path_stage=row[27],
+                                                           tags=row[28],
+                                                           date_created=row[29],
+                                                           date_updated=row[30])
+
     def find_paths_by_stage(self, path_type: PathType, path_stage: PathStage, max_items: int = 200) -> List[PathModel]:
-        sql_statement: str = f'SELECT id, "path", "extension", "name", "owner", "group", root, drive, "size", ' \
-                             f'hash, is_windows_path, hidden, archive, compressed, "encrypted", offline, readonly, ' \
-                             f'"system", "temporary", content_family, content_category, content_rating, ' \
-                             f'content_min_age, quality_rating, mime_type, path_type, files_in_dir, path_stage, tags, ' \
-                             f'date_created, date_updated ' \
+        sql_statement: str = f'SELECT {PathDataManager._STAGE_COLUMNS} ' \
                              f'FROM path ' \
-                             f"WHERE path_type = {path_type.value} AND path_stage = {path_stage.value} LIMIT {max_items}"
+                             f'WHERE path_type = %s AND path_stage = %s ORDER BY id LIMIT %s'
         path_list: List[PathModel] = []
         try:
             with self.cursor() as cur:
                 logger.debug(sql_statement)
-                cur.execute(sql_statement)
+                cur.execute(sql_statement, (path_type.value, path_stage.value, max_items))
                 rows = cur.fetchall()
                 if not rows:
                     return path_list
                 for row in rows:
                     try:
-                        path_model: PathModel = PathDataManager._convert_rows_to_path_model(id=row[0],
-                                                                                            path=row[1],
-                                                                                            extension=row[2],
-                                                                                            name=row[3],
-                                                                                            owner=row[4],
-                                                                                            group=row[5],
-                                                                                            root=row[6],
-                                                                                            drive=row[7],
-                                                                                            size=row[8],
-                                                                                            hash=row[9],
-                                                                                            is_windows_path=row[10],
-                                                                                            hidden=row[11],
-                                                                                            archive=row[12],
-                                                                                            compressed=row[13],
-                                                                                            encrypted=row[14],
-                                                                                            offline=row[15],
-                                                                                            readonly=row[16],
-                                                                                            system=row[17],
-                                                                                            temporary=row[18],
-                                                                                            content_family=row[19],
-                                                                                            content_category=row[20],
-                                                                                            content_rating=row[21],
-                                                                                            content_min_age=row[22],
-                                                                                            quality_rating=row[23],
-                                                                                            mime_type=row[24],
-                                                                                            path_type=row[25],
-                                                                                            files_in_dir=row[26],
-                                                                                            path_stage=row[27],
-                                                                                            tags=row[28],
-                                                                                            date_created=row[29],
-                                                                                            date_updated=row[30])
+                        path_model: PathModel = PathDataManager._convert_stage_row_to_path_model(row)
                         path_list.append(path_model)
                         logging.debug(f"Fetched path '{path_model.path}'")
                     except Exception as rowEx:
@@ -275,6 +347,49 @@ class PathDataManager:
             logger.error(f"_find_paths - Unable to execute SQL command:\n{sql_statement}\nError: {ex}")
             return path_list
 
+    def iter_paths_by_stage(self, path_type: PathType, path_stage: PathStage, page_size: int = None,
+                            from_id: int = 0) -> Iterator[PathModel]:
+        """
+        Stream the paths at the given stage, in a single pass ordered by id: the paths are fetched by pages of
+        `page_size` rows (keyset pagination, each page starting after the last id of the previous one), and converted
+        into models one at a time, so that only one page is held in memory.
+        Each page is fetched within its own short transaction: the paths can be saved meanwhile, a path leaving the
+        stage (or failing to be saved) is not fetched again.
+        :param page_size: the number of rows fetched at once (defaults to `PATH_STREAM_PAGE_SIZE`)
+        :param from_id: the id after which the paths are streamed (i.e. to resume an interrupted pass)
+        :raise Exception: if a page can not be fetched: the stream is interrupted, and the caller can resume it after
+        the id of the last path it got
+        """
+        sql_statement: str = f'SELECT {PathDataManager._STAGE_COLUMNS} ' \
+                             f'FROM path ' \
+                             f'WHERE path_type = %s AND path_stage = %s AND id > %s ORDER BY id LIMIT %s'
+        page_size = page_size if page_size else config.PATH_STREAM_PAGE_SIZE
+        last_id = from_id
+        while True:
+            start = time.time()
+            try:
+                with self.cursor() as cur:
+                    cur.execute(sql_statement, (path_type.value, path_stage.value, last_id, page_size))
+                    rows = cur.fetchall()
+            except Exception as ex:
+                logger.error(f"iter_paths_by_stage - Unable to execute SQL command:\n{sql_statement}\nError: {ex}")
+                raise
+            duration = time.time() - start
+            if duration > 0.5:
+                logger.warning(f"SLOW: took {duration}s for fetching {len(rows)} paths after id {last_id}")
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            for row in rows:
+                try:
+                    path_model: PathModel = PathDataManager._convert_stage_row_to_path_model(row)
+                except Exception as rowEx:
+                    logger.error(f"Unable to parse row into model. Row: {row}\nError: {rowEx}")
+                    continue
+                yield path_model
+            if len(rows) < page_size:
+                return
+
     def find_paths_by_prefix_and_name(self, path_prefix: str, name: str, mime_type: str) -> List[PathModel]:
         path_prefix = path_prefix.replace("'", "\'")
         name = name.replace("'", "\'")
@@ -358,26 +473,79 @@ class PathDataManager:
             logger.error(f"find_duplicates - Unable to execute SQL command:\n{sql_statement}\nError: {ex}")
         return result
 
+    _CRAWLED_PATH_COLUMNS = 'path, extension, name, path_type, files_in_dir, size, path_stage, content_category, ' \
+                            'content_min_age'
+    _CRAWLED_PATH_ON_CONFLICT = 'ON CONFLICT(path) DO UPDATE SET extension=EXCLUDED.extension, name=EXCLUDED.name, ' \
+                                'path_type=EXCLUDED.path_type, files_in_dir=EXCLUDED.files_in_dir, ' \
+                                'size=EXCLUDED.size, path_stage=EXCLUDED.path_stage, ' \
+                                'content_category=EXCLUDED.content_category, ' \
+                                'content_min_age=EXCLUDED.content_min_age, ' \
+                                'date_updated=now()'
+    _PATH_COLUMNS = 'path, extension, name, owner, "group", root, drive, size, ' \
+                    'hash, is_windows_path, hidden, archive, compressed, encrypted, offline, ' \
+                    'readonly, system, temporary, content_family, mime_type, path_type, files_in_dir, tags, ' \
+                    'content_rating, path_stage, content_category, content_min_age'
+    _PATH_ON_CONFLICT = 'ON CONFLICT(path) DO UPDATE SET extension=EXCLUDED.extension, name=EXCLUDED.name, ' \
+                        'owner=EXCLUDED.owner, "group"=EXCLUDED."group", root=EXCLUDED.root, drive=EXCLUDED.drive, ' \
+                        'size=EXCLUDED.size, hash=EXCLUDED.hash, ' \
+                        'is_windows_path=EXCLUDED.is_windows_path, hidden=EXCLUDED.hidden, ' \
+                        'archive=EXCLUDED.archive, ' \
+                        'compressed=EXCLUDED.compressed, encrypted=EXCLUDED.encrypted, offline=EXCLUDED.offline, ' \
+                        'readonly=EXCLUDED.readonly, system=EXCLUDED.system, temporary=EXCLUDED.temporary, ' \
+                        'content_family=EXCLUDED.content_family, mime_type=EXCLUDED.mime_type, ' \
+                        'path_type=EXCLUDED.path_type, path_stage=EXCLUDED.path_stage, tags=EXCLUDED.tags, ' \
+                        'content_rating=EXCLUDED.content_rating, ' \
+                        'files_in_dir=EXCLUDED.files_in_dir, ' \
+                        'content_category=EXCLUDED.content_category, content_min_age=EXCLUDED.content_min_age, ' \
+                        'date_updated=now()'
+
+    @staticmethod
+    def crawled_path_row(full_path: str, extension: str | None, name: str, is_dir: bool, files_in_dir: int | None,
+                         size: int | None, stage: PathStage, category: ContentCategory,
+                         min_age: ContentClassificationPegi) -> tuple:
+        """
+        :return: the values of the `_CRAWLED_PATH_COLUMNS` of a crawled path
+        """
+        return (full_path,
+                extension,
+                name,
+                PathType.DIRECTORY.value if is_dir else PathType.FILE.value,
+                files_in_dir,
+                size,
+                stage.value if stage else None,
+                category.value if category else None,
+                min_age.value if min_age else None)
+
+    @staticmethod
+    def path_row(path_model: PathModel) -> tuple:
+        """
+        :return: the values of the `_PATH_COLUMNS` of a path model
+        """
+        return (path_model.full_path, path_model.extension, path_model.name, path_model.owner,
+                path_model.group, path_model.path_root, path_model.drive, path_model.size,
+                path_model.hash, path_model.is_windows_path,
+                path_model.hidden, path_model.archive, path_model.compressed,
+                path_model.encrypted, path_model.offline, path_model.readonly,
+                path_model.system, path_model.temporary,
+                path_model.content_family.value if path_model.content_family else None,
+                str(path_model.mime_type) if path_model.mime_type else None, path_model.path_type.value,
+                path_model.files_in_dir if hasattr(path_model, 'files_in_dir') else None,
+                path_model.keywords if path_model.keywords else None,
+                path_model.content_rating.value if path_model.content_rating else None,
+                # json.dumps(path_model.tags) if path_model.tags else None,
+                path_model.path_stage.value,
+                path_model.content_category.value if path_model.content_category else None,
+                path_model.content_min_age.value if path_model.content_min_age else None)
+
     def _save_path(self, cursor, full_path: str, extension: str | None, name: str, is_dir: bool,
                    files_in_dir: int | None, size: int | None, stage: PathStage, category: ContentCategory,
                    min_age: ContentClassificationPegi) -> None:
-        sql_statement: str = f'INSERT INTO path (path, extension, name, path_type, files_in_dir, size, ' \
-                             f'path_stage, content_category, content_min_age) ' \
+        sql_statement: str = f'INSERT INTO path ({PathDataManager._CRAWLED_PATH_COLUMNS}) ' \
                              f'VALUES(%s, %s, %s, %s, %s, %s, %s, %s, %s) ' \
-                             f'ON CONFLICT(path) DO UPDATE SET extension=EXCLUDED.extension, name=EXCLUDED.name, ' \
-                             f'path_type=EXCLUDED.path_type, files_in_dir=EXCLUDED.files_in_dir, size=EXCLUDED.size, ' \
-                             f'path_stage=EXCLUDED.path_stage, content_category=EXCLUDED.content_category, ' \
-                             f'content_min_age=EXCLUDED.content_min_age, ' \
-                             f'date_updated=now()'
-        params = (full_path,
-                  extension,
-                  name,
-                  PathType.DIRECTORY.value if is_dir else PathType.FILE.value,
-                  files_in_dir,
-                  size,
-                  stage.value if stage else None,
-                  category.value if category else None,
-                  min_age.value if min_age else None)
+                             f'{PathDataManager._CRAWLED_PATH_ON_CONFLICT}'
+        params = PathDataManager.crawled_path_row(full_path=full_path, extension=extension, name=name, is_dir=is_dir,
+                                                  files_in_dir=files_in_dir, size=size, stage=stage,
+                                                  category=category, min_age=min_age)
         try:
             logging.debug(f"Saved path '{full_path}' into DB")
             start = time.time()
@@ -391,40 +559,12 @@ class PathDataManager:
 
 
     def save_path(self, cursor, path_model: PathModel) -> None:
-        sql_statement: str = f'INSERT INTO path (path, extension, name, owner, "group", root, drive, size, ' \
-                             f'hash, is_windows_path, hidden, archive, compressed, encrypted, offline, ' \
-                             f'readonly, system, temporary, content_family, mime_type, path_type, files_in_dir, tags, ' \
-                             f'content_rating, path_stage, content_category, content_min_age) ' \
+        sql_statement: str = f'INSERT INTO path ({PathDataManager._PATH_COLUMNS}) ' \
                              f'VALUES(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, ' \
                              f'%s, %s, %s, %s, %s, %s, %s, %s) ' \
-                             f'ON CONFLICT(path) DO UPDATE SET extension=EXCLUDED.extension, name=EXCLUDED.name, ' \
-                             f'owner=EXCLUDED.owner, "group"=EXCLUDED."group", root=EXCLUDED.root, drive=EXCLUDED.drive, ' \
-                             f'size=EXCLUDED.size, hash=EXCLUDED.hash, ' \
-                             f'is_windows_path=EXCLUDED.is_windows_path, hidden=EXCLUDED.hidden, archive=EXCLUDED.archive, ' \
-                             f'compressed=EXCLUDED.compressed, encrypted=EXCLUDED.encrypted, offline=EXCLUDED.offline, ' \
-                             f'readonly=EXCLUDED.readonly, system=EXCLUDED.system, temporary=EXCLUDED.temporary, ' \
-                             f'content_family=EXCLUDED.content_family, mime_type=EXCLUDED.mime_type, ' \
-                             f'path_type=EXCLUDED.path_type, path_stage=EXCLUDED.path_stage, tags=EXCLUDED.tags, ' \
-                             f'content_rating=EXCLUDED.content_rating, ' \
-                             f'files_in_dir=EXCLUDED.files_in_dir, ' \
-                             f'content_category=EXCLUDED.content_category, content_min_age=EXCLUDED.content_min_age, ' \
-                             f'date_updated=now()'
+                             f'{PathDataManager._PATH_ON_CONFLICT}'
         try:
-            params = (path_model.full_path, path_model.extension, path_model.name, path_model.owner,
-                      path_model.group, path_model.path_root, path_model.drive, path_model.size,
-                      path_model.hash, path_model.is_windows_path,
-                      path_model.hidden, path_model.archive, path_model.compressed,
-                      path_model.encrypted, path_model.offline, path_model.readonly,
-                      path_model.system, path_model.temporary,
-                      path_model.content_family.value if path_model.content_family else None,
-                      str(path_model.mime_type) if path_model.mime_type else None, path_model.path_type.value,
-                      path_model.files_in_dir if hasattr(path_model, 'files_in_dir') else None,
-                      path_model.keywords if path_model.keywords else None,
-                      path_model.content_rating.value if path_model.content_rating else None,
-                      # json.dumps(path_model.tags) if path_model.tags else None,
-                      path_model.path_stage.value,
-                      path_model.content_category.value if path_model.content_category else None,
-                      path_model.content_min_age.value if path_model.content_min_age else None)
+            params = PathDataManager.path_row(path_model)
             start = time.time()
             cursor.execute(sql_statement, params)
             end = time.time()
@@ -435,6 +575,37 @@ class PathDataManager:
         except Exception as ex:
             logger.error(f"Unable to execute SQL command:\n{sql_statement}\nError: {ex}\nPath: '{path_model.relative_path if path_model else 'None'}'")
 
+    def save_crawled_path_rows(self, cursor, rows: List[tuple], page_size: int = None) -> None:
+        """
+        Upsert many crawled paths at once, with multi-row `VALUES` statements.
+        :param rows: the rows to upsert (see `crawled_path_row`), a path appearing only once
+        :param page_size: the number of rows per statement (defaults to all of them)
+        """
+        sql_statement: str = f'INSERT INTO path ({PathDataManager._CRAWLED_PATH_COLUMNS}) VALUES %s ' \
+                             f'{PathDataManager._CRAWLED_PATH_ON_CONFLICT}'
+        self._execute_values(cursor, sql_statement, rows, page_size=page_size)
+
+    def save_path_rows(self, cursor, rows: List[tuple], page_size: int = None) -> None:
+        """
+        Upsert many path models at once, with multi-row `VALUES` statements.
+        :param rows: the rows to upsert (see `path_row`), a path appearing only once
+        :param page_size: the number of rows per statement (defaults to all of them)
+        """
+        sql_statement: str = f'INSERT INTO path ({PathDataManager._PATH_COLUMNS}) VALUES %s ' \
+                             f'{PathDataManager._PATH_ON_CONFLICT}'
+        self._execute_values(cursor, sql_statement, rows, page_size=page_size)
+
+    @staticmethod
+    def _execute_values(cursor, sql_statement: str, rows: List[tuple], page_size: int = None) -> None:
+        if not rows:
+            return
+        start = time.time()
+        execute_values(cursor, sql_statement, rows, page_size=page_size if page_size else len(rows))
+        duration = time.time() - start
+        if duration > 0.2 + len(rows) * 0.001:
+            logger.warning(f"SLOW: took {duration}s for upserting {len(rows)} paths")
+        logging.debug(f"Saved {len(rows)} paths into DB")
+
 
 # if __name__ == '__main__':
 #     pdm = PathDataManager()
@@ -0,0 +1,115 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List
+
+from config import config
+from database.data_manager import PathDataManager
+from models.known_path import KnownPath
+
+
+class KnownPathsCache:
+    """
+    The paths already saved into DB, prefetched directory by directory (see `PathDataManager.find_known_paths`), so
+    that telling whether a crawled path changed does not cost one query per path.
+    The first lookup of a path whose directory is not prefetched yet lists the directory (names only), and fetches
+    all its entries at once: the next lookups of the directory are answered from memory. The entries of the
+    `max_directories` directories looked up the most recently are kept.
+    """
+
+    def __init__(self, data_manager: PathDataManager, max_directories: int = None, batch_size: int = None) -> None:
+        """
+        :param data_manager: the data manager fetching the paths
+        :param max_directories: the number of directories whose entries are kept in memory (defaults to
+        `PATH_PREFETCH_MAX_DIRECTORIES`)
+        :param batch_size: the number of paths fetched per query (defaults to `PATH_PREFETCH_BATCH_SIZE`)
+        """
+        super().__init__()
+        if data_manager is None:
+            raise ValueError("Please provide the data manager fetching the paths")
+        self.data_manager: PathDataManager = data_manager
+        self.max_directories: int = max(1, max_directories if max_directories
+                                        else config.PATH_PREFETCH_MAX_DIRECTORIES)
+        self.batch_size: int = batch_size if batch_size else config.PATH_PREFETCH_BATCH_SIZE
+        self._lock = threading.Lock()
+        self._directories: OrderedDict[str, Dict[str, KnownPath]] = OrderedDict()  # <directory, <path, known path>>
+        self._loading: Dict[str, threading.Event] = {}  # The directories being prefetched by another thread
+        self.nb_lookups: int = 0
+        self.nb_hits: int = 0
+        self.nb_prefetched_directories: int = 0
+        self.nb_prefetched_paths: int = 0
+        self.nb_known_paths: int = 0
+        self.nb_single_lookups: int = 0
+
+    def prefetch(self, paths: List[str]) -> Dict[str, KnownPath]:
+        """
+        Fetch the given paths at once, i.e. all the files of a directory listing (they are not kept).
+        :return: the paths found in DB, as <full path, known path>
+        """
+        known_paths = self.data_manager.find_known_paths(paths=paths, batch_size=self.batch_size)
+        with self._lock:
+            self.nb_lookups += len(paths)
+            self.nb_prefetched_paths += len(paths)
+            self.nb_known_paths += len(known_paths)
+        return known_paths
+
+    def get(self, full_path: str) -> KnownPath | None:
+        """
+        :return: the saved path, or None if it is not in DB
+        """
+        directory = os.path.dirname(full_path)
+        with self._lock:
+            self.nb_lookups += 1
+            entries = self._directories.get(directory)
+            if entries is not None:
+                self._directories.move_to_end(directory)
+                self.nb_hits += 1
+                return entries.get(full_path)
+            loading = self._loading.get(directory)
+            should_load = loading is None
+            if should_load:
+                loading = self._loading[directory] = threading.Event()
+        if should_load:
+            try:
+                self._prefetch_directory(directory)
+            finally:
+                with self._lock:
+                    del self._loading[directory]
+                loading.set()
+        else:
+            loading.wait()
+        with self._lock:
+            entries = self._directories.get(directory)
+            if entries is not None:
+                return entries.get(full_path)
+            self.nb_single_lookups += 1  # The directory could not be listed, or was already evicted
+        return self.data_manager.find_known_paths(paths=[full_path]).get(full_path)
+
+    def _prefetch_directory(self, directory: str):
+        try:
+            paths = [os.path.join(directory, name) for name in os.listdir(directory)]
+        except OSError:
+            return
+        known_paths = self.data_manager.find_known_paths(paths=paths, batch_size=self.batch_size)
+        with self._lock:
+            self._directories[directory] = known_paths
+            while len(self._directories) > self.max_directories:
+                self._directories.popitem(last=False)
+            self.nb_prefetched_directories += 1
+            self.nb_prefetched_paths += len(paths)
+            self.nb_known_paths += len(known_paths)
+
+    def to_stats(self) -> dict:
+        with self._lock:
+            return {
+                "lookups": self.nb_lookups,
+                "hits": self.nb_hits,
+                "prefetched_directories": self.nb_prefetched_directories,
+                "prefetched_paths": self.nb_prefetched_paths,
+                "known_paths": self.nb_known_paths,
+                "single_lookups": self.nb_single_lookups,
+                "cached_directories": len(self._directories)
+            }
@@ -0,0 +1,135 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+import threading
+import time
+
+from loguru import logger
+
+from config import config
+from database.bulk_path_writer import BulkPathWriter
+from database.data_manager import PathDataManager
+
+
+class WriteBehindPathWriter(BulkPathWriter):
+    """
+    A `BulkPathWriter` writing its batches from its own thread: the crawling and processing threads only buffer the
+    paths, they never wait for the DB, unless `max_pending` paths are already waiting to be written (the DB is then the
+    bottleneck, and the buffer must stay bounded).
+    The writer thread commits a group of paths once `batch_size` paths are buffered, or `flush_interval` seconds after
+    the last group. `flush` waits for all the paths added before it to be committed, and `close` (i.e. once the scan is
+    completed, or the consumer stopped) ends the writer thread after a last group: nothing is left buffered.
+    """
+
+    def __init__(self, data_manager: PathDataManager, batch_size: int = None, flush_interval: float = None,
+                 max_pending: int = None) -> None:
+        """
+        :param max_pending: the number of buffered paths above which adding a new path waits for the writer thread
+        (defaults to `PATH_WRITER_QUEUE_SIZE`). A path already buffered is updated without waiting.
+        """
+        super().__init__(data_manager=data_manager, batch_size=batch_size, flush_interval=flush_interval)
+        self.max_pending: int = max(self.batch_size, max_pending if max_pending else config.PATH_WRITER_QUEUE_SIZE)
+        self._condition = threading.Condition(self._lock)
+        self._thread: threading.Thread = None
+        self._closing: bool = False
+        self._nb_flush_requests: int = 0
+        self._nb_flushed_requests: int = 0
+        self.nb_coalesced_paths: int = 0
+        self.nb_full_waits: int = 0
+        self.full_wait_time: float = 0.0
+        self.max_pending_paths: int = 0
+
+    def start(self):
+        with self._condition:
+            if self._thread is not None:
+                return
+            self._closing = False
+            self._thread = threading.Thread(target=self._run, name="PathWriter", daemon=True)
+            self._thread.start()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _buffer(self, full_path: str, row: tuple, crawled: bool):
+        if self._thread is None:
+            self.start()
+        with self._condition:
+            rows = self._crawled_rows if crawled else self._path_rows
+            if full_path not in rows and self.nb_buffered_paths >= self.max_pending and self.running:
+                start = time.perf_counter()
+                self.nb_full_waits += 1
+                while self.nb_buffered_paths >= self.max_pending and self.running:
+                    self._condition.wait(timeout=1)
+                self.full_wait_time += time.perf_counter() - start
+                rows = self._crawled_rows if crawled else self._path_rows  # Swapped by the writer thread meanwhile
+            if full_path in rows:
+                self.nb_coalesced_paths += 1
+            rows[full_path] = row
+            self.nb_added_paths += 1
+            nb_buffered_paths = self.nb_buffered_paths
+            if nb_buffered_paths > self.max_pending_paths:
+                self.max_pending_paths = nb_buffered_paths
+            if nb_buffered_paths >= self.batch_size:
+                self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._closing and self._nb_flush_requests == self._nb_flushed_requests \
+                        and self.nb_buffered_paths < self.batch_size:
+                    remaining = self.flush_interval - (time.monotonic() - self._last_flush_time)
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(timeout=remaining)
+                closing = self._closing
+                nb_flush_requests = self._nb_flush_requests  # The paths added before these requests are written now
+            try:
+                super().flush()
+            except Exception as ex:
+                logger.error(f"Error while writing paths into DB: {ex}")
+            with self._condition:
+                self._nb_flushed_requests = nb_flush_requests
+                self._condition.notify_all()  # Wakes the threads waiting for room, or for a flush
+                if closing and not self.nb_buffered_paths:
+                    return
+
+    def flush(self) -> int:
+        """
+        Wait for all the paths added so far to be written by the writer thread (or write them, if it is not running).
+        :return: the number of paths written meanwhile
+        """
+        nb_written_paths = self.nb_written_paths
+        if not self.running:
+            return super().flush()
+        with self._condition:
+            self._nb_flush_requests += 1
+            request = self._nb_flush_requests
+            self._condition.notify_all()
+            while self._nb_flushed_requests < request and self.running:
+                self._condition.wait(timeout=1)
+        return self.nb_written_paths - nb_written_paths
+
+    def close(self):
+        """
+        Write the remaining buffered paths, and end the writer thread.
+        """
+        with self._condition:
+            thread, self._closing = self._thread, True
+            self._condition.notify_all()
+        if thread is not None:
+            thread.join()
+        with self._condition:
+            self._thread = None
+        super().flush()  # The paths added while closing
+
+    def to_stats(self) -> dict:
+        stats = super().to_stats()
+        stats.update({
+            "max_pending": self.max_pending,
+            "max_pending_paths": self.max_pending_paths,
+            "coalesced_paths": self.nb_coalesced_paths,
+            "full_waits": self.nb_full_waits,
+            "full_wait_time": round(self.full_wait_time, 3)
+        })
+        return stats
@@ -1,17 +1,24 @@
 import os, sys
 import re
+import threading
 import time
 from pathlib import Path
 from typing import List
 from loguru import logger
-import traceback
 
+from crawl_coordinator import ShardedCrawlCoordinator
+from crawler.work_stealing_walker import DirectoryTask, WorkStealingWalker
+from database.write_behind_path_writer import WriteBehindPathWriter
 from database.data_manager import PathDataManager
+from filters.entry_record import EntryRecord
 from filters.extension_filter import ExtensionFilter
+from filters.filter_chain import FilterChain
+from filters.filter_compiler import FilterCompiler
 from filters.path_name_ignore_filter import NameFilter
 from filters.path_pattern_filter import PatternFilter
 from filters.path_regex_pattern_filter import RegexPatternFilter
 from interfaces.iFilter import IFilter
+from memory_governor import MemoryGovernor
 from models.content import ContentCategory, ContentClassificationPegi
 from models.path_stage import PathStage
 
@@ -25,7 +32,8 @@ class FastCrawler:
 
     def __init__(self, base_path: str, child_path: str, category: ContentCategory, min_age: ContentClassificationPegi,
                  data_manager: PathDataManager, fetch_file_stat: bool = True,
-                 max_lists_size: int = 10, filters: List[IFilter] = [], invert_filters: bool = False):
+                 max_lists_size: int = 10, filters: List[IFilter] = [], invert_filters: bool = False,
+                 nb_workers: int = None):
         """
         :param base_path: The directory path of the root volume
         :param child_path: The directory path to be scanned on this volume
@@ -41,6 +49,9 @@ class FastCrawler:
         All paths that are not authorized by any of the filter will be filtered out.
         :param invert_filters: Filters will ignore some files based on criterion. Setting this flag will invert the logic,
         i.e. will return only paths that should be filtered out. This is useful to list files & dirs to be deleted
+        :param nb_workers: number of threads listing directories concurrently (defaults to `CRAWLER_WORKERS_COUNT`).
+        The paths are saved into DB by batches, from a writer thread shared by the workers (see
+        `WriteBehindPathWriter`).
         """
         super().__init__()
         if not base_path:
@@ -75,6 +86,11 @@ class FastCrawler:
         self.invert_filters = invert_filters
         self.max_lists_size = max_lists_size
         self.filters = filters
+        self._filter_chain: FilterChain = FilterChain(filters)
+        self.nb_workers = nb_workers if nb_workers else config.CRAWLER_WORKERS_COUNT
+        self._lock = threading.RLock()  # Stats may be updated from several workers
+        self._path_writer: WriteBehindPathWriter = None
+        self._memory_governor: MemoryGovernor = MemoryGovernor.shared()  # Pauses the scan while over memory budget
 
         self.total_files = 0
         self.total_size = 0
@@ -89,44 +105,83 @@ class FastCrawler:
         self.ignored_files_list = set()
         self.ignored_dirs_list = set()
         self.ignored_extensions_list = set()
-        self.scanned_extensions_list = set()
+        self.scanned_extensions_list = {}  # <extension, first path scanned>: not one entry per file
         self.empty_dirs_list = set()
         self.errored_paths = {}
 
-    def should_skip_path(self, entry: os.DirEntry, stat: os.stat_result = None) -> (str, bool):
-        is_file = entry.is_file(follow_symlinks=False)
-        file_extension = str(entry.name.split('.')[-1]).lower() if is_file and '.' in entry.name else None
-        if file_extension and len(file_extension) > 12:
-            file_extension = None   # There is likely a dot in the middle of the filename, but no extension
-        _filter = None
-        if self.filters:
-            for f in self.filters:
-                if not f.authorize(entry=entry, stat=stat):
-                    _filter = f
-                    logger.debug(f"should_skip set to True by {f} for path {entry}")
-                    break
+    @staticmethod
+    def _entry_record(entry: os.DirEntry, is_dir: bool, depth: int) -> EntryRecord:
+        return EntryRecord.from_dir_entry(entry, is_dir=is_dir, is_file=entry.is_file(follow_symlinks=False),
+                                          depth=depth, follow_symlinks=False)
+
+    def should_skip_path(self, record: EntryRecord) -> (str, bool):
+        """
+        The record is only stat-ed if one of the filters requires it.
+        """
+        file_extension = record.extension
+        _filter = self._filter_chain.first_rejecting(record)
+        if _filter is not None:
+            logger.debug(f"should_skip set to True by {_filter} for path {record.path}")
         should_skip = _filter is not None
         if self.invert_filters:
             should_skip = not should_skip
         if should_skip:
-            self.path_ignored(entry=entry, filter=_filter, is_file=is_file, file_extension=file_extension)
+            with self._lock:
+                self.path_ignored(entry=record, filter=_filter, is_file=record.is_file, file_extension=file_extension)
         return file_extension, should_skip
 
+    def _authorize_children(self, record: EntryRecord) -> bool:
+        """
+        A directory whose content is pruned by a directory-scope filter is counted once as ignored, instead of each of
+        its entries.
+        """
+        _filter = self._filter_chain.first_rejecting_children(record)
+        if _filter is None:
+            return True
+        logger.debug(f"Content of directory '{record.path}' skipped by {_filter.__class__.__name__}")
+        with self._lock:
+            self.path_ignored(entry=record, filter=_filter, is_file=False, file_extension=None)
+        return False
+
     def scan(self):
+        # Inverted filters report the rejected paths: no directory can be pruned
+        self._filter_chain = FilterChain(FilterCompiler.compile(self.filters), prune_directories=not self.invert_filters)
+        if self.nb_workers > 1:
+            self._scan_parallel()
+            return
         self.scan_starting()
         if self.data_manager:
-            with self.data_manager.create_cursor() as cur:
-                self.total_size, self.total_files = self._get_tree_size(path=self.path_to_scan, cursor=cur)
-                # Save as well root dir stats
-                self.data_manager._save_path(cursor=cur, full_path=str(self.path_to_scan), extension=None,
-                                             name=self.path_to_scan.name, is_dir=True, files_in_dir=self.total_files,
-                                             size=self.total_size, stage=PathStage.CRAWLED,
-                                             category=self.category, min_age=self.min_age)
-                cur.connection.commit()
-        else:
-            self.total_size, self.total_files = self._get_tree_size(path=self.path_to_scan, cursor=None)
+            self._path_writer = WriteBehindPathWriter(data_manager=self.data_manager)
+        try:
+            self.total_size, self.total_files = self._get_tree_size(path=self.path_to_scan)
+            self._save_root()
+        finally:
+            self._close_path_writer()
         self.scan_completed()
 
+    def _save_path(self, full_path: str, extension: str | None, name: str, is_dir: bool, files_in_dir: int | None,
+                   size: int | None):
+        if self._path_writer:
+            self._path_writer.add_crawled_path(full_path=full_path, extension=extension, name=name, is_dir=is_dir,
+                                               files_in_dir=files_in_dir, size=size, stage=PathStage.CRAWLED,
+                                               category=self.category, min_age=self.min_age)
+
+    def _save_root(self):
+        """
+        Save as well root dir stats.
+        """
+        self._save_path(full_path=str(self.path_to_scan), extension=None, name=self.path_to_scan.name, is_dir=True,
+                        files_in_dir=self.total_files, size=self.total_size)
+
+    def _close_path_writer(self):
+        """
+        Wait for all the paths found so far to be written (even if the scan failed), and end the writer thread.
+        """
+        if not self._path_writer:
+            return
+        self._path_writer.close()
+        logger.info(f"DB writes: {self._path_writer.to_stats()}")
+
 
     def scan_starting(self):
         self.start_time = time.time()
@@ -137,11 +192,37 @@ class FastCrawler:
         self.duration = self.end_time - self.start_time
         logger.success(f"Total size: {round(self.total_size / 1024 / 1024 / 1024, 3)} Go - "
                        f"Scanned {self.total_files} files / Skipped {self.ignored_files} files in {self.duration:.2f} sec")
+        logger.info(f"Filters: {self._filter_chain}")
         if self.errored_paths:
             logger.error(f"Error happened for scanning {len(self.errored_paths)} paths:")
             for errored_path, error in self.errored_paths.items():
                 logger.error(f"{errored_path}: {error}")
 
+    def to_stats(self) -> dict:
+        """
+        :return: the scan statistics, as plain (picklable) values
+        """
+        return {
+            'total_size': self.total_size,
+            'total_files': self.total_files,
+            'found_dirs': self.found_dirs,
+            'ignored_dirs': self.ignored_dirs,
+            'scanned_dirs': self.scanned_dirs,
+            'found_files': self.found_files,
+            'ignored_files': self.ignored_files,
+            'scanned_files': self.scanned_files,
+            'empty_dirs': self.empty_dirs,
+            'ignored_files_list': sorted(self.ignored_files_list),
+            'ignored_dirs_list': sorted(self.ignored_dirs_list),
+            'ignored_extensions_list': sorted(self.ignored_extensions_list),
+            'scanned_extensions_list': sorted(self.scanned_extensions_list.items()),
+            'empty_dirs_list': sorted(self.empty_dirs_list),
+            'errored_paths': {str(p): error for p, error in self.errored_paths.items()},
+            'filters_stats': self._filter_chain.to_stats(),
+            'memory': self._memory_governor.to_stats(),
+            'path_writer': self._path_writer.to_stats() if self._path_writer else None,
+        }
+
     def scan_error(self, ex: Exception):
         pass
 
@@ -164,7 +245,7 @@ class FastCrawler:
     def file_found(self, file: os.DirEntry):
         self.found_files += 1
 
-    def path_ignored(self, entry: os.DirEntry, filter: IFilter, is_file: bool, file_extension: str):
+    def path_ignored(self, entry: EntryRecord, filter: IFilter, is_file: bool, file_extension: str):
         filter_name = filter.__class__.__name__ if filter else 'Unknown'
         if is_file:
             logger.debug(f"Ignoring file '{entry.path}' (Skipped by filter '{filter_name}')")
@@ -194,12 +275,19 @@ class FastCrawler:
         elif self.scanned_files % 10000 == 0:
             logger.success(f"Scanned {self.scanned_files} files / {self.scanned_dirs} dirs")
 
-    def _get_tree_size(self, path, cursor) -> (int, int):
+    def _get_tree_size(self, path, record: EntryRecord = None) -> (int, int):
         """Return total size of files in path and subdirs.
         Assume zero size if stat errors (for example, file has been deleted).
+        :param record: the record of the directory (built if not given)
         """
+        if record is None:
+            record = EntryRecord(path=str(path), is_dir=True)
+        if not self._authorize_children(record):
+            return 0, 0
+        depth = record.depth
         dir_total_size = 0
         dir_total_files_nb = 0
+        self._memory_governor.wait_for_memory()
         # scandir is the fastest way to iterate over filesystem: https://peps.python.org/pep-0471/
         for entry in os.scandir(path):
             try:
@@ -209,65 +297,168 @@ class FastCrawler:
                 except OSError as error:
                     self.path_error(_path=path, msg=f"Error calling is_dir() for path '{path}'", error=error)
                     continue
+                record = self._entry_record(entry, is_dir=is_dir, depth=depth + 1)
                 if is_dir:
                     self.directory_found(directory=entry)
-                    file_extension, ignore = self.should_skip_path(entry)
+                    file_extension, ignore = self.should_skip_path(record)
                     if ignore:
                         continue
-                    sub_dir_total_size, sub_dir_total_files_nb = self._get_tree_size(entry.path, cursor)
+                    sub_dir_total_size, sub_dir_total_files_nb = self._get_tree_size(entry.path, record=record)
                     is_empty_dir = sub_dir_total_size < 1 and sub_dir_total_files_nb < 1
                     dir_total_size += sub_dir_total_size
                     dir_total_files_nb += sub_dir_total_files_nb
-                    if cursor:
-                        self.data_manager._save_path(cursor=cursor, full_path=entry.path, extension=None,
-                                                     name=entry.name, is_dir=True, files_in_dir=dir_total_files_nb,
-                                                     size=dir_total_size, stage=PathStage.CRAWLED,
-                                                     category=self.category, min_age=self.min_age)
-                    self.directory_scanned(directory=entry, is_empty=is_empty_dir, dir_total_size=dir_total_size,
-                                           dir_total_files_nb=dir_total_files_nb)
-                    if self.scanned_dirs % 10000 == 0:
-                        if cursor:
-                            cursor.connection.commit()
+                    # The totals of the sub-directory itself (not the ones accumulated with its siblings)
+                    self._save_path(full_path=entry.path, extension=None, name=entry.name, is_dir=True,
+                                    files_in_dir=sub_dir_total_files_nb, size=sub_dir_total_size)
+                    self.directory_scanned(directory=entry, is_empty=is_empty_dir, dir_total_size=sub_dir_total_size,
+                                           dir_total_files_nb=sub_dir_total_files_nb)
                 else:
                     try:
                         self.file_found(file=entry)
-                        file_extension, ignore = self.should_skip_path(entry)
+                        file_extension, ignore = self.should_skip_path(record)
                         if ignore:
                             continue
                         if file_extension:
-                            self.scanned_extensions_list.add((file_extension, entry.path))
+                            self.scanned_extensions_list.setdefault(file_extension, entry.path)
                         entry_stat = None
                         size = None
                         if self.fetch_file_stat:
-                            entry_stat = entry.stat(follow_symlinks=False)
+                            entry_stat = record.stat()
                             size = entry_stat.st_size
                             dir_total_size += size
                         dir_total_files_nb += 1
-                        if cursor:
-                            self.data_manager._save_path(cursor=cursor, full_path=entry.path, extension=file_extension,
-                                                         name=entry.name, is_dir=False, files_in_dir=None,
-                                                         size=size, stage=PathStage.CRAWLED,
-                                                         category=self.category, min_age=self.min_age)
+                        self._save_path(full_path=entry.path, extension=file_extension, name=entry.name,
+                                        is_dir=False, files_in_dir=None, size=size)
                         self.file_scanned(file=entry, entry_stat=entry_stat, file_extension=file_extension)
-                        if self.scanned_files % 5000 == 0:
-                            if cursor:
-                                cursor.connection.commit()
                     except OSError as error:
                         self.path_error(_path=path, msg=f"Error calling stat() for path '{path}'", error=error)
                         continue
             except Exception as ex:
-                print(traceback.format_exception(ex))
+                logger.exception(f"Error while scanning path '{entry.path}'")
                 self.path_error(_path=entry.path, error=ex)
         return dir_total_size, dir_total_files_nb
 
 
-def crawl():
-    base_volume = '/mnt/sda1/'
-    paths_to_scan = {
-        "Applications/": (ContentCategory.APP, ContentClassificationPegi.TWELVE_OR_MORE),
-        "A trier/": (None, ContentClassificationPegi.EIGHTEEN_OR_MORE),
-    }
+    def _scan_parallel(self):
+        self.scan_starting()
+        if self.data_manager:
+            self._path_writer = WriteBehindPathWriter(data_manager=self.data_manager)
+        walker = WorkStealingWalker(nb_workers=self.nb_workers, list_directory=self._list_directory_task,
+                                    complete_directory=self._complete_directory_task, name="FastCrawler")
+        root_path = str(self.path_to_scan)
+        try:
+            root_task = walker.walk(DirectoryTask(path=root_path, payload=EntryRecord(path=root_path, is_dir=True)))
+            self.total_size, self.total_files = root_task.size, root_task.files_in_dir
+            self._save_root()
+        finally:
+            self._close_path_writer()
+        self.scan_completed()
+
+    def _list_directory_task(self, task: DirectoryTask) -> List[DirectoryTask]:
+        """
+        Same logic as `_get_tree_size`, for a single directory: files are accounted into the task,
+        sub-directories are returned to be listed by the walker's workers.
+        """
+        sub_dirs: List[DirectoryTask] = []
+        if not self._authorize_children(task.payload):
+            return sub_dirs
+        self._memory_governor.wait_for_memory()
+        try:
+            dir_entries = list(os.scandir(task.path))
+        except OSError as error:
+            with self._lock:
+                self.path_error(_path=task.path, msg=f"Error calling scandir() for path '{task.path}'", error=error)
+            return sub_dirs
+        for entry in dir_entries:
+            try:
+                with self._lock:
+                    self.path_found(entry=entry)
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError as error:
+                    with self._lock:
+                        self.path_error(_path=task.path, msg=f"Error calling is_dir() for path '{task.path}'",
+                                        error=error)
+                    continue
+                record = self._entry_record(entry, is_dir=is_dir, depth=task.payload.depth + 1)
+                if is_dir:
+                    with self._lock:
+                        self.directory_found(directory=entry)
+                    file_extension, ignore = self.should_skip_path(record)
+                    if not ignore:
+                        sub_dirs.append(DirectoryTask(path=entry.path, parent=task, payload=record))
+                    continue
+                try:
+                    with self._lock:
+                        self.file_found(file=entry)
+                    file_extension, ignore = self.should_skip_path(record)
+                    if ignore:
+                        continue
+                    entry_stat = None
+                    size = None
+                    if self.fetch_file_stat:
+                        entry_stat = record.stat()
+                        size = entry_stat.st_size
+                        task.size += size
+                    task.files_in_dir += 1
+                    self._save_path(full_path=entry.path, extension=file_extension, name=entry.name,
+                                    is_dir=False, files_in_dir=None, size=size)
+                    with self._lock:
+                        if file_extension:
+                            self.scanned_extensions_list.setdefault(file_extension, entry.path)
+                        self.file_scanned(file=entry, entry_stat=entry_stat, file_extension=file_extension)
+                except OSError as error:
+                    with self._lock:
+                        self.path_error(_path=task.path, msg=f"Error calling stat() for path '{task.path}'",
+                                        error=error)
+            except Exception as ex:
+                logger.exception(f"Error while scanning path '{entry.path}'")
+                with self._lock:
+                    self.path_error(_path=entry.path, error=ex)
+        return sub_dirs
+
+    def _complete_directory_task(self, task: DirectoryTask):
+        if task.parent is None:
+            return  # The scanned root is saved by `_scan_parallel`
+        entry: EntryRecord = task.payload
+        is_empty_dir = task.size < 1 and task.files_in_dir < 1
+        self._save_path(full_path=entry.path, extension=None, name=entry.name, is_dir=True,
+                        files_in_dir=task.files_in_dir, size=task.size)
+        with self._lock:
+            self.directory_scanned(directory=entry, is_empty=is_empty_dir, dir_total_size=task.size,
+                                   dir_total_files_nb=task.files_in_dir)
+
+
+class ShardFastCrawler(FastCrawler):
+    """
+    Reports its progress to the `ShardedCrawlCoordinator` while scanning.
+    """
+
+    PROGRESS_REPORT_FILES_COUNT = 1000
+
+    def __init__(self, shard_name: str, progress_queue, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shard_name = shard_name
+        self.progress_queue = progress_queue
+        self.scanned_size = 0
+
+    def file_scanned(self, file: os.DirEntry, entry_stat, file_extension: str):
+        super().file_scanned(file=file, entry_stat=entry_stat, file_extension=file_extension)
+        if entry_stat:
+            self.scanned_size += entry_stat.st_size
+        if self.scanned_files % self.PROGRESS_REPORT_FILES_COUNT == 0:
+            self.report_progress()
+
+    def scan_completed(self):
+        super().scan_completed()
+        self.report_progress()
+
+    def report_progress(self):
+        if self.progress_queue is not None:
+            self.progress_queue.put({'shard': self.shard_name, 'files': self.scanned_files, 'size': self.scanned_size})
 
+
+def build_filters() -> List[IFilter]:
     filters: List[IFilter] = []
     filters.append(NameFilter(excluded_names={".idea", ".Trashes", "out", ".idea_modules", "build", "dist", "lib", "venv",
                           ".pyenv", "python", "bin", "obj", "debug", ".git", "@angular", "node_modules",
@@ -298,57 +489,52 @@ def crawl():
     #filters.append(RegexPatternFilter(excluded_path_pattern="\.[0-9-]+$"))
     #filters.append(RegexPatternFilter(excluded_path_pattern=".*~$"))
     #filters.append(RegexPatternFilter(excluded_path_pattern="^~.*"))
-
-    data_manager: PathDataManager = PathDataManager()
-
-    process_start = time.time()
-    process_size = 0
-    process_nb_files = 0
-    for path, (category, min_age) in paths_to_scan.items():
-        try:
-            fc: FastCrawler = FastCrawler(base_path=base_volume, child_path=path, fetch_file_stat=True,
-                                          category=category, min_age=min_age,
-                                          filters=filters, data_manager=data_manager)
-            start = time.time()
-            fc.scan()
-            end = time.time()
-            duration = end - start
-
-            size = round(fc.total_size / 1024 / 1024 / 1024, 3)
-            process_size += size
-            process_nb_files += fc.total_files
-            logger.success(f"Total size: {size} Go - Scanned {fc.total_files} files / Skipped {fc.ignored_files} files in {duration:.2f} sec")
-
-            logger.info("\n==============")
-            logger.info("Ignored dirs:")
-            for name in sorted(fc.ignored_dirs_list)[:100]:
-                logger.info(name)
-
-            logger.info("\n==============")
-            logger.info("Ignored files:")
-            for name in sorted(fc.ignored_files_list)[:100]:
-                logger.info(name)
-
-            logger.info("\n==============")
-            logger.info("Ignored extensions:")
-            for name in sorted(fc.ignored_extensions_list)[:100]:
-                logger.info(name)
-
-            logger.info("\n==============")
-            logger.info("Scanned extensions:")
-            for name in sorted(fc.scanned_extensions_list)[:100]:
-                logger.info(name)
-
-            logger.info("\n==============")
-            logger.info("Empty directories:")
-            for name in sorted(fc.empty_dirs_list)[:100]:
-                logger.info(name)
-        except Exception as ex:
-            logger.exception(f"Unable to scan path '{path}': {ex}", ex, exc_info=True, stack_info=True)
-
-    process_end = time.time()
-    duration = process_end - process_start
-    logger.success(f"Total size: {process_size} Go - Scanned {process_nb_files} files in {duration:.2f} sec")
+    return filters
+
+
+def crawl_shard(shard: dict, progress_queue) -> dict:
+    """
+    Scan a single shard (see `ShardedCrawlCoordinator`), from its own process: filters and DB connection are not
+    shared with the other shards.
+    """
+    data_manager: PathDataManager = PathDataManager() if shard.get('save_in_db', True) else None
+    fc: ShardFastCrawler = ShardFastCrawler(base_path=shard['base_path'], child_path=shard['child_path'],
+                                            fetch_file_stat=True,
+                                            category=shard['category'], min_age=shard['min_age'],
+                                            filters=build_filters(), data_manager=data_manager,
+                                            shard_name=shard['name'], progress_queue=progress_queue)
+    fc.scan()
+    return fc.to_stats()
+
+
+def crawl(nb_processes: int = None):
+    """
+    :param nb_processes: how many paths are scanned at the same time, each one in its own process
+    (defaults to `CRAWLER_PROCESSES_COUNT`). Only worth it when the paths are located on different physical disks.
+    """
+    base_volume = '/mnt/sda1/'
+    paths_to_scan = {
+        "Applications/": (ContentCategory.APP, ContentClassificationPegi.TWELVE_OR_MORE),
+        "A trier/": (None, ContentClassificationPegi.EIGHTEEN_OR_MORE),
+    }
+    shards = [{'name': path, 'base_path': base_volume, 'child_path': path, 'category': category, 'min_age': min_age}
+              for path, (category, min_age) in paths_to_scan.items()]
+
+    coordinator = ShardedCrawlCoordinator(shards=shards, shard_runner=crawl_shard, nb_processes=nb_processes)
+    stats = coordinator.run()
+
+    size = round(stats.get('total_size', 0) / 1024 / 1024 / 1024, 3)
+    logger.success(f"Total size: {size} Go - Scanned {stats.get('total_files', 0)} files / "
+                   f"Skipped {stats.get('ignored_files', 0)} files in {stats['duration']:.2f} sec")
+    for title, key in [("Ignored dirs", 'ignored_dirs_list'), ("Ignored files", 'ignored_files_list'),
+                       ("Ignored extensions", 'ignored_extensions_list'),
+                       ("Scanned extensions", 'scanned_extensions_list'), ("Empty directories", 'empty_dirs_list')]:
+        logger.info("\n==============")
+        logger.info(f"{title}:")
+        for name in sorted(set(stats.get(key, [])))[:100]:
+            logger.info(name)
+    for errored_path, error in stats.get('errored_paths', {}).items():
+        logger.error(f"{errored_path}: {error}")
 
 if __name__ == '__main__':
     crawl()
@@ -0,0 +1,72 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+from typing import List
+
+from loguru import logger
+
+from filters.entry_record import EntryRecord
+from filters.filter import Filter
+from helpers.serializationHelper import JsonDumper
+from interfaces.iFilter import IFilter
+
+
+class AndFilter(Filter):
+    """
+    Authorizes a file only if all its filters authorize it.
+    Only files are filtered, as with `NotFilter`: the directories are authorized, so that the crawlers walk through
+    any directory (the file filters of the expression, such as `authorized_extensions`, would reject them all).
+    """
+
+    def __init__(self, filters: List[IFilter]) -> None:
+        super().__init__()
+        if not filters:
+            raise ValueError(f"The filters list is mandatory")
+        self.filters: List[IFilter] = filters
+
+    @property
+    def requires_stat(self) -> bool:
+        return any(f.requires_stat for f in self.filters)
+
+    @property
+    def cost(self) -> int:
+        return sum(f.cost for f in self.filters)
+
+    @property
+    def name_pure(self) -> bool:
+        return all(f.name_pure for f in self.filters)
+
+    def verdict_key(self, record: EntryRecord) -> tuple:
+        return record.name, record.is_dir, record.is_file
+
+    def authorize(self, record: EntryRecord) -> bool:
+        """
+        :return: whether all the filters authorize the file (always True for a directory)
+        """
+        if not record.is_file:
+            return True
+        for f in self.filters:
+            if not f.authorize(record):
+                logger.debug(f"Skipping path {record.path}: excluded by {f.__class__.__name__}")
+                return False
+        return True
+
+    def to_json(self) -> dict:
+        json_dict = super().to_json()
+        json_dict.update({
+            self.__class__.__name__: {
+                "filters": [JsonDumper.dumps(f) for f in self.filters]
+            }
+        })
+        return json_dict
+
+    def __eq__(self, o: object) -> bool:
+        if o is None or o.__class__.__name__ != AndFilter.__name__ or not isinstance(o, AndFilter):
+            return False
+        return self.filters == o.filters
+
+    def __ne__(self, o: object) -> bool:
+        return not self.__eq__(o)
+
+    def __hash__(self) -> int:
+        return hash(tuple(sorted(self.to_json())))
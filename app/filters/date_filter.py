@@ -2,18 +2,17 @@
 #  Software under GNU AGPLv3 licence
 
 import datetime
-from os import DirEntry, stat_result
-from pathlib import Path
 
 import pytz
 from loguru import logger
 
+from filters.entry_record import EntryRecord
 from filters.filter import Filter
-from interfaces.iCrawler import ICrawler
-from multipledispatch import dispatch
 
 
 class DateFilter(Filter):
+    requires_stat = True
+    cost = 25
 
     def __init__(self, attribute_filter: str = '',
                  min_date: datetime.datetime = None,
@@ -34,54 +33,29 @@ class DateFilter(Filter):
         self.min_date: datetime.datetime = min_date.replace(tzinfo=pytz.UTC) if min_date else None
         self.max_date: datetime.datetime = max_date.replace(tzinfo=pytz.UTC) if max_date else None
 
-    @dispatch(Path)
-    def authorize(self, path: Path) -> bool:
+    def authorize(self, record: EntryRecord) -> bool:
         """
-        :return:
+        Only files are filtered, so that the crawlers walk through any directory.
         """
-        if not self.can_process(path):
+        if not self.can_process(record):
             return False
-
-        date_value = None
-        lstat = path.lstat()
-        if hasattr(lstat, self.attribute_filter):
-            date_value = getattr(lstat, self.attribute_filter)
-
-        if not date_value:
-            return True
-
-        path_date = datetime.datetime.fromtimestamp(date_value / 1e9).replace(tzinfo=pytz.UTC)
-        if self.min_date and path_date < self.min_date:
-            logger.debug(f"Skipping path {path}: before allowed min date {self.min_date.isoformat()} "
-                         f"(current: {path_date.isoformat()})")
-            return False
-
-        if self.max_date and path_date > self.max_date:
-            logger.debug(f"Skipping path {path}: after allowed max date {self.max_date.isoformat()} "
-                         f"(current: {path_date.isoformat()})")
-            return False
-        return True
-
-    @dispatch(DirEntry, stat_result)
-    def authorize(self, entry: DirEntry, stat: stat_result = None):
-        if not entry:
-            return False
-        if not stat:
+        if not record.is_file:
             return True
 
-        date_value = None
-        if hasattr(stat, self.attribute_filter):
-            date_value = getattr(stat, self.attribute_filter)
+        date_value = getattr(record.stat(), self.attribute_filter, None)
         if not date_value:
             return True
-        path_date = datetime.datetime.fromtimestamp(date_value / 1e9).replace(tzinfo=pytz.UTC)
+
+        if self.attribute_filter.endswith('_ns'):
+            date_value = date_value / 1e9
+        path_date = datetime.datetime.fromtimestamp(date_value).replace(tzinfo=pytz.UTC)
         if self.min_date and path_date < self.min_date:
-            logger.debug(f"Skipping path {entry.path}: before allowed min date {self.min_date.isoformat()} "
+            logger.debug(f"Skipping path {record.path}: before allowed min date {self.min_date.isoformat()} "
                          f"(current: {path_date.isoformat()})")
             return False
 
         if self.max_date and path_date > self.max_date:
-            logger.debug(f"Skipping path {entry.path}: after allowed max date {self.max_date.isoformat()} "
+            logger.debug(f"Skipping path {record.path}: after allowed max date {self.max_date.isoformat()} "
                          f"(current: {path_date.isoformat()})")
             return False
         return True
@@ -98,10 +72,11 @@ class DateFilter(Filter):
         return json_dict
 
     def __eq__(self, o: object) -> bool:
-        if o is None or o.__class__.__name__ != DepthFilter.__name__ or not isinstance(o, DepthFilter):
+        if o is None or o.__class__.__name__ != DateFilter.__name__ or not isinstance(o, DateFilter):
             return False
-        return self.max_depth == o.max_depth \
-               and self.root_dir_path == o.root_dir_path
+        return self.attribute_filter == o.attribute_filter \
+               and self.min_date == o.min_date \
+               and self.max_date == o.max_date
 
     def __ne__(self, o: object) -> bool:
         return not self.__eq__(o)
@@ -1,51 +1,40 @@
 #  Copyright (c) 2023. Manuel LANG
 #  Software under GNU AGPLv3 licence
-from os import DirEntry, stat_result
-from pathlib import Path
 
 from loguru import logger
-from multipledispatch import dispatch
 
+from filters.entry_record import EntryRecord
 from filters.filter import Filter
-from interfaces.iCrawler import ICrawler
+from filters.filter_scope import FilterScope
 
 
 class DepthFilter(Filter):
+    scope = FilterScope.DIRECTORY
 
     def __init__(self, max_depth: int = -1, root_dir_path='/') -> None:
         super().__init__()
         self.max_depth = max_depth
         self.root_dir_path = root_dir_path
+        self._root_depth: int = EntryRecord.get_depth(root_dir_path)
 
-    @dispatch(Path)
-    def authorize(self, path: Path) -> bool:
+    def authorize(self, record: EntryRecord) -> bool:
         """
         :return:
         """
-        if not self.can_process(path):
+        if not self.can_process(record):
             return False
 
-        depth = len(path.relative_to(self.root_dir_path).parts)
-
+        depth = record.depth - self._root_depth
         if 0 < self.max_depth < depth:
-            logger.debug(f"Skipping path {path}: above max allowed depth {self.max_depth} (current: {depth})")
+            logger.debug(f"Skipping path {record.path}: above max allowed depth {self.max_depth} (current: {depth})")
             return False
         return True
 
-    @dispatch(DirEntry, stat_result)
-    def authorize(self, entry: DirEntry, stat: stat_result = None):
-        """
-        :return:
-        """
-        if not self.can_process(entry):
-            return False
-
-        relative_path = entry.path.replace(self.root_dir_path, '')
-        parts = [x for x in relative_path.split('/') if x]
-
-        depth = len(parts)
+    def authorize_children(self, record: EntryRecord) -> bool:
+        depth = record.depth - self._root_depth + 1
         if 0 < self.max_depth < depth:
-            logger.debug(f"Skipping path {entry.path}: above max allowed depth {self.max_depth} (current: {depth})")
+            logger.debug(f"Skipping the content of {record.path}: above max allowed depth {self.max_depth} "
+                         f"(current: {depth})")
             return False
         return True
 
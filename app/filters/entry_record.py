@@ -0,0 +1,89 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+import os
+from stat import S_ISDIR, S_ISREG
+
+MAX_EXTENSION_LENGTH = 12
+
+
+class EntryRecord:
+    """
+    A file system entry as seen by the filters: parsed once by the crawler, then handed to every filter.
+    The `stat` of the entry is only made when a filter asks for it (see `IFilter.requires_stat`), and cached.
+    """
+    __slots__ = ('name', 'path', 'extension', 'depth', 'is_dir', 'is_file', 'is_symlink', '_entry', '_stat', '_follow_symlinks')
+
+    def __init__(self, path: str, name: str = None, is_dir: bool = False, is_file: bool = False,
+                 is_symlink: bool = False, depth: int = None, entry: os.DirEntry = None,
+                 stat: os.stat_result = None, follow_symlinks: bool = True) -> None:
+        """
+        :param path: the full path of the entry
+        :param name: the name of the entry (defaults to the last part of the path)
+        :param depth: the number of parts of the path. The crawlers give the depth of the parent directory + 1,
+        instead of splitting every path.
+        :param entry: the `os.DirEntry` listing the entry, if any: its cached stat is reused
+        :param stat: the stat of the entry, when already known
+        :param follow_symlinks: whether the stat of a symlink is the one of its target
+        """
+        self.path: str = path
+        self.name: str = name if name is not None else os.path.basename(path)
+        self.is_dir: bool = is_dir
+        self.is_file: bool = is_file
+        self.is_symlink: bool = is_symlink
+        self.extension: str = EntryRecord.get_file_extension(self.name) if is_file else None
+        self.depth: int = depth if depth is not None else EntryRecord.get_depth(path)
+        self._entry: os.DirEntry = entry
+        self._stat: os.stat_result = stat
+        self._follow_symlinks: bool = follow_symlinks
+
+    @classmethod
+    def from_dir_entry(cls, entry: os.DirEntry, is_dir: bool, is_file: bool, depth: int = None,
+                       stat: os.stat_result = None, follow_symlinks: bool = True) -> 'EntryRecord':
+        return cls(path=entry.path, name=entry.name, is_dir=is_dir, is_file=is_file, is_symlink=entry.is_symlink(),
+                   depth=depth, entry=entry, stat=stat, follow_symlinks=follow_symlinks)
+
+    @classmethod
+    def from_path(cls, path: str) -> 'EntryRecord':
+        """
+        Build the record of a path not listed by any `os.scandir` call (i.e. the crawled roots).
+        The path is expected to be already resolved, so it is never a symlink.
+        """
+        path_stat = os.stat(path)
+        return cls(path=path, is_dir=S_ISDIR(path_stat.st_mode), is_file=S_ISREG(path_stat.st_mode),
+                   stat=path_stat)
+
+    @staticmethod
+    def get_file_extension(name: str) -> str | None:
+        """
+        :return: the lower-cased extension of a file name (without the dot), or None
+        """
+        index = name.rfind('.')
+        if index < 0:
+            return None
+        file_extension = name[index + 1:].lower()
+        if len(file_extension) > MAX_EXTENSION_LENGTH:
+            return None  # There is likely a dot in the middle of the filename, but no extension
+        return file_extension
+
+    @staticmethod
+    def get_depth(path: str) -> int:
+        return len([part for part in str(path).split(os.sep) if part])
+
+    def stat(self) -> os.stat_result:
+        """
+        :return: the stat of the entry, made on the first call only
+        """
+        if self._stat is None:
+            if self._entry is not None:
+                self._stat = self._entry.stat(follow_symlinks=self._follow_symlinks)
+            else:
+                self._stat = os.stat(self.path, follow_symlinks=self._follow_symlinks)
+        return self._stat
+
+    @property
+    def has_stat(self) -> bool:
+        return self._stat is not None
+
+    def __str__(self) -> str:
+        return self.path
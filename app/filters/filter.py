@@ -1,14 +1,11 @@
 #  Copyright (c) 2023. Manuel LANG
 #  Software under GNU AGPLv3 licence
-from os import DirEntry, stat_result
-from pathlib import Path
 
 from loguru import logger
-from multipledispatch import dispatch
 
+from filters.entry_record import EntryRecord
 from helpers.serializationHelper import JsonDumper
 from interfaces.iFilter import IFilter
-from interfaces.iCrawler import ICrawler
 
 
 class Filter(IFilter):
@@ -20,27 +17,14 @@ class Filter(IFilter):
                 hasattr(subclass, 'authorize') and
                 callable(subclass.authorize))
 
-    # @dispatch(Path)
-    # def can_process(self, path: Path) -> bool:
-    #     can_process = True if path else False
-    #     if not can_process:
-    #         logger.warning(f"Not a valid path: {path}")
-    #     return can_process
-    #
-    # @dispatch(DirEntry, stat_result)
-    def can_process(self, entry: DirEntry, stat: stat_result = None) -> bool:
-        can_process = True if entry else False
+    def can_process(self, record: EntryRecord) -> bool:
+        can_process = True if record else False
         if not can_process:
-            logger.warning(f"Not a valid entry: {entry.path}")
+            logger.warning(f"Not a valid entry: {record}")
         return can_process
 
-    @dispatch(Path)
-    def authorize(self, path: Path) -> bool:
-        return self.can_process(path)
-
-    @dispatch(DirEntry, stat_result)
-    def authorize(self, entry: DirEntry, stat: stat_result = None):
-        return self.can_process(entry)
+    def authorize(self, record: EntryRecord) -> bool:
+        return self.can_process(record)
 
     def to_json(self) -> dict:
         return {
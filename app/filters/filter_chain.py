@@ -0,0 +1,219 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+import threading
+import time
+from typing import List
+
+from loguru import logger
+
+from config import config
+from filters.entry_record import EntryRecord
+from filters.filter_scope import FilterScope
+from filters.verdict_cache import VerdictCache
+from helpers.serializationHelper import JsonDumper
+from interfaces.iFilter import IFilter
+
+MIN_CACHED_FILTER_COST = 3  # Probing the verdict cache costs about as much as a couple of set lookups
+
+
+class _FilterStats:
+    """
+    The cost and selectivity of a filter, measured on the sampled entries.
+    """
+    __slots__ = ('filter', 'nb_samples', 'nb_rejections', 'total_time_ns')
+
+    def __init__(self, _filter: IFilter) -> None:
+        self.filter: IFilter = _filter
+        self.nb_samples: int = 0
+        self.nb_rejections: int = 0
+        self.total_time_ns: int = 0
+
+    @property
+    def rejection_rate(self) -> float:
+        return self.nb_rejections / self.nb_samples if self.nb_samples else 0.0
+
+    @property
+    def average_cost_ns(self) -> float:
+        return self.total_time_ns / self.nb_samples if self.nb_samples else 0.0
+
+    @property
+    def rank(self) -> float:
+        """
+        How many entries the filter rejects per nanosecond spent: the highest rank runs first.
+        """
+        return self.rejection_rate / max(self.average_cost_ns, 1.0)
+
+    def to_json(self) -> dict:
+        return {
+            "filter": self.filter.__class__.__name__,
+            "samples": self.nb_samples,
+            "rejection_rate": round(self.rejection_rate, 4),
+            "average_cost_us": round(self.average_cost_ns / 1000, 3),
+            "rank": self.rank
+        }
+
+
+class FilterChain:
+    """
+    The filters combined with AND (as the skip filters), ordered at runtime by the number of entries they reject per
+    microsecond: cheap and selective filters (names, extensions) run before the expensive ones (regexes, stat).
+    The filters of `FilterScope.DIRECTORY` are kept apart: they are checked once per directory with
+    `authorize_children`, and their verdict applies to all the entries of the directory.
+    The verdicts of the name-pure filters (see `IFilter.name_pure`) more expensive than the cache itself are kept in
+    a `VerdictCache`.
+
+    One entry out of `sampling_rate` is checked against every filter of the chain (without short-circuit) to measure
+    their cost and rejection rate. The chain is reordered every `reorder_interval` entries. As AND is commutative,
+    the verdicts do not depend on the order.
+    """
+
+    def __init__(self, filters: List[IFilter], sampling_rate: int = None, reorder_interval: int = None,
+                 prune_directories: bool = True, verdict_cache: VerdictCache = None) -> None:
+        """
+        :param filters: the filters to be combined, in their initial order
+        :param sampling_rate: one entry out of `sampling_rate` is used to measure the filters
+        (defaults to `FILTERS_SAMPLING_RATE`). 0 disables the reordering.
+        :param reorder_interval: the number of entries checked between two reorderings
+        (defaults to `FILTERS_REORDER_INTERVAL`)
+        :param prune_directories: whether the directory-scope filters are checked once per directory. Otherwise,
+        they are checked against every entry as the other filters.
+        :param verdict_cache: the cache of the name-pure filters verdicts (a new one by default)
+        """
+        super().__init__()
+        self._directory_filters: List[IFilter] = []
+        self._stats: List[_FilterStats] = []
+        for f in filters or []:
+            if prune_directories and f.scope is FilterScope.DIRECTORY:
+                self._directory_filters.append(f)
+            else:
+                self._stats.append(_FilterStats(f))
+        self._filters: List[IFilter] = [s.filter for s in self._stats]
+        self.sampling_rate: int = config.FILTERS_SAMPLING_RATE if sampling_rate is None else sampling_rate
+        self.reorder_interval: int = config.FILTERS_REORDER_INTERVAL if reorder_interval is None else reorder_interval
+        self.nb_evaluations: int = 0
+        self.nb_reorders: int = 0
+        self._lock = threading.Lock()  # The chain may be shared by several crawling workers
+        self.verdict_cache: VerdictCache = verdict_cache if verdict_cache is not None else VerdictCache()
+        if self.verdict_cache.max_size <= 0:
+            self.verdict_cache = None
+        self._cached_filters = {id(f) for f in self._filters if f.name_pure and f.cost >= MIN_CACHED_FILTER_COST} \
+            if self.verdict_cache is not None else set()
+        if len(self._filters) < 2:
+            self.sampling_rate = 0  # Nothing to reorder
+
+    @property
+    def filters(self) -> List[IFilter]:
+        return self._filters
+
+    @property
+    def directory_filters(self) -> List[IFilter]:
+        return self._directory_filters
+
+    def __len__(self) -> int:
+        return len(self._filters) + len(self._directory_filters)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def first_rejecting(self, record: EntryRecord, is_root: bool = False) -> IFilter | None:
+        """
+        :param is_root: the entry is the root of the crawl: no parent directory has been checked for it, so the
+        directory-scope filters are checked against it as well
+        :return: the first filter rejecting the entry, or None if all the filters authorize it
+        """
+        if is_root:
+            for f in self._directory_filters:
+                if not f.authorize(record):
+                    return f
+        self.nb_evaluations += 1
+        if self.sampling_rate and self.nb_evaluations % self.sampling_rate == 0:
+            return self._sample(record)
+        for f in self._filters:
+            if not self._authorize(f, record):
+                return f
+        return None
+
+    def authorize(self, record: EntryRecord) -> bool:
+        return self.first_rejecting(record) is None
+
+    def _authorize(self, f: IFilter, record: EntryRecord) -> bool:
+        if id(f) not in self._cached_filters:
+            return f.authorize(record)
+        key = (id(f), f.verdict_key(record))
+        verdict = self.verdict_cache.get(key)
+        if verdict is None:
+            verdict = f.authorize(record)
+            self.verdict_cache.put(key, verdict)
+        return verdict
+
+    def authorize_children(self, record: EntryRecord) -> bool:
+        """
+        :return: whether the entries of the given directory are to be checked at all
+        """
+        return self.first_rejecting_children(record) is None
+
+    def first_rejecting_children(self, record: EntryRecord) -> IFilter | None:
+        """
+        :return: the first directory-scope filter rejecting all the entries of the given directory, or None if they are
+        to be checked. The entries of a pruned directory are skipped without being evaluated one filter after the other.
+        """
+        for f in self._directory_filters:
+            if not f.authorize_children(record):
+                return f
+        return None
+
+    def _sample(self, record: EntryRecord) -> IFilter | None:
+        rejecting_filter = None
+        measures = []
+        for f in self._filters:
+            start = time.perf_counter_ns()
+            authorized = self._authorize(f, record)
+            measures.append((f, time.perf_counter_ns() - start, authorized))
+            if not authorized and rejecting_filter is None:
+                rejecting_filter = f
+        with self._lock:
+            stats_by_filter = {id(s.filter): s for s in self._stats}
+            for f, duration, authorized in measures:
+                stats = stats_by_filter[id(f)]
+                stats.nb_samples += 1
+                stats.total_time_ns += duration
+                if not authorized:
+                    stats.nb_rejections += 1
+            if self.nb_evaluations >= (self.nb_reorders + 1) * self.reorder_interval:
+                self._reorder()
+        return rejecting_filter
+
+    def _reorder(self):
+        self.nb_reorders += 1
+        ordered = sorted(self._stats, key=lambda s: s.rank, reverse=True)
+        if ordered != self._stats:
+            self._stats = ordered
+            self._filters = [s.filter for s in ordered]  # Swapped at once: the workers iterate on the previous list
+            logger.debug(f"Filters reordered: {[s.filter.__class__.__name__ for s in ordered]}")
+
+    def to_stats(self) -> dict:
+        """
+        :return: the measures of each filter (in the current order of the chain), and of the verdict cache
+        """
+        with self._lock:
+            filters_stats = [s.to_json() for s in self._stats]
+        return {
+            "filters": filters_stats,
+            "verdict_cache": self.verdict_cache.to_stats() if self.verdict_cache is not None else {}
+        }
+
+    def to_json(self) -> dict:
+        stats = self.to_stats()
+        return {
+            self.__class__.__name__: {
+                "evaluations": self.nb_evaluations,
+                "reorders": self.nb_reorders,
+                "filters": stats["filters"],
+                "directory_filters": [f.__class__.__name__ for f in self._directory_filters],
+                "verdict_cache": stats["verdict_cache"]
+            }
+        }
+
+    def __str__(self) -> str:
+        return JsonDumper.dumps(self.to_json())
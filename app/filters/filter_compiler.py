@@ -0,0 +1,230 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+import re
+from typing import Dict, List, Set
+
+from loguru import logger
+
+from filters.entry_record import EntryRecord
+from filters.extension_filter import ExtensionFilter
+from filters.filter import Filter
+from filters.filter_scope import FilterScope
+from filters.path_name_ignore_filter import NameFilter
+from filters.path_pattern_filter import PatternFilter
+from filters.path_regex_pattern_filter import RegexPatternFilter
+from helpers.serializationHelper import JsonDumper
+from interfaces.iFilter import IFilter
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+class _LiteralMatcher:
+    """
+    Tells whether a string contains any of the given literals, in a single pass: with an Aho-Corasick automaton when
+    `pyahocorasick` is installed, otherwise with a regex alternation of the (escaped) literals.
+    """
+
+    def __init__(self, literals: Set[str]) -> None:
+        super().__init__()
+        self.literals: Set[str] = set(literals)
+        self._match_all: bool = '' in self.literals  # An empty literal is contained in every string
+        literals = sorted((literal for literal in self.literals if literal), key=len, reverse=True)
+        self._automaton = None
+        self._regex = None
+        if not literals or self._match_all:
+            return
+        if ahocorasick:
+            self._automaton = ahocorasick.Automaton()
+            for literal in literals:
+                self._automaton.add_word(literal, literal)
+            self._automaton.make_automaton()
+        else:
+            self._regex = re.compile('|'.join(re.escape(literal) for literal in literals))
+
+    def __bool__(self) -> bool:
+        return bool(self.literals)
+
+    def search(self, value: str) -> bool:
+        if self._match_all:
+            return True
+        if self._automaton is not None:
+            for _ in self._automaton.iter(value):
+                return True
+            return False
+        if self._regex is not None:
+            return self._regex.search(value) is not None
+        return False
+
+
+class CompiledFilter(Filter):
+    """
+    The merge of several exclusion filters (see `FilterCompiler`), checking each path in a single pass.
+    A path is authorized when none of the merged filters excludes it.
+    """
+
+    def __init__(self, excluded_path_literals: Set[str] = None, excluded_regex_literals: Set[str] = None,
+                 excluded_regex_patterns: List[re.Pattern] = None, excluded_names: Set[str] = None,
+                 excluded_extensions: Set[str] = None, nb_merged_filters: int = 0) -> None:
+        """
+        :param excluded_path_literals: substrings excluding a path (as `PatternFilter`)
+        :param excluded_regex_literals: substrings excluding a path, directories ending with '/'
+        (literal check of `RegexPatternFilter`)
+        :param excluded_regex_patterns: regexes excluding a path, directories ending with '/' (`RegexPatternFilter`)
+        :param excluded_names: names excluding a file or directory (`NameFilter`)
+        :param excluded_extensions: extensions excluding a file (`ExtensionFilter`)
+        :param nb_merged_filters: how many filters were merged into this one
+        """
+        super().__init__()
+        self._path_literals = _LiteralMatcher(excluded_path_literals or set())
+        self._regex_literals = _LiteralMatcher(excluded_regex_literals or set())
+        self._regex_patterns: List[re.Pattern] = CompiledFilter._merge_patterns(excluded_regex_patterns or [])
+        self.excluded_names: frozenset = frozenset(excluded_names or ())
+        self.excluded_extensions: frozenset = frozenset(excluded_extensions or ())
+        self.nb_merged_filters: int = nb_merged_filters
+
+    @staticmethod
+    def _merge_patterns(patterns: List[re.Pattern]) -> List[re.Pattern]:
+        """
+        Merge the regexes sharing the same flags into a single alternation. The patterns that can not be merged
+        (back-references, conflicting group names, inline flags) are kept as they are.
+        """
+        patterns_by_flags: Dict[int, List[re.Pattern]] = {}
+        for pattern in patterns:
+            patterns_by_flags.setdefault(pattern.flags, []).append(pattern)
+        merged: List[re.Pattern] = []
+        for flags, same_flags_patterns in patterns_by_flags.items():
+            if len(same_flags_patterns) == 1:
+                merged.extend(same_flags_patterns)
+                continue
+            mergeable = [p for p in same_flags_patterns if not re.search(r'\\[1-9]|\(\?P=|\(\?[aiLmsux]', p.pattern)]
+            not_mergeable = [p for p in same_flags_patterns if p not in mergeable]
+            try:
+                merged.append(re.compile('|'.join(f"(?:{p.pattern})" for p in mergeable), flags))
+            except re.error as ex:
+                logger.debug(f"Unable to merge the regex patterns, they are kept apart: {ex}")
+                not_mergeable = same_flags_patterns
+            merged.extend(not_mergeable)
+        return merged
+
+    @property
+    def name_pure(self) -> bool:
+        return not (self._path_literals or self._regex_literals or self._regex_patterns)
+
+    @property
+    def cost(self) -> int:
+        return 2 if self.name_pure else 4
+
+    def verdict_key(self, record: EntryRecord) -> tuple:
+        return record.name, record.is_dir, record.is_file  # The extension of the files only is checked
+
+    def authorize(self, record: EntryRecord) -> bool:
+        if not self.can_process(record):
+            return False
+
+        if record.name in self.excluded_names:
+            logger.debug(f"Skipping path {record.path}: excluded by name")
+            return False
+
+        if record.extension in self.excluded_extensions:
+            logger.debug(f"Skipping path {record.path}: excluded by extension")
+            return False
+
+        path = record.path
+        if self._path_literals.search(path):
+            logger.debug(f"Skipping path {path}: excluded by pattern")
+            return False
+
+        if self._regex_literals or self._regex_patterns:
+            str_path = f"{path}/" if record.is_dir else path
+            if self._regex_literals.search(str_path):
+                logger.debug(f"Skipping path {path}: excluded by regex pattern")
+                return False
+            for pattern in self._regex_patterns:
+                if pattern.search(str_path):
+                    logger.debug(f"Skipping path {path}: excluded by regex pattern {pattern.pattern}")
+                    return False
+        return True
+
+    def to_json(self) -> dict:
+        json_dict = super().to_json()
+        json_dict.update({
+            self.__class__.__name__: {
+                "nb_merged_filters": self.nb_merged_filters,
+                "excluded_path_literals": sorted(self._path_literals.literals),
+                "excluded_regex_literals": sorted(self._regex_literals.literals),
+                "excluded_regex_patterns": [p.pattern for p in self._regex_patterns],
+                "excluded_names": sorted(self.excluded_names),
+                "excluded_extensions": sorted(self.excluded_extensions),
+                "aho_corasick": ahocorasick is not None
+            }
+        })
+        return json_dict
+
+    def __eq__(self, o: object) -> bool:
+        if o is None or o.__class__.__name__ != CompiledFilter.__name__ or not isinstance(o, CompiledFilter):
+            return False
+        return self.to_json() == o.to_json()
+
+    def __ne__(self, o: object) -> bool:
+        return not self.__eq__(o)
+
+    def __hash__(self) -> int:
+        return hash(tuple(sorted(self.to_json())))
+
+    def __str__(self) -> str:
+        return JsonDumper.dumps(self.to_json())
+
+
+class FilterCompiler:
+    """
+    Merges the exclusion-only filters of a list into a single `CompiledFilter`, so that each path is checked in one
+    pass instead of once per filter:
+     - the literal substrings of `PatternFilter` and `RegexPatternFilter` go into an Aho-Corasick automaton,
+     - the `RegexPatternFilter` regexes into a single alternation,
+     - the `NameFilter` names and `ExtensionFilter` extensions into frozensets.
+    The filters authorizing paths (`authorized_*` criteria) and the other filter types are kept as they are.
+    Only filters combined with AND (a path is skipped as soon as one filter rejects it, as the skip filters) can
+    be compiled.
+    """
+
+    @staticmethod
+    def compile(filters: List[IFilter]) -> List[IFilter]:
+        """
+        :return: the compiled filter (if any filter could be merged), followed by the filters kept as they are
+        """
+        path_literals: Set[str] = set()
+        regex_literals: Set[str] = set()
+        regex_patterns: List[re.Pattern] = []
+        names: Set[str] = set()
+        extensions: Set[str] = set()
+        kept_filters: List[IFilter] = []
+        nb_merged_filters = 0
+        for f in filters or []:
+            if f.scope is not FilterScope.ENTRY:
+                kept_filters.append(f)  # Checked once per directory, there is nothing to gain
+                continue
+            if f.__class__ is PatternFilter and f.excluded_path_pattern and not f.authorized_path_pattern:
+                path_literals.add(f.excluded_path_pattern)
+            elif f.__class__ is RegexPatternFilter and f.excluded_path_pattern and not f.authorized_path_pattern:
+                regex_literals.add(f.excluded_path_pattern.pattern.replace('\\', ''))
+                if f.excluded_path_pattern not in regex_patterns:
+                    regex_patterns.append(f.excluded_path_pattern)
+            elif f.__class__ is NameFilter:
+                names.update(f.excluded_names or ())
+            elif f.__class__ is ExtensionFilter and f.excluded_extensions and not f.authorized_extensions:
+                extensions.update(f.excluded_extensions)
+            else:
+                kept_filters.append(f)
+                continue
+            nb_merged_filters += 1
+
+        if nb_merged_filters < 2:
+            return list(filters or [])  # Nothing to gain
+        compiled_filter = CompiledFilter(excluded_path_literals=path_literals, excluded_regex_literals=regex_literals,
+                                         excluded_regex_patterns=regex_patterns, excluded_names=names,
+                                         excluded_extensions=extensions, nb_merged_filters=nb_merged_filters)
+        logger.info(f"Compiled {nb_merged_filters} filters into one ({len(kept_filters)} filters kept apart)")
+        return [compiled_filter] + kept_filters
@@ -0,0 +1,107 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+from typing import Dict, List
+
+from loguru import logger
+
+from filters.and_filter import AndFilter
+from filters.entry_record import EntryRecord
+from filters.filter import Filter
+from filters.not_filter import NotFilter
+from filters.or_filter import OrFilter
+from interfaces.iFilter import IFilter
+
+
+class _MemoizedFilter(Filter):
+    """
+    A sub-expression shared by several branches of an expression: its verdict for the last checked entry is kept,
+    so that it is evaluated once per entry.
+    """
+
+    def __init__(self, _filter: IFilter) -> None:
+        super().__init__()
+        self.filter: IFilter = _filter
+        self._last_verdict: tuple = None  # (record, verdict), replaced at once as the workers may share the filter
+
+    @property
+    def requires_stat(self) -> bool:
+        return self.filter.requires_stat
+
+    @property
+    def cost(self) -> int:
+        return self.filter.cost
+
+    @property
+    def name_pure(self) -> bool:
+        return self.filter.name_pure
+
+    def verdict_key(self, record: EntryRecord) -> tuple:
+        return self.filter.verdict_key(record)
+
+    def authorize(self, record: EntryRecord) -> bool:
+        last_verdict = self._last_verdict
+        if last_verdict is not None and last_verdict[0] is record:
+            return last_verdict[1]
+        verdict = self.filter.authorize(record)
+        self._last_verdict = (record, verdict)
+        return verdict
+
+    def to_json(self) -> dict:
+        return self.filter.to_json()
+
+
+class FilterPlanner:
+    """
+    Plans the evaluation of a boolean expression of filters (`AndFilter`, `OrFilter`, `NotFilter`):
+     - nested expressions of the same kind are flattened, and duplicated operands removed,
+     - the operands are sorted by cost, so that the cheapest filters short-circuit the expensive ones,
+     - equal sub-expressions are interned (the same instance is used everywhere), and the verdict of the shared ones
+       is memoized, so that each of them is evaluated once per entry.
+    /!\\ `isinstance` can not tell the filters apart (see `IFilter.__subclasshook__`): their exact class is checked.
+    """
+
+    @staticmethod
+    def plan(expression: IFilter) -> IFilter:
+        interned: Dict[IFilter, IFilter] = {}
+        usages: Dict[int, int] = {}
+        planned = FilterPlanner._intern(expression, interned, usages)
+        nb_shared = sum(1 for count in usages.values() if count > 1)
+        if nb_shared:
+            logger.debug(f"{nb_shared} sub-expressions shared in filter {expression.__class__.__name__}")
+        return FilterPlanner._memoize(planned, usages, {})
+
+    @staticmethod
+    def _intern(expression: IFilter, interned: Dict[IFilter, IFilter], usages: Dict[int, int]) -> IFilter:
+        if expression.__class__ in (AndFilter, OrFilter):
+            operands: List[IFilter] = []
+            for operand in expression.filters:
+                operand = FilterPlanner._intern(operand, interned, usages)
+                nested = operand.filters if operand.__class__ is expression.__class__ else [operand]
+                for f in nested:
+                    if not any(f is o for o in operands):
+                        operands.append(f)
+            operands.sort(key=lambda f: f.cost)
+            expression = expression.__class__(filters=operands)
+        elif expression.__class__ is NotFilter:
+            expression = NotFilter(filter=FilterPlanner._intern(expression.filter, interned, usages))
+
+        try:
+            expression = interned.setdefault(expression, expression)
+        except TypeError:
+            pass  # Not hashable: can not be shared
+        usages[id(expression)] = usages.get(id(expression), 0) + 1
+        return expression
+
+    @staticmethod
+    def _memoize(expression: IFilter, usages: Dict[int, int], memoized: Dict[int, IFilter]) -> IFilter:
+        key = id(expression)
+        if key in memoized:
+            return memoized[key]
+        if expression.__class__ in (AndFilter, OrFilter):
+            expression.filters = [FilterPlanner._memoize(f, usages, memoized) for f in expression.filters]
+        elif expression.__class__ is NotFilter:
+            expression.filter = FilterPlanner._memoize(expression.filter, usages, memoized)
+        planned = _MemoizedFilter(expression) if usages.get(key, 0) > 1 else expression
+        memoized[key] = planned
+        return planned
@@ -0,0 +1,12 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+from enum import Enum
+
+
+class FilterScope(Enum):
+    ENTRY = 1  # Checked against every file and directory
+    DIRECTORY = 2  # Checked once per directory: its verdict is inherited by all the entries of the directory
+
+    def __str__(self):
+        return self.name
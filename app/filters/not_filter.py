@@ -0,0 +1,69 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+from loguru import logger
+
+from filters.entry_record import EntryRecord
+from filters.filter import Filter
+from helpers.serializationHelper import JsonDumper
+from interfaces.iFilter import IFilter
+
+
+class NotFilter(Filter):
+    """
+    Authorizes the files that its filter rejects, and the other way round.
+    Only files are filtered: the directories are authorized, so that the crawlers walk through any directory (most
+    filters authorize all the directories, which would otherwise all be rejected).
+    """
+
+    def __init__(self, filter: IFilter) -> None:
+        super().__init__()
+        if not filter:
+            raise ValueError(f"The filter is mandatory")
+        self.filter: IFilter = filter
+
+    @property
+    def requires_stat(self) -> bool:
+        return self.filter.requires_stat
+
+    @property
+    def cost(self) -> int:
+        return self.filter.cost
+
+    @property
+    def name_pure(self) -> bool:
+        return self.filter.name_pure
+
+    def verdict_key(self, record: EntryRecord) -> tuple:
+        return self.filter.verdict_key(record), record.is_file
+
+    def authorize(self, record: EntryRecord) -> bool:
+        """
+        :return: whether the file is rejected by the filter (always True for a directory)
+        """
+        if not record.is_file:
+            return True
+        if self.filter.authorize(record):
+            logger.debug(f"Skipping path {record.path}: authorized by {self.filter.__class__.__name__}")
+            return False
+        return True
+
+    def to_json(self) -> dict:
+        json_dict = super().to_json()
+        json_dict.update({
+            self.__class__.__name__: {
+                "filter": JsonDumper.dumps(self.filter)
+            }
+        })
+        return json_dict
+
+    def __eq__(self, o: object) -> bool:
+        if o is None or o.__class__.__name__ != NotFilter.__name__ or not isinstance(o, NotFilter):
+            return False
+        return self.filter == o.filter
+
+    def __ne__(self, o: object) -> bool:
+        return not self.__eq__(o)
+
+    def __hash__(self) -> int:
+        return hash((self.__class__.__name__, hash(self.filter), JsonDumper.dumps(self.filter)))
@@ -1,18 +1,21 @@
 #  Copyright (c) 2023. Manuel LANG
 #  Software under GNU AGPLv3 licence
 
-from pathlib import Path
 from typing import List
 
 from loguru import logger
 
+from filters.entry_record import EntryRecord
 from filters.filter import Filter
 from helpers.serializationHelper import JsonDumper
-from interfaces.iCrawler import ICrawler
 from interfaces.iFilter import IFilter
 
 
 class OrFilter(Filter):
+    """
+    Authorizes a file as soon as one of its filters authorizes it.
+    As with `AndFilter` and `NotFilter`, the directories are always authorized: only the files are filtered.
+    """
 
     def __init__(self, filters: List[IFilter]) -> None:
         super().__init__()
@@ -20,13 +23,30 @@ class OrFilter(Filter):
             raise ValueError(f"The filters list is mandatory")
         self.filters: List[IFilter] = filters
 
-    def authorize(self, path: Path) -> bool:
+    @property
+    def requires_stat(self) -> bool:
+        return any(f.requires_stat for f in self.filters)
+
+    @property
+    def cost(self) -> int:
+        return sum(f.cost for f in self.filters)
+
+    @property
+    def name_pure(self) -> bool:
+        return all(f.name_pure for f in self.filters)
+
+    def verdict_key(self, record: EntryRecord) -> tuple:
+        return record.name, record.is_dir, record.is_file
+
+    def authorize(self, record: EntryRecord) -> bool:
         """
-        :return:
+        :return: whether any of the filters authorizes the file (always True for a directory)
         """
-        if any([f.authorize(path=path) for f in self.filters]):
+        if not record.is_file:
+            return True
+        if any(f.authorize(record) for f in self.filters):
             return True
-        logger.debug(f"Skipping path {path}: excluded by all filters:\n{self.filters}")
+        logger.debug(f"Skipping path {record.path}: excluded by all filters:\n{self.filters}")
         return False
 
     def to_json(self) -> dict:
@@ -1,35 +1,22 @@
 #  Copyright (c) 2023. Manuel LANG
 #  Software under GNU AGPLv3 licence
-from os import DirEntry, stat_result
-from pathlib import Path
-from typing import List
-
-from loguru import logger
-from multipledispatch import dispatch
 
+from filters.entry_record import EntryRecord
 from filters.filter import Filter
 from helpers.serializationHelper import JsonDumper
-from interfaces.iCrawler import ICrawler
 
 
 class NameFilter(Filter):
+    name_pure = True
 
     def __init__(self, excluded_names: set[str]) -> None:
         super().__init__()
         self.excluded_names = excluded_names
 
-    # @dispatch(Path)
-    # def authorize(self, path: Path) -> bool:
-    #     if not self.can_process(path):
-    #         return False
-    #     entry_name: str = path.parts[-1]
-    #     return entry_name in self.excluded_names
-    #
-    # @dispatch(DirEntry, stat_result)
-    def authorize(self, entry: DirEntry, stat: stat_result = None):
-        if not self.can_process(entry, stat):
+    def authorize(self, record: EntryRecord) -> bool:
+        if not self.can_process(record):
             return False
-        return entry.name not in self.excluded_names
+        return record.name not in self.excluded_names
 
     def to_json(self) -> dict:
         json_dict = super().to_json()
@@ -1,17 +1,16 @@
 #  Copyright (c) 2023. Manuel LANG
 #  Software under GNU AGPLv3 licence
-from os import DirEntry, stat_result
-from pathlib import Path
 
 from loguru import logger
-from multipledispatch import dispatch
 
+from filters.entry_record import EntryRecord
 from filters.filter import Filter
+from filters.filter_scope import FilterScope
 from helpers.serializationHelper import JsonDumper
-from interfaces.iCrawler import ICrawler
 
 
 class PatternFilter(Filter):
+    cost = 2
 
     def __init__(self, authorized_path_pattern: str = '', excluded_path_pattern: str = '') -> None:
         """
@@ -23,45 +22,44 @@ class PatternFilter(Filter):
         super().__init__()
         self.authorized_path_pattern = authorized_path_pattern
         self.excluded_path_pattern = excluded_path_pattern
-    #
-    # @dispatch(Path)
-    # def authorize(self, path: Path) -> bool:
-    #     """
-    #     :return:
-    #     """
-    #     if not self.can_process(path):
-    #         return False
-    #
-    #     if self.excluded_path_pattern:
-    #         if path.match(self.excluded_path_pattern):
-    #             logger.info(f"Skipping path {path}: excluded by pattern {self.excluded_path_pattern}")
-    #             return False
-    #
-    #     if self.authorized_path_pattern:
-    #         if not path.match(self.authorized_path_pattern):
-    #             logger.info(f"Skipping path {path}: not allowed by pattern {self.authorized_path_pattern}")
-    #             return False
-    #     return True
-    #
-    # @dispatch(DirEntry, stat_result)
-    def authorize(self, entry: DirEntry, stat: stat_result = None):
+
+    def authorize(self, record: EntryRecord) -> bool:
         """
         :return:
         """
-        if not self.can_process(entry, stat):
+        if not self.can_process(record):
             return False
 
         if self.excluded_path_pattern:
-            if self.excluded_path_pattern in entry.path:
-                logger.debug(f"Skipping path {entry.path}: excluded by pattern {self.excluded_path_pattern}")
+            if self.excluded_path_pattern in record.path:
+                logger.debug(f"Skipping path {record.path}: excluded by pattern {self.excluded_path_pattern}")
                 return False
 
         if self.authorized_path_pattern:
-            if self.authorized_path_pattern not in entry.path:
-                logger.debug(f"Skipping path {entry.path}: not allowed by pattern {self.authorized_path_pattern}")
+            if self.authorized_path_pattern not in record.path:
+                logger.debug(f"Skipping path {record.path}: not allowed by pattern {self.authorized_path_pattern}")
                 return False
         return True
 
+    @property
+    def scope(self) -> FilterScope:
+        """
+        An excluded pattern ending with a separator (e.g. '/TestData/') can only match the directories part of a path:
+        checking it once per directory is enough.
+        """
+        if self.excluded_path_pattern and self.excluded_path_pattern.endswith('/') \
+                and not self.authorized_path_pattern:
+            return FilterScope.DIRECTORY
+        return FilterScope.ENTRY
+
+    def authorize_children(self, record: EntryRecord) -> bool:
+        if self.scope is not FilterScope.DIRECTORY:
+            return True
+        if self.excluded_path_pattern in f"{record.path}/":
+            logger.debug(f"Skipping the content of {record.path}: excluded by pattern {self.excluded_path_pattern}")
+            return False
+        return True
+
     def to_json(self) -> dict:
         json_dict = super().to_json()
         json_dict.update({
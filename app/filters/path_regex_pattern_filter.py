@@ -1,22 +1,19 @@
 #  Copyright (c) 2023. Manuel LANG
 #  Software under GNU AGPLv3 licence
-from os import DirEntry, stat_result
-from pathlib import Path
 
 from loguru import logger
 import re
 
-from multipledispatch import dispatch
-
+from filters.entry_record import EntryRecord
 from filters.filter import Filter
 from helpers.serializationHelper import JsonDumper
-from interfaces.iCrawler import ICrawler
 
 
 class RegexPatternFilter(Filter):
     """
     See https://docs.python.org/3/howto/regex.html for reference
     """
+    cost = 8
 
     def __init__(self, authorized_path_pattern: str = '', excluded_path_pattern: str = '', ignore_case: bool = True) -> None:
         """
@@ -33,41 +30,19 @@ class RegexPatternFilter(Filter):
         if excluded_path_pattern:
             self.excluded_path_pattern = re.compile(excluded_path_pattern, re.IGNORECASE if ignore_case else 0)
 
-    # @dispatch(Path)
-    # def authorize(self, path: Path) -> bool:
-    #     """
-    #     :return:
-    #     """
-    #     if not self.can_process(path):
-    #         return False
-    #
-    #     str_path = f"{path}/" if path.is_dir() else str(path)
-    #     if self.excluded_path_pattern:
-    #         if self.excluded_path_pattern.findall(str_path) or self.excluded_path_pattern.pattern.replace('\\', '') in str_path:
-    #             logger.info(f"Skipping path {path}: excluded by pattern {self.excluded_path_pattern}")
-    #             return False
-    #
-    #     if self.authorized_path_pattern:
-    #         if not self.authorized_path_pattern.findall(str_path) and not self.authorized_path_pattern.pattern.replace('\\', '') in str_path:
-    #             logger.info(f"Skipping path {path}: not allowed by pattern {self.authorized_path_pattern}")
-    #             return False
-    #
-    #     return True
-    #
-    # @dispatch(DirEntry, stat_result)
-    def authorize(self, entry: DirEntry, stat: stat_result = None):
-        if not entry:
+    def authorize(self, record: EntryRecord) -> bool:
+        if not record:
             return False
 
-        str_path = f"{entry.path}/" if entry.is_dir() else str(entry.path)
+        str_path = f"{record.path}/" if record.is_dir else record.path
         if self.excluded_path_pattern:
             if self.excluded_path_pattern.findall(str_path) or self.excluded_path_pattern.pattern.replace('\\', '') in str_path:
-                logger.debug(f"Skipping path {entry.path}: excluded by pattern {self.excluded_path_pattern}")
+                logger.debug(f"Skipping path {record.path}: excluded by pattern {self.excluded_path_pattern}")
                 return False
 
         if self.authorized_path_pattern:
             if not self.authorized_path_pattern.findall(str_path) and not self.authorized_path_pattern.pattern.replace('\\', '') in str_path:
-                logger.debug(f"Skipping path {entry.path}: not allowed by pattern {self.authorized_path_pattern}")
+                logger.debug(f"Skipping path {record.path}: not allowed by pattern {self.authorized_path_pattern}")
                 return False
 
         return True
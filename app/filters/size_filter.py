@@ -2,53 +2,37 @@
 #  Software under GNU AGPLv3 licence
 
 import sys
-from os import DirEntry, stat_result
-from pathlib import Path
 
 from loguru import logger
-from multipledispatch import dispatch
 
+from filters.entry_record import EntryRecord
 from filters.filter import Filter
-from interfaces.iCrawler import ICrawler
 
 from helpers.filesize_helper import format_file_size
 
 
 class SizeFilter(Filter):
+    requires_stat = True
+    cost = 20
 
     def __init__(self, min_size_in_bytes: int = 0, max_size_in_bytes: int = sys.maxsize) -> None:
         super().__init__()
         self.min_size_in_bytes = min_size_in_bytes
         self.max_size_in_bytes = max_size_in_bytes
 
-    @dispatch(Path)
-    def authorize(self, path: Path) -> bool:
+    def authorize(self, record: EntryRecord) -> bool:
         """
-        :return:
+        Only files are filtered: the size of a directory is not known until it has been walked through.
         """
-        if not self.can_process(path):
+        if not self.can_process(record):
             return False
+        if not record.is_file:
+            return True
 
-        size = path.lstat().st_size
+        size = record.stat().st_size
         authorized = self.min_size_in_bytes <= size <= self.max_size_in_bytes
         if not authorized:
-            logger.debug(f"Skipping path {path}: size is {format_file_size(size)} (min allowed: {format_file_size(self.min_size_in_bytes)}, "
-                         f"max allowed: {format_file_size(self.max_size_in_bytes)})")
-        return authorized
-
-    @dispatch(DirEntry, stat_result)
-    def authorize(self, entry: DirEntry, stat: stat_result = None):
-        """
-        :return:
-        """
-        if not self.can_process(entry):
-            return False
-        if not stat:
-            return False
-        size = stat.st_size
-        authorized = self.min_size_in_bytes <= size <= self.max_size_in_bytes
-        if not authorized:
-            logger.debug(f"Skipping path {entry.path}: size is {format_file_size(size)} (min allowed: {format_file_size(self.min_size_in_bytes)}, "
+            logger.debug(f"Skipping path {record.path}: size is {format_file_size(size)} (min allowed: {format_file_size(self.min_size_in_bytes)}, "
                          f"max allowed: {format_file_size(self.max_size_in_bytes)})")
         return authorized
 
@@ -0,0 +1,63 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+import threading
+from collections import OrderedDict
+
+from config import config
+
+
+class VerdictCache:
+    """
+    A bounded LRU cache of filter verdicts, for the filters whose verdict only depends on the name (or extension) of
+    the entries (see `IFilter.name_pure`): the same names (`@eaDir`, `node_modules`, `.git`...) and extensions repeat
+    all over a library.
+    The keys are `(<filter id>, <filter verdict key>)`, so a single cache can be shared by several filters.
+    """
+
+    def __init__(self, max_size: int = None) -> None:
+        """
+        :param max_size: the maximum number of verdicts kept (defaults to `FILTERS_VERDICT_CACHE_SIZE`)
+        """
+        super().__init__()
+        self.max_size: int = config.FILTERS_VERDICT_CACHE_SIZE if max_size is None else max_size
+        self._verdicts: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()  # The cache is shared by several crawling workers
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def get(self, key) -> bool | None:
+        """
+        :return: the cached verdict, or None if the key is unknown
+        """
+        with self._lock:
+            verdict = self._verdicts.get(key)
+            if verdict is None:
+                self.misses += 1
+                return None
+            self._verdicts.move_to_end(key)
+            self.hits += 1
+            return verdict
+
+    def put(self, key, verdict: bool):
+        with self._lock:
+            self._verdicts[key] = verdict
+            self._verdicts.move_to_end(key)
+            if len(self._verdicts) > self.max_size:
+                self._verdicts.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._verdicts)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def to_stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._verdicts)
+            }
@@ -1,8 +1,12 @@
+from filters.and_filter import AndFilter
 from filters.date_filter import DateFilter
 from filters.depth_filter import DepthFilter
 from filters.extension_filter import ExtensionFilter
 from filters.file_pattern_filter import FilePatternFilter
 from filters.filter import Filter
+from filters.filter_planner import FilterPlanner
+from filters.not_filter import NotFilter
+from filters.or_filter import OrFilter
 from filters.path_name_ignore_filter import NameFilter
 from filters.path_pattern_filter import PatternFilter
 from filters.path_regex_pattern_filter import RegexPatternFilter
@@ -13,9 +17,39 @@ class FilterFactory:
 
     @staticmethod
     def get_filter(filter_name, **args) -> Filter:
+        """
+        Build a filter from its configuration. The boolean expressions (`AndFilter`, `OrFilter`, `NotFilter`) are
+        planned by the `FilterPlanner`.
+        """
+        f = FilterFactory._build_filter(filter_name, **args)
+        if f.__class__ in (AndFilter, OrFilter, NotFilter):
+            f = FilterPlanner.plan(f)
+        return f
+
+    @staticmethod
+    def _build_operand(filter_config: dict) -> Filter:
+        """
+        :param filter_config: a single filter, as `{<filter_name>: <filter_args>}`
+        """
+        if not isinstance(filter_config, dict) or len(filter_config) != 1:
+            raise ValueError(f"A single filter is expected as {{<filter_name>: <filter_args>}}, got: {filter_config}")
+        filter_name, filter_args = next(iter(filter_config.items()))
+        f = FilterFactory._build_filter(filter_name, **(filter_args or {}))
+        if not f:
+            raise ValueError(f"Unknown filter '{filter_name}'")
+        return f
+
+    @staticmethod
+    def _build_filter(filter_name, **args) -> Filter:
         if not filter_name:
             return None
         filter_name = filter_name.lower().strip()
+        if AndFilter.__name__.lower() == filter_name:
+            return AndFilter(filters=[FilterFactory._build_operand(f) for f in args.get('filters') or []])
+        if OrFilter.__name__.lower() == filter_name:
+            return OrFilter(filters=[FilterFactory._build_operand(f) for f in args.get('filters') or []])
+        if NotFilter.__name__.lower() == filter_name:
+            return NotFilter(filter=FilterFactory._build_operand(args.get('filter')))
         if DateFilter.__name__.lower() == filter_name:
             return DateFilter(**args)
         if DepthFilter.__name__.lower() == filter_name:
@@ -32,4 +66,4 @@ class FilterFactory:
             return RegexPatternFilter(**args)
         if SizeFilter.__name__.lower() == filter_name:
             return SizeFilter(**args)
-        return None
\ No newline at end of file
+        return None
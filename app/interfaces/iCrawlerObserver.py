@@ -10,13 +10,21 @@ from crawler.events.crawlStartingEventArgs import CrawlStartingEventArgs
 from crawler.events.crawlStoppedEventArgs import CrawlStoppedEventArgs
 from crawler.events.directoryCrawledEventArgs import DirectoryCrawledEventArgs
 from crawler.events.directoryFoundEventArgs import DirectoryFoundEventArgs
+from crawler.events.directoryListingEventArgs import DirectoryListingEventArgs
 from crawler.events.fileCrawledEventArgs import FileCrawledEventArgs
 from crawler.events.fileFoundEventArgs import FileFoundEventArgs
 from crawler.events.pathFoundEventArgs import PathFoundEventArgs
 from crawler.events.pathSkippedEventArgs import PathSkippedEventArgs
 
+CRAWLER_EVENTS = frozenset({'crawl_starting', 'path_found', 'path_skipped', 'processing_file', 'processed_file',
+                            'directory_listed', 'processing_directory', 'processed_directory', 'crawl_progress',
+                            'crawl_error', 'crawl_stopped', 'crawl_completed'})
+
 
 class ICrawlerObserver(ABC):
+    # The names of the callbacks the observer is notified for (see `ObserverBus`): the crawler does not even build
+    # the events nobody subscribed to. Subscribing to `processed_file` subscribes to `directory_listed` as well.
+    subscribed_events: frozenset = CRAWLER_EVENTS
 
     @abstractmethod
     def crawl_starting(self, crawl_event: CrawlStartingEventArgs):
@@ -38,6 +46,16 @@ class ICrawlerObserver(ABC):
     def processed_file(self, crawl_event: FileCrawledEventArgs):
         pass
 
+    def directory_listed(self, crawl_event: DirectoryListingEventArgs):
+        """
+        Called with the crawled files of a directory when the crawler batches its events (see `batch_events`).
+        By default, notifies `processed_file` for each file of the listing.
+        """
+        for file_event in crawl_event.file_events():
+            self.processed_file(file_event)
+            if file_event.should_stop:
+                crawl_event.should_stop = True
+
     @abstractmethod
     def processing_directory(self, crawl_event: DirectoryFoundEventArgs):
         pass
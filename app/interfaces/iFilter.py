@@ -2,15 +2,16 @@
 #  Software under GNU AGPLv3 licence
 
 from abc import ABC, abstractmethod
-from os import DirEntry, stat_result
-from pathlib import Path
 
-from multipledispatch import dispatch
-
-from interfaces.iCrawler import ICrawler
+from filters.entry_record import EntryRecord
+from filters.filter_scope import FilterScope
 
 
 class IFilter(ABC):
+    requires_stat: bool = False  # Whether `authorize` reads `record.stat()`, so that the crawlers stat on demand only
+    scope: FilterScope = FilterScope.ENTRY  # DIRECTORY filters are checked with `authorize_children` only
+    cost: int = 1  # Estimated cost of `authorize`, relative to a set lookup: cheapest filters are checked first
+    name_pure: bool = False  # Whether the verdict only depends on `verdict_key(record)`, so that it can be cached
 
     @classmethod
     def __subclasshook__(cls, subclass):
@@ -19,22 +20,23 @@ class IFilter(ABC):
                 hasattr(subclass, 'authorize') and
                 callable(subclass.authorize))
 
-    @dispatch(Path)
-    @abstractmethod
-    def can_process(self, path: Path) -> bool:
-        pass
-
-    @dispatch(DirEntry, stat_result)
     @abstractmethod
-    def authorize(self, entry: DirEntry, stat: stat_result = None) -> bool:
+    def can_process(self, record: EntryRecord) -> bool:
         pass
 
-    @dispatch(Path)
     @abstractmethod
-    def can_process(self, path: Path) -> bool:
+    def authorize(self, record: EntryRecord) -> bool:
         pass
 
-    @dispatch(DirEntry, stat_result)
-    @abstractmethod
-    def authorize(self, entry: DirEntry, stat: stat_result = None):
-        pass
+    def authorize_children(self, record: EntryRecord) -> bool:
+        """
+        Check a directory once for all its entries, when the filter scope is `FilterScope.DIRECTORY`.
+        :return: False if none of the entries of the directory can be authorized
+        """
+        return True
+
+    def verdict_key(self, record: EntryRecord) -> tuple:
+        """
+        :return: what the verdict of a name-pure filter depends on
+        """
+        return record.name, record.is_dir
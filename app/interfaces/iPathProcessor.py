@@ -2,13 +2,22 @@
 #  Software under GNU AGPLv3 licence
 
 from abc import ABC, abstractmethod
+from typing import Dict, List
 
+from loguru import logger
+
+from crawler.events.directoryListingEventArgs import DirectoryListingEventArgs
 from crawler.events.pathEventArgs import PathEventArgs
 from models.path import PathModel
+from models.path_stage import PathStage
 from models.path_type import PathType
+from processors.processor_scope import ProcessorScope
 
 
 class IPathProcessor(ABC):
+    cpu_bound: bool = False  # Whether the processing is CPU-bound: `compute` then runs in the consumer process pool
+    path_stage: PathStage = PathStage.ATTRIBUTES_EXTRACTED  # The stage reached once processed (see `ProcessingPipeline`)
+    scope: ProcessorScope = None  # The paths the processor applies to, besides its `processor_type` (None: all of them)
 
     @classmethod
     def __subclasshook__(cls, subclass):
@@ -25,3 +34,54 @@ class IPathProcessor(ABC):
     @abstractmethod
     def process_path(self, crawl_event: PathEventArgs, path_model: PathModel):
         raise NotImplementedError()
+
+    def applies_to(self, path_model: PathModel) -> bool:
+        """
+        Checked once per path before scheduling the processor: it must stay cheap (see `ProcessorScope`).
+        """
+        if self.processor_type.name != path_model.path_type.name and self.processor_type.name != PathType.ALL.name:
+            return False
+        return self.scope is None or self.scope.applies_to(path_model)
+
+    def process_batch(self, crawl_event: DirectoryListingEventArgs, path_models: List[PathModel]) -> Dict[str, str]:
+        """
+        Process the files of a directory listing at once. Override it to amortize the per-file costs;
+        by default, the files are processed one after the other with `process_path`.
+        :param crawl_event: the listing the files come from
+        :param path_models: the models of the files to be processed (may be a subset of the listing)
+        :return: the errors raised while processing the files, as <full_path, error message>
+        """
+        errors: Dict[str, str] = {}
+        listing_indexes: Dict[str, int] = {crawl_event.full_path(i): i for i in range(len(crawl_event))}
+        for path_model in path_models:
+            try:
+                index = listing_indexes[path_model.full_path]
+                self.process_path(crawl_event=crawl_event.file_event(index, path_model=path_model),
+                                  path_model=path_model)
+            except Exception as ex:
+                errors[path_model.full_path] = str(ex)
+                logger.error(f"Unable to process {path_model.path_type} '{path_model.full_path}' "
+                             f"({self.__class__.__name__}): {ex}")
+        return errors
+
+    def build_payload(self, path_model: PathModel) -> dict:
+        """
+        :return: the compact (picklable) description of the path handed to `compute`
+        """
+        return {'path': path_model.full_path, 'size': path_model.size, 'mtime': path_model.modify_time,
+                'root': path_model.path_root}
+
+    def compute(self, payload: dict) -> dict:
+        """
+        The CPU-bound part of the processing of a path, run in a worker process for the `cpu_bound` processors:
+        it only gets the payload built by `build_payload`, and does not access the path model.
+        :return: the attributes to be set on the path model (see `apply_result`)
+        """
+        raise NotImplementedError()
+
+    def apply_result(self, path_model: PathModel, result: Dict[str, object]):
+        """
+        Merge the result of `compute` back into the path model, in the consumer process.
+        """
+        for name, value in (result or {}).items():
+            setattr(path_model, name, value)
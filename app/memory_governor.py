@@ -0,0 +1,172 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+import gc
+import threading
+import time
+import weakref
+from queue import Queue
+from typing import Callable
+
+from loguru import logger
+
+from config import config
+from helpers.filesize_helper import format_file_size
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+class MemoryGovernor:
+    """
+    Keeps the memory of the crawling process (its RSS) below a budget:
+     - above `pressure_ratio` of the budget, the memory is under pressure: the `CrawlingChannel` shrinks its capacity
+       (see `MEMORY_PRESSURE_QUEUE_SIZE`), so that the crawler is blocked until the consumer drains it,
+     - above the budget, the traversal is paused (see `wait_for_memory`) until the RSS is back under pressure level,
+       or the queues watched by the governor (see `watch`) are drained: pausing does not free anything once the
+       consumer has nothing left to process.
+    The RSS is sampled at most every `sample_interval` seconds, so that the governor can be checked for every path.
+    Without psutil, or with a budget of 0, the memory is never considered under pressure.
+    """
+
+    _shared: 'MemoryGovernor' = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, budget: int = None, pressure_ratio: float = None, sample_interval: float = None,
+                 max_pause: float = None) -> None:
+        """
+        :param budget: the RSS not to exceed, in bytes (defaults to `MEMORY_BUDGET_MB`, or `MEMORY_BUDGET_RATIO` of the
+        physical memory)
+        :param pressure_ratio: the part of the budget above which the memory is under pressure (defaults to
+        `MEMORY_PRESSURE_RATIO`)
+        :param sample_interval: the seconds between two samples of the RSS (defaults to `MEMORY_SAMPLE_INTERVAL`)
+        :param max_pause: the seconds after which a paused traversal is resumed anyway, as the RSS of a process does not
+        always decrease once its objects are released (defaults to `MEMORY_MAX_PAUSE`). It is kept below
+        `QUEUE_WAIT_TIME`, so that the consumer polls the crawling channel at least once during a pause.
+        """
+        super().__init__()
+        self._process = psutil.Process() if psutil else None
+        if budget is None:
+            budget = config.MEMORY_BUDGET_MB * 1024 * 1024
+            if not budget and psutil and config.MEMORY_BUDGET_RATIO > 0:
+                budget = int(psutil.virtual_memory().total * config.MEMORY_BUDGET_RATIO)
+        self.budget: int = budget if self._process else 0
+        self.pressure_ratio: float = pressure_ratio if pressure_ratio else config.MEMORY_PRESSURE_RATIO
+        self.pressure_level: int = int(self.budget * self.pressure_ratio)
+        self.sample_interval: float = config.MEMORY_SAMPLE_INTERVAL if sample_interval is None else sample_interval
+        self.max_pause: float = min(max_pause if max_pause else config.MEMORY_MAX_PAUSE, config.QUEUE_WAIT_TIME / 2)
+        self._lock = threading.Lock()
+        self._queues: weakref.WeakSet = weakref.WeakSet()
+        self._last_sample_time: float = 0.0
+        self.rss: int = 0
+        self.peak_rss: int = 0
+        self.nb_samples: int = 0
+        self.nb_pressure_samples: int = 0
+        self.nb_pauses: int = 0
+        self.nb_skipped_pauses: int = 0
+        self.paused_time: float = 0.0
+
+    @classmethod
+    def shared(cls) -> 'MemoryGovernor':
+        """
+        :return: the governor of the current process, shared by the crawler and the crawling channel
+        """
+        if cls._shared is None:
+            with cls._shared_lock:
+                if cls._shared is None:
+                    cls._shared = MemoryGovernor()
+        return cls._shared
+
+    @property
+    def enabled(self) -> bool:
+        return self.budget > 0
+
+    def sample(self, force: bool = False) -> int:
+        """
+        :return: the RSS of the process, sampled again if the last sample is older than `sample_interval`
+        """
+        if not self.enabled:
+            return 0
+        now = time.monotonic()
+        if not force and now - self._last_sample_time < self.sample_interval:
+            return self.rss
+        with self._lock:
+            if force or now - self._last_sample_time >= self.sample_interval:
+                self.rss = self._process.memory_info().rss
+                self._last_sample_time = now
+                self.nb_samples += 1
+                if self.rss > self.peak_rss:
+                    self.peak_rss = self.rss
+                if self.rss >= self.pressure_level:
+                    self.nb_pressure_samples += 1
+        return self.rss
+
+    @property
+    def under_pressure(self) -> bool:
+        return self.enabled and self.sample() >= self.pressure_level
+
+    @property
+    def over_budget(self) -> bool:
+        return self.enabled and self.sample() >= self.budget
+
+    def watch(self, queue: Queue):
+        """
+        Only pause the traversal while the given queue (i.e. the `CrawlingChannel`) has items to be drained.
+        """
+        self._queues.add(queue)
+
+    @property
+    def has_backlog(self) -> bool:
+        """
+        :return: whether any watched queue has items to be drained (True when no queue is watched)
+        """
+        queues = list(self._queues)
+        return not queues or any(queue.qsize() for queue in queues)
+
+    def wait_for_memory(self, should_stop: Callable[[], bool] = None) -> float:
+        """
+        Pause the calling thread while the process is over budget, until its RSS is back under pressure level.
+        :param should_stop: ends the pause when it returns True
+        :return: the seconds paused
+        """
+        if not self.over_budget:
+            return 0.0
+        if not self.has_backlog:
+            with self._lock:
+                self.nb_skipped_pauses += 1
+            return 0.0
+        start = time.perf_counter()
+        with self._lock:
+            self.nb_pauses += 1
+        logger.warning(f"Memory budget exceeded ({format_file_size(self.rss)} of {format_file_size(self.budget)}): "
+                       f"pausing the traversal...")
+        gc.collect()
+        while self.sample(force=True) >= self.pressure_level:
+            if should_stop and should_stop():
+                break
+            if not self.has_backlog:
+                break
+            if time.perf_counter() - start >= self.max_pause:
+                logger.warning(f"Memory still under pressure after {self.max_pause} sec "
+                               f"({format_file_size(self.rss)}): resuming the traversal")
+                break
+            time.sleep(max(self.sample_interval, 0.1))
+        paused = time.perf_counter() - start
+        with self._lock:
+            self.paused_time += paused
+        return paused
+
+    def to_stats(self) -> dict:
+        return {
+            "budget": self.budget,
+            "pressure_level": self.pressure_level,
+            "rss": self.rss,
+            "peak_rss": self.peak_rss,
+            "samples": self.nb_samples,
+            "pressure_samples": self.nb_pressure_samples,
+            "pauses": self.nb_pauses,
+            "skipped_pauses": self.nb_skipped_pauses,
+            "paused_time": round(self.paused_time, 3)
+        }
@@ -1,7 +1,7 @@
 #  Copyright (c) 2023. Manuel LANG
 #  Software under GNU AGPLv3 licence
 
-from pathlib import Path
+import os
 
 from helpers.serializationHelper import JsonDumper
 from models.path import PathModel
@@ -9,10 +9,11 @@ from models.path_type import PathType
 
 
 class DirectoryModel(PathModel):
-    def __init__(self, root: str, path, size: int = 0, files_in_dir: int = 0) -> None:
-        super().__init__(root, path, size, files_in_dir)
-        if isinstance(path, Path) and not path.is_dir():
-            raise ValueError(f"The given path is not a directory: '{path}'")
+    __slots__ = ()
+
+    def __init__(self, root: str, path, size: int = 0, files_in_dir: int = 0, stat: os.stat_result = None) -> None:
+        super().__init__(root, path, size, files_in_dir, stat)
+        self._path_type = PathType.DIRECTORY
 
     @property
     def path_type(self) -> PathType:
@@ -0,0 +1,32 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+from typing import NamedTuple
+
+from models.path import PathModel
+from models.path_stage import PathStage
+from models.path_type import PathType
+
+
+class KnownPath(NamedTuple):
+    """
+    The columns of a saved path needed to tell whether it changed since (see `PathDataManager.find_known_paths`),
+    without hydrating a whole `PathModel`.
+    The path table stores no modification time: the size and the hash are compared, as `PathModel.__eq__` does.
+    """
+    path_type: PathType
+    size: int | None
+    hash: str | None
+    path_stage: PathStage | None
+
+    def matches(self, path_model: PathModel) -> bool:
+        """
+        :return: whether the crawled path is the same as the saved one (nothing to process again)
+        """
+        if path_model.path_type != self.path_type:
+            return False
+        if path_model.hash and path_model.hash == self.hash:
+            return True
+        if path_model.path_type == PathType.DIRECTORY:
+            return path_model.size == self.size
+        return bool(path_model.size) and path_model.size > 0 and path_model.size == self.size
@@ -4,6 +4,7 @@
 import os
 from abc import ABC, abstractmethod
 from pathlib import Path
+from stat import S_ISDIR, S_ISREG
 from typing import Dict
 from loguru import logger
 import re
@@ -17,15 +18,37 @@ from models.rating import Rating
 from models.content import ContentClassificationPegi, ContentCategory
 
 
+_UNSET = object()  # Marks the lazy attributes which are not computed yet
+
+
 class PathModel(ABC):
+    """
+    A crawled path. Building a model does not access the file system: the path type, ownership and status are
+    computed on first use, from the `stat_result` when one is provided (see `from_dir_entry` and `from_stat`).
+    Models are kept in memory by the millions while crawling, hence the `__slots__`.
+    """
     FILE_EXTENSION_PATTERN = re.compile("[a-z0-9_]{2,12}", re.IGNORECASE)
 
+    __slots__ = ('path', '_full_path', '_stat', 'id', 'path_root', 'relative_path', 'size', 'files_in_dir',
+                 'create_time', 'modify_time', 'last_time_access', 'date_created', 'date_updated', 'reserved',
+                 'hash', 'is_windows_path', 'hidden', 'archive', 'compressed', 'encrypted', 'offline', 'readonly',
+                 'system', 'temporary', 'content_family', 'content_category', 'content_min_age', 'content_rating',
+                 'quality_rating', 'mime_type', 'path_stage', 'keywords',
+                 '_path_type', '_extension', '_name', '_owner', '_group', '_drive', '_status', '_tags')
+    _LAZY_ATTRIBUTES = frozenset(('_extension', '_name', '_owner', '_group', '_drive', '_status'))
+
     @classmethod
     def __subclasshook__(cls, subclass):
         return (hasattr(subclass, 'path_type') and
                 callable(subclass.path_type))
 
-    def __init__(self, root: str, path: str | Path, size: int = 0, files_in_dir: int = 0) -> None:
+    def __init__(self, root: str, path: str | Path, size: int = 0, files_in_dir: int = 0,
+                 stat: os.stat_result = None) -> None:
+        """
+        :param root: the root directory the path was crawled from
+        :param path: the full path
+        :param stat: the (lstat) result of the path when already known, used to compute the lazy attributes
+        """
         super().__init__()
         if not path:
             raise ValueError("The path is mandatory")
@@ -33,6 +56,7 @@ class PathModel(ABC):
             path = Path(path)
         self.path: Path = path
         self._full_path: str = str(path)
+        self._stat: os.stat_result = stat
 
         self.id: int = 0
         self.path_root: str = root
@@ -46,44 +70,24 @@ class PathModel(ABC):
         else:
             self.relative_path: str = self._full_path
 
-        self.extension: str = None
         self.size: int = size
+        self.files_in_dir: int = files_in_dir
         self.create_time = None
         self.modify_time = None
+        self.last_time_access = None
+        self.date_created = None
+        self.date_updated = None
+        self.reserved: bool = False
 
-        if self.path:
-            self.extension = self.get_extension(self.path)
-
-        self._path_type: PathType = None
-        if self.path and path.exists():
-
-            if self.path.is_file():
-                self._path_type = PathType.FILE
-            elif self.path.is_dir():
-                self._path_type = PathType.DIRECTORY
+        self._path_type: PathType = self._get_path_type_from_stat(stat)
+        self._extension: str = _UNSET
+        self._name: str = _UNSET
+        self._owner: str = _UNSET
+        self._group: str = _UNSET
+        self._drive: str = _UNSET
+        self._status: str = 'CURRENT' if stat is not None else _UNSET
+        self._tags: Dict[str, str] = None
 
-            self.name: str = path.stem
-            try:
-                self.owner: str = path.owner()
-                self.group: str = path.group()
-            except Exception as ex:
-                # logger.debug(f"Unable to get file ownership for {path}. Error: {ex}")
-                self.owner: str = None
-                self.group: str = None
-            self.root: str = path.root
-            self.drive: str = path.drive
-            self.status = 'CURRENT'
-        else:
-            self.name: str = None
-            self.owner: str = None
-            self.group: str = None
-            self.root: str = None
-            self.drive: str = None
-            self.status = 'DELETED'
-
-        self.file_name: str = None
-        if self._path_type == PathType.FILE:
-            self.file_name = f"{self.name}{self.extension}"
         self.hash: str = None
         self.is_windows_path: bool = False
         self.hidden: bool = False
@@ -102,20 +106,45 @@ class PathModel(ABC):
         self.mime_type: str = None
         self.path_stage: PathStage = PathStage.CRAWLED  # if an instance of path is created, it means it was crawled
         self.keywords: str = None
-        self._tags: Dict[str, str] = {}  # For finder tags: <Label_Name, Color_name>
-        self.files_in_dir: int = files_in_dir
+
+    @classmethod
+    def from_dir_entry(cls, root: str, entry: os.DirEntry, size: int = None, files_in_dir: int = 0):
+        """
+        Build the model from a `os.scandir()` entry: the path type comes from the directory listing, and the stat
+        is only fetched when the size is not provided.
+        """
+        stat = entry.stat(follow_symlinks=False) if size is None else None
+        path_model = cls(root=root, path=entry.path, size=stat.st_size if stat else size,
+                         files_in_dir=files_in_dir, stat=stat)
+        if path_model._path_type is None:
+            path_model._path_type = PathType.DIRECTORY if entry.is_dir(follow_symlinks=False) \
+                else PathType.FILE if entry.is_file(follow_symlinks=False) \
+                else None
+        path_model._status = 'CURRENT'
+        return path_model
+
+    @classmethod
+    def from_stat(cls, root: str, path: str | Path, stat: os.stat_result, files_in_dir: int = 0):
+        return cls(root=root, path=path, size=stat.st_size, files_in_dir=files_in_dir, stat=stat)
+
+    @staticmethod
+    def _get_path_type_from_stat(stat: os.stat_result) -> PathType | None:
+        if stat is None:
+            return None
+        if S_ISREG(stat.st_mode):
+            return PathType.FILE
+        if S_ISDIR(stat.st_mode):
+            return PathType.DIRECTORY
+        return None
 
     def get_extension(self, path: Path) -> str | None:
-        if not path or not path.is_file():
+        if not path:
             return None
         extension = None
-        parts = self._full_path.split('/')
-        parts.reverse()
-        file_name = parts[0] if parts else None
+        full_path = str(path)
+        file_name = full_path[full_path.rfind('/') + 1:]
         if file_name and '.' in file_name:
-            file_parts = file_name.split('.')
-            file_parts.reverse()
-            last_part = str(file_parts[0])
+            last_part = file_name[file_name.rfind('.') + 1:]
             if last_part:
                 word_array = re.split('[^a-zA-Z0-9_]', last_part)
                 last_part = str(word_array[0]).lower() if word_array else None
@@ -132,14 +161,107 @@ class PathModel(ABC):
                 extension = extension[0:24]
         return extension
 
+    def _get_ownership(self):
+        try:
+            import grp
+            import pwd
+            stat = self._stat if self._stat is not None else os.stat(self._full_path)
+            self._owner = pwd.getpwuid(stat.st_uid).pw_name
+            self._group = grp.getgrgid(stat.st_gid).gr_name
+        except Exception as ex:
+            # logger.debug(f"Unable to get file ownership for {path}. Error: {ex}")
+            self._owner = None if self._owner is _UNSET else self._owner
+            self._group = None if self._group is _UNSET else self._group
+
     @property
     def path_type(self) -> PathType:
+        if self._path_type is None:
+            try:
+                self._path_type = self._get_path_type_from_stat(os.stat(self._full_path))
+            except OSError:
+                pass
         if self._path_type:
             return self._path_type
         raise NotImplementedError()
 
+    @property
+    def extension(self) -> str | None:
+        if self._extension is _UNSET:
+            try:
+                is_file = self.path_type == PathType.FILE
+            except NotImplementedError:
+                is_file = False
+            self._extension = self.get_extension(self.path) if is_file else None
+        return self._extension
+
+    @extension.setter
+    def extension(self, extension: str):
+        self._extension = extension
+
+    @property
+    def name(self) -> str:
+        if self._name is _UNSET:
+            self._name = self.path.stem
+        return self._name
+
+    @name.setter
+    def name(self, name: str):
+        self._name = name
+
+    @property
+    def file_name(self) -> str | None:
+        if self.path_type == PathType.FILE:
+            return f"{self.name}{self.extension}"
+        return None
+
+    @property
+    def owner(self) -> str:
+        if self._owner is _UNSET:
+            self._get_ownership()
+        return self._owner
+
+    @owner.setter
+    def owner(self, owner: str):
+        self._owner = owner
+
+    @property
+    def group(self) -> str:
+        if self._group is _UNSET:
+            self._get_ownership()
+        return self._group
+
+    @group.setter
+    def group(self, group: str):
+        self._group = group
+
+    @property
+    def root(self) -> str:
+        return self.path.root
+
+    @property
+    def drive(self) -> str:
+        if self._drive is _UNSET:
+            self._drive = self.path.drive
+        return self._drive
+
+    @drive.setter
+    def drive(self, drive: str):
+        self._drive = drive
+
+    @property
+    def status(self) -> str:
+        if self._status is _UNSET:
+            self._status = 'CURRENT' if os.path.lexists(self._full_path) else 'DELETED'
+        return self._status
+
+    @status.setter
+    def status(self, status: str):
+        self._status = status
+
     @property
     def tags(self) -> Dict[str, str]:  # For finder tags: <Label_Name, Color_name>
+        if self._tags is None:
+            self._tags = {}
         return self._tags
 
     @property
@@ -215,14 +337,25 @@ class PathModel(ABC):
             return None
         path_type = PathType.FILE if values.get('path_type', '').lower() == 'file' else PathType.DIRECTORY
         path_model: PathModel = PathModel(root=root, path=path, size=values.get('size', 0))
-        if not path_model.path_type:
-            path_model._path_type = path_type
+        path_model._path_type = path_type
         return path_model
 
     def to_json(self):
-        props = self.__dict__.copy()
+        props = {}
+        for cls in type(self).__mro__:
+            for attr in getattr(cls, '__slots__', ()):
+                if attr in ('_stat', '_tags'):
+                    continue
+                value = getattr(self, attr, None)
+                if attr in PathModel._LAZY_ATTRIBUTES:
+                    attr = attr[1:]  # Lazy attributes are not computed for the sole purpose of serialization
+                props[attr] = None if value is _UNSET else value
         props['path_stage'] = self.path_stage.name if self.path_stage else ''
-        props['path_type'] = self.path_type.name if self.path_type else ''
+        try:
+            props['path_type'] = self.path_type.name
+        except NotImplementedError:
+            props['path_type'] = ''
+        props['_tags'] = self._tags or {}
         return props
 
     def __str__(self):
@@ -25,6 +25,8 @@ from models.path_type import PathType
 
 class EmptyDirectoryObserver(ICrawlerObserver):
 
+    subscribed_events = frozenset({'processed_directory', 'crawl_completed'})
+
     def __init__(self):
         super().__init__()
         self.empty_dirs = []
@@ -2,6 +2,7 @@
 #  Software under GNU AGPLv3 licence
 
 from collections import defaultdict, OrderedDict
+from pathlib import Path
 from typing import List, Dict
 
 from loguru import logger
@@ -14,6 +15,7 @@ from crawler.events.crawlStartingEventArgs import CrawlStartingEventArgs
 from crawler.events.crawlStoppedEventArgs import CrawlStoppedEventArgs
 from crawler.events.directoryCrawledEventArgs import DirectoryCrawledEventArgs
 from crawler.events.directoryFoundEventArgs import DirectoryFoundEventArgs
+from crawler.events.directoryListingEventArgs import DirectoryListingEventArgs
 from crawler.events.fileCrawledEventArgs import FileCrawledEventArgs
 from crawler.events.fileFoundEventArgs import FileFoundEventArgs
 from crawler.events.pathFoundEventArgs import PathFoundEventArgs
@@ -27,6 +29,9 @@ from helpers.filesize_helper import format_file_size
 
 class MetricsObserver(ICrawlerObserver):
 
+    subscribed_events = frozenset({'path_found', 'path_skipped', 'processed_file', 'directory_listed',
+                                   'processed_directory', 'crawl_stopped', 'crawl_completed'})
+
     def __init__(self) -> None:
         super().__init__()
         self._found_extensions: List[str] = []
@@ -80,6 +85,40 @@ class MetricsObserver(ICrawlerObserver):
     def skipped_files_total_size(self) -> int:
         return self._skipped_files_size
 
+    def to_stats(self) -> dict:
+        """
+        :return: the collected metrics, as plain (picklable) values, to be merged with the metrics of other crawlers
+        """
+        return {
+            'found_extensions': list(set(self._found_extensions)),
+            'crawled_extensions': list(set(self._crawled_extensions)),
+            'paths_depth': dict(self._paths_depth),
+            'paths_length': dict(self._paths_length),
+            'directories_sizes': dict(self._directories_sizes),
+            'directories_nb_files': dict(self._directories_nb_files),
+            'empty_directories': list(self._empty_directories),
+            'skipped_files_size': self._skipped_files_size,
+        }
+
+    def merge_stats(self, stats: dict):
+        """
+        Merge the metrics collected by another crawler (see `to_stats`) into this observer.
+        """
+        self._found_extensions.extend(e for e in stats.get('found_extensions', []) if e not in self._found_extensions)
+        self._crawled_extensions.extend(e for e in stats.get('crawled_extensions', [])
+                                        if e not in self._crawled_extensions)
+        for depth, paths_list in stats.get('paths_depth', {}).items():
+            self._paths_depth[depth] = (self._paths_depth.get(depth, []) + list(paths_list))[:20]
+        self._paths_depth = defaultdict(list, self.deepest_paths)
+        self._paths_length.update(stats.get('paths_length', {}))
+        self._paths_length = self.longest_paths
+        self._directories_sizes.update(stats.get('directories_sizes', {}))
+        self._directories_sizes = self.biggest_directories
+        self._directories_nb_files.update(stats.get('directories_nb_files', {}))
+        self._directories_nb_files = self.directories_most_files
+        self._empty_directories = (self._empty_directories + list(stats.get('empty_directories', [])))[:100]
+        self._skipped_files_size += stats.get('skipped_files_size', 0)
+
     def print_statistics(self):
         logger.success(f"Files extensions found ({len(self.extensions_found)}): {', '.join(self.extensions_found[:20] if len(self.extensions_found) > 20 else self.extensions_found)}")
         ext_diff = list(set(self.extensions_found) - set(self.extensions_crawled))
@@ -112,14 +151,17 @@ class MetricsObserver(ICrawlerObserver):
         logger.success("Done printing stats")
 
     def path_found(self, crawl_event: PathFoundEventArgs):
-        if crawl_event.is_file:
-            file_extension = crawl_event.path.suffix
-            if not crawl_event.path.suffix:
-                file_extension = crawl_event.path.stem
+        self._record_path(path=crawl_event.path, is_file=crawl_event.is_file)
+
+    def _record_path(self, path: Path, is_file: bool):
+        if is_file:
+            file_extension = path.suffix
+            if not path.suffix:
+                file_extension = path.stem
             if file_extension not in self._found_extensions:
                 self._found_extensions.append(str(file_extension).lower())
-        str_path = str(crawl_event.path)
-        depth = len(list(crawl_event.path.parts)) - 1  # remove first '/'
+        str_path = str(path)
+        depth = len(list(path.parts)) - 1  # remove first '/'
         paths_list = self._paths_depth.get(depth, [])
         if len(paths_list) < 20 and str_path not in paths_list:
             paths_list.append(str_path)
@@ -143,6 +185,14 @@ class MetricsObserver(ICrawlerObserver):
         if path_model and path_model.extension and path_model.extension not in self._crawled_extensions:
             self._crawled_extensions.append(path_model.extension)
 
+    def directory_listed(self, crawl_event: DirectoryListingEventArgs):
+        # The listed files are not reported by path_found
+        for index in range(len(crawl_event)):
+            path_model: PathModel = crawl_event.path_model(index)
+            self._record_path(path=path_model.path, is_file=True)
+            if path_model.extension and path_model.extension not in self._crawled_extensions:
+                self._crawled_extensions.append(path_model.extension)
+
     def processed_directory(self, crawl_event: DirectoryCrawledEventArgs):
         self._directories_sizes[crawl_event.size] = str(crawl_event.path)
         if len(self._directories_sizes.keys()) > 100:
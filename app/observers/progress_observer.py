@@ -0,0 +1,67 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+from crawler.events.crawlCompletedEventArgs import CrawlCompletedEventArgs
+from crawler.events.crawlErrorEventArgs import CrawlErrorEventArgs
+from crawler.events.crawlProgressEventArgs import CrawlProgessEventArgs
+from crawler.events.crawlStartingEventArgs import CrawlStartingEventArgs
+from crawler.events.crawlStoppedEventArgs import CrawlStoppedEventArgs
+from crawler.events.crawlerEventArgs import CrawlerEventArgs
+from crawler.events.directoryCrawledEventArgs import DirectoryCrawledEventArgs
+from crawler.events.directoryFoundEventArgs import DirectoryFoundEventArgs
+from crawler.events.fileCrawledEventArgs import FileCrawledEventArgs
+from crawler.events.fileFoundEventArgs import FileFoundEventArgs
+from crawler.events.pathFoundEventArgs import PathFoundEventArgs
+from crawler.events.pathSkippedEventArgs import PathSkippedEventArgs
+from interfaces.iCrawlerObserver import ICrawlerObserver
+
+
+class ProgressObserver(ICrawlerObserver):
+    """
+    Forwards the crawl progress of a shard to the `ShardedCrawlCoordinator`, through the given (multiprocess) queue.
+    """
+    subscribed_events = frozenset({'crawl_progress', 'crawl_stopped', 'crawl_completed'})
+
+    def __init__(self, progress_queue, shard_name: str):
+        super().__init__()
+        self.progress_queue = progress_queue
+        self.shard_name = shard_name
+
+    def _report_progress(self, crawl_event: CrawlerEventArgs):
+        crawler = crawl_event.crawler
+        self.progress_queue.put({'shard': self.shard_name,
+                                 'files': crawler.nb_files_processed,
+                                 'size': crawler.crawled_files_size})
+
+    def crawl_starting(self, crawl_event: CrawlStartingEventArgs):
+        pass
+
+    def path_found(self, crawl_event: PathFoundEventArgs):
+        pass
+
+    def path_skipped(self, crawl_event: PathSkippedEventArgs):
+        pass
+
+    def processing_file(self, crawl_event: FileFoundEventArgs):
+        pass
+
+    def processed_file(self, crawl_event: FileCrawledEventArgs):
+        pass
+
+    def processing_directory(self, crawl_event: DirectoryFoundEventArgs):
+        pass
+
+    def processed_directory(self, crawl_event: DirectoryCrawledEventArgs):
+        pass
+
+    def crawl_progress(self, crawl_event: CrawlProgessEventArgs):
+        self._report_progress(crawl_event)
+
+    def crawl_error(self, crawl_event: CrawlErrorEventArgs):
+        pass
+
+    def crawl_stopped(self, crawl_event: CrawlStoppedEventArgs):
+        self._report_progress(crawl_event)
+
+    def crawl_completed(self, crawl_event: CrawlCompletedEventArgs):
+        self._report_progress(crawl_event)
@@ -1,12 +1,8 @@
 #  Copyright (c) 2023. Manuel LANG
 #  Software under GNU AGPLv3 licence
 
-import time
-from queue import Queue
-
 from loguru import logger
 
-from config import config
 from crawler.events.crawlCompletedEventArgs import CrawlCompletedEventArgs
 from crawler.events.crawlErrorEventArgs import CrawlErrorEventArgs
 from crawler.events.crawlProgressEventArgs import CrawlProgessEventArgs
@@ -15,28 +11,32 @@ from crawler.events.crawlStoppedEventArgs import CrawlStoppedEventArgs
 from crawler.events.crawlerEventArgs import CrawlerEventArgs
 from crawler.events.directoryCrawledEventArgs import DirectoryCrawledEventArgs
 from crawler.events.directoryFoundEventArgs import DirectoryFoundEventArgs
+from crawler.events.directoryListingEventArgs import DirectoryListingEventArgs
 from crawler.events.fileCrawledEventArgs import FileCrawledEventArgs
 from crawler.events.fileFoundEventArgs import FileFoundEventArgs
 from crawler.events.pathFoundEventArgs import PathFoundEventArgs
 from crawler.events.pathSkippedEventArgs import PathSkippedEventArgs
+from crawling_channel import CrawlingChannel, ChannelClosedError
 from interfaces.iCrawlerObserver import ICrawlerObserver
 
 
 class QueueObserver(ICrawlerObserver):
 
-    def __init__(self, crawling_queue: Queue) -> None:
+    subscribed_events = frozenset({'processed_file', 'directory_listed', 'processed_directory', 'crawl_stopped',
+                                   'crawl_completed'})
+
+    def __init__(self, crawling_queue: CrawlingChannel) -> None:
         super().__init__()
         if crawling_queue is None:
             raise ValueError("Please provide a Queue")
-        self._crawling_queue: Queue = crawling_queue
+        self._crawling_queue: CrawlingChannel = crawling_queue
 
     def _put_queue_event(self, crawl_event: CrawlerEventArgs):
         try:
-            if self._crawling_queue.full():
-                while self._crawling_queue.qsize() >= config.QUEUE_MIN_SIZE:
-                    logger.info("Queue full, waiting for the files to be processed...")
-                    time.sleep(config.QUEUE_WAIT_TIME / 3)
-            self._crawling_queue.put(crawl_event)
+            self._crawling_queue.put(crawl_event)  # Blocks while the channel is saturated
+        except ChannelClosedError:
+            logger.warning(f"The consumer stopped: stopping the crawl ('{crawl_event}' not queued)")
+            crawl_event.should_stop = True
         except Exception as ex:
             logger.error(f"Error while pushing item '{crawl_event}' to queue for processing: {ex}")
             crawl_event.should_stop = True
@@ -62,6 +62,9 @@ class QueueObserver(ICrawlerObserver):
         super().processed_file(crawl_event)
         self._put_queue_event(crawl_event)
 
+    def directory_listed(self, crawl_event: DirectoryListingEventArgs):
+        self._put_queue_event(crawl_event)  # The whole listing is processed at once by the consumer
+
     def processing_directory(self, crawl_event: DirectoryFoundEventArgs):
         super().processing_directory(crawl_event)
         self._put_queue_event(crawl_event)
@@ -81,7 +84,9 @@ class QueueObserver(ICrawlerObserver):
     def crawl_stopped(self, crawl_event: CrawlStoppedEventArgs):
         super().crawl_stopped(crawl_event)
         self._put_queue_event(crawl_event)
+        self._crawling_queue.close()
 
     def crawl_completed(self, crawl_event: CrawlCompletedEventArgs):
         super().crawl_completed(crawl_event)
         self._put_queue_event(crawl_event)
+        self._crawling_queue.close()
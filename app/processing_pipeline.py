@@ -0,0 +1,265 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+import threading
+import time
+from queue import Queue
+from typing import Callable, Dict, List, Tuple
+
+from loguru import logger
+
+from compute_pool import ComputePool
+from concurrency_controller import ConcurrencyController
+from config import config
+from crawler.events.pathEventArgs import PathEventArgs
+from interfaces.iPathProcessor import IPathProcessor
+from models.path import PathModel
+from models.path_stage import PathStage
+
+_END_OF_STAGE = None  # Put once per worker into the queue of a stage to end it
+
+
+class ProcessingStage:
+    """
+    A stage of the `ProcessingPipeline`: the processors of a single `PathStage`, run by their own workers from their
+    own queue.
+    The processors of a CPU-bound stage are computed in a `ComputePool`, its workers (threads) only wait for the
+    results: the number of workers is then the number of processes.
+    The workers are started up to the current limit of the concurrency of the stage, and added as the limit grows.
+    """
+
+    def __init__(self, path_stage: PathStage, processors: List[IPathProcessor], nb_workers: int = None,
+                 cpu_bound: bool = None, max_queue_size: int = None) -> None:
+        """
+        :param path_stage: the stage the paths reach once processed by the stage processors
+        :param processors: the processors of the stage, run in the given order
+        :param nb_workers: the number of paths processed concurrently (defaults to `PIPELINE_STAGE_WORKERS_COUNT`,
+        or the number of processes of the `ComputePool` for CPU-bound stages): the initial one when the concurrency of
+        the stage is adaptive (see `ConcurrencyController`). The concurrency of CPU-bound stages is fixed.
+        :param cpu_bound: whether the stage runs in processes (defaults to whether any of its processors is
+        `cpu_bound`)
+        :param max_queue_size: the number of paths waiting for the stage above which the previous stage is blocked
+        (defaults to `PIPELINE_STAGE_QUEUE_SIZE`)
+        """
+        super().__init__()
+        if not processors:
+            raise ValueError(f"Please provide the processors of stage {path_stage}")
+        self.path_stage: PathStage = path_stage
+        self.processors: List[IPathProcessor] = processors
+        self.cpu_bound: bool = any(p.cpu_bound for p in processors) if cpu_bound is None else cpu_bound
+        self.compute_pool: ComputePool = ComputePool(processors) if self.cpu_bound else None
+        if nb_workers:
+            self.nb_workers: int = nb_workers
+        elif self.compute_pool:
+            self.nb_workers: int = self.compute_pool.nb_processes
+        else:
+            self.nb_workers: int = config.PIPELINE_STAGE_WORKERS_COUNT
+        self.concurrency: ConcurrencyController = ConcurrencyController(f"Stage {self.name}",
+                                                                        initial_limit=self.nb_workers,
+                                                                        adaptive=False if self.cpu_bound else None)
+        self.queue: Queue = Queue(maxsize=max_queue_size if max_queue_size else config.PIPELINE_STAGE_QUEUE_SIZE)
+        self._workers: List[threading.Thread] = []
+        self._workers_lock = threading.Lock()
+        self._run_worker: Callable[['ProcessingStage'], None] = None
+        self._stats_lock = threading.Lock()
+        self.nb_processed_paths: int = 0
+        self.nb_errors: int = 0
+        self.max_depth: int = 0
+        self.busy_time: float = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.path_stage.name
+
+    def start(self, run_worker: Callable[['ProcessingStage'], None]):
+        if self.compute_pool:
+            self.compute_pool.start()
+        self._run_worker = run_worker
+        self._start_workers()
+
+    def _start_workers(self):
+        """
+        Start the missing workers, up to the current limit of the concurrency of the stage.
+        """
+        with self._workers_lock:
+            while self._run_worker is not None and len(self._workers) < self.concurrency.limit:
+                worker = threading.Thread(target=self._run_worker, args=(self,),
+                                          name=f"Stage {self.name} - worker {len(self._workers)}")
+                worker.start()
+                self._workers.append(worker)
+
+    def applicable_processors(self, path_model: PathModel) -> List[IPathProcessor]:
+        return [processor for processor in self.processors if processor.applies_to(path_model)]
+
+    def put(self, crawl_event: PathEventArgs, path_model: PathModel, processors: List[IPathProcessor]):
+        self.queue.put((crawl_event, path_model, processors))
+        if len(self._workers) < self.concurrency.limit:
+            self._start_workers()  # The limit grew since
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def close(self):
+        """
+        Wait for the stage to process all the paths already queued, and end its workers.
+        """
+        with self._workers_lock:
+            self._run_worker = None  # No more workers
+            workers, self._workers = self._workers, []
+        for _ in workers:
+            self.queue.put(_END_OF_STAGE)
+        for worker in workers:
+            worker.join()
+        if self.compute_pool:
+            self.compute_pool.shutdown()
+
+    def process(self, crawl_event: PathEventArgs, path_model: PathModel,
+                processors: List[IPathProcessor]) -> Dict[str, str]:
+        """
+        Run the given processors of the stage (see `applicable_processors`).
+        :return: the errors raised by the processors, as <processor name, error message>
+        """
+        errors: Dict[str, str] = {}
+        start = self.concurrency.acquire()
+        for processor in processors:
+            try:
+                if self.compute_pool and self.compute_pool.runs(processor):
+                    self.compute_pool.process(processor, path_model)
+                else:
+                    processor.process_path(crawl_event=crawl_event, path_model=path_model)
+            except Exception as ex:
+                errors[processor.__class__.__name__] = str(ex)
+                logger.error(f"Unable to process {path_model.path_type} '{path_model.full_path}' "
+                             f"({processor.__class__.__name__}): {ex}")
+        self.concurrency.release(start, nb_bytes=path_model.size or 0)
+        with self._stats_lock:
+            self.busy_time += time.perf_counter() - start
+            self.nb_processed_paths += 1
+            if errors:
+                self.nb_errors += 1
+        return errors
+
+    def to_stats(self) -> dict:
+        return {
+            "processors": [p.__class__.__name__ for p in self.processors],
+            "workers": self.nb_workers,
+            "concurrency": self.concurrency.to_stats(),
+            "cpu_bound": self.cpu_bound,
+            "processed_paths": self.nb_processed_paths,
+            "errors": self.nb_errors,
+            "depth": self.queue.qsize(),
+            "max_depth": self.max_depth,
+            "busy_time": round(self.busy_time, 3)
+        }
+
+
+class ProcessingPipeline:
+    """
+    Processes the paths stage after stage (see `PathStage`), instead of running all the processors within one task:
+    each stage has its own queue and workers, so that the cheap stages (i.e. extracting the attributes) keep their
+    throughput while the expensive ones (hashing, text extraction) drain at their own pace.
+    Once processed by a stage, a path is saved with the stage reached, then queued into the next stage. A full queue
+    blocks the previous stage, so that the number of paths in memory stays bounded.
+    A path skips the stages having no processors applying to it (see `IPathProcessor.applies_to`).
+    """
+
+    def __init__(self, stages: List[ProcessingStage], save_path: Callable[[PathModel], None] = None) -> None:
+        """
+        :param stages: the stages, in processing order
+        :param save_path: called with the path model at the end of each stage (i.e. to persist it)
+        """
+        super().__init__()
+        if not stages:
+            raise ValueError("Please provide the stages of the pipeline")
+        self.stages: List[ProcessingStage] = stages
+        self._stage_indexes: Dict[int, int] = {id(stage): i for i, stage in enumerate(stages)}
+        self._save_path = save_path
+        self._errors_lock = threading.Lock()
+        self.errored_paths: Dict[str, str] = {}
+        self._started: bool = False
+
+    @classmethod
+    def from_processors(cls, processors: List[IPathProcessor],
+                        save_path: Callable[[PathModel], None] = None) -> 'ProcessingPipeline':
+        """
+        Build a pipeline having one stage per `PathStage` of the processors (see `IPathProcessor.path_stage`).
+        """
+        processors_by_stage: Dict[PathStage, List[IPathProcessor]] = {}
+        for processor in processors:
+            processors_by_stage.setdefault(processor.path_stage, []).append(processor)
+        stages = [ProcessingStage(path_stage=path_stage, processors=processors_by_stage[path_stage])
+                  for path_stage in sorted(processors_by_stage, key=lambda s: s.value)]
+        return cls(stages=stages, save_path=save_path)
+
+    def start(self):
+        if self._started:
+            return
+        for stage in self.stages:
+            stage.start(run_worker=self._run_worker)
+        self._started = True
+        logger.info(f"Processing pipeline started: {[f'{s.name} ({s.nb_workers})' for s in self.stages]}")
+
+    def submit(self, crawl_event: PathEventArgs, path_model: PathModel):
+        """
+        Queue the path into the first stage having processors applying to it, waiting for a free slot if the stage is
+        saturated.
+        """
+        stage, processors = self._next_stage(path_model, from_index=0)
+        if stage is None:
+            self._save(path_model)  # No processor applies: the path went through all the stages at once
+        else:
+            stage.put(crawl_event, path_model, processors)
+
+    def _next_stage(self, path_model: PathModel,
+                    from_index: int) -> Tuple[ProcessingStage | None, List[IPathProcessor] | None]:
+        """
+        Find the next stage having processors applying to the path: the stages skipped on the way are reached.
+        :return: the stage and its processors applying to the path, or None if there is no such stage
+        """
+        for stage in self.stages[from_index:]:
+            processors = stage.applicable_processors(path_model)
+            if processors:
+                return stage, processors
+            path_model.path_stage = stage.path_stage
+        return None, None
+
+    def _save(self, path_model: PathModel):
+        if self._save_path:
+            self._save_path(path_model)
+
+    def _run_worker(self, stage: ProcessingStage):
+        next_index = self._stage_indexes[id(stage)] + 1
+        while True:
+            item = stage.queue.get()
+            if item is _END_OF_STAGE:
+                return
+            crawl_event, path_model, processors = item
+            try:
+                errors = stage.process(crawl_event, path_model, processors)
+                if errors:  # The path stays at the previous stage
+                    with self._errors_lock:
+                        self.errored_paths[path_model.full_path] = str(errors)
+                    self._save(path_model)
+                    continue
+                path_model.path_stage = stage.path_stage
+                next_stage, next_processors = self._next_stage(path_model, from_index=next_index)
+                self._save(path_model)  # With the stages skipped before the next one
+                if next_stage is not None:
+                    next_stage.put(crawl_event, path_model, next_processors)
+            except Exception as ex:
+                with self._errors_lock:
+                    self.errored_paths[path_model.full_path] = str(ex)
+                logger.error(f"Error while processing path '{path_model.full_path}' at stage {stage.name}: {ex}")
+
+    def close(self):
+        """
+        Wait for all the submitted paths to go through the pipeline, and end the workers of all the stages.
+        """
+        if not self._started:
+            return
+        for stage in self.stages:  # In order: a stage does not get any path once the previous one is closed
+            stage.close()
+        self._started = False
+
+    def to_stats(self) -> dict:
+        return {stage.name: stage.to_stats() for stage in self.stages}
@@ -1,23 +1,47 @@
 #  Copyright (c) 2023. Manuel LANG
 #  Software under GNU AGPLv3 licence
 
-from typing import Dict
+import hashlib
+from typing import Dict, List
 
+import xxhash
 from loguru import logger
 
 from crawler.events.fileCrawledEventArgs import FileCrawledEventArgs
 from interfaces.iPathProcessor import IPathProcessor
 from models.path import PathModel
+from models.path_stage import PathStage
 from models.path_type import PathType
 
 BUF_SIZE = 64 * 1024 * 100  # lets read stuff in 6,4 Mb chunks!
 
 
+def new_hasher(name: str):
+    """
+    :param name: the name of any `hashlib` algorithm (i.e. 'sha256', 'md5') or `xxhash` one (i.e. 'xxh3_64')
+    :return: a new hasher of the given algorithm
+    """
+    name = name.lower()
+    if name in hashlib.algorithms_available:
+        return hashlib.new(name)
+    if name.startswith('xxh') and hasattr(xxhash, name):
+        return getattr(xxhash, name)()
+    raise ValueError(f"Hash algorithm not supported: {name}")
+
+
 class HashFileProcessor(IPathProcessor):
+    cpu_bound = True
+    path_stage = PathStage.HASH_COMPUTED
 
-    def __init__(self, hash_algorithms: Dict[str, object]) -> None:
+    def __init__(self, hash_algorithms: List[str]) -> None:
+        """
+        :param hash_algorithms: the names of the hash algorithms (see `new_hasher`). New hashers are created for
+        every file, so that the processor holds no state and can be run from a worker process.
+        """
         super().__init__()
-        self._hash_algorithms: Dict[str, object] = hash_algorithms
+        self._hash_algorithms: List[str] = list(hash_algorithms)
+        for name in self._hash_algorithms:
+            new_hasher(name)  # Fail fast on unsupported algorithms
 
     @property
     def processor_type(self) -> PathType:
@@ -26,26 +50,28 @@ class HashFileProcessor(IPathProcessor):
     def process_path(self, crawl_event: FileCrawledEventArgs, path_model: PathModel):
         logger.debug(f"Hashing file: {path_model}")
         try:
-            self._hash_digest(crawl_event=crawl_event, path_model=path_model)
+            self.apply_result(path_model=path_model, result=self.compute(self.build_payload(path_model)))
             logger.debug(f"Done hashing file {path_model.full_path}")
         except Exception as ex:
             logger.error(f"Unable to hash file '{path_model.full_path}': {ex}")
             raise ex
 
-    def _hash_digest(self, crawl_event: FileCrawledEventArgs, path_model: PathModel):
-        with open(path_model.full_path, 'rb') as f:
+    def compute(self, payload: dict) -> Dict[str, str]:
+        hashers = {name: new_hasher(name) for name in self._hash_algorithms}
+        with open(payload['path'], 'rb') as f:
             while True:
                 data = f.read(BUF_SIZE)
                 if not data:
                     break
-                for name, hash_algo in self._hash_algorithms.items():
-                    hash_algo.update(data)
-        for name, hash_algo in self._hash_algorithms.items():
-            if len(self._hash_algorithms.keys()) == 1:
-                path_model.hash = hash_algo.hexdigest()
+                for hasher in hashers.values():
+                    hasher.update(data)
+        if len(hashers) == 1:
+            return {'hash': next(iter(hashers.values())).hexdigest()}
+        return {f"hash_{name.lower()}": hasher.hexdigest() for name, hasher in hashers.items()}
+
+    def apply_result(self, path_model: PathModel, result: Dict[str, str]):
+        for property_name, digest in result.items():
+            if hasattr(path_model, property_name):
+                setattr(path_model, property_name, digest)
             else:
-                property_name = f"hash_{name.lower()}"
-                if hasattr(path_model, property_name):
-                    setattr(path_model, property_name, hash_algo.hexdigest())
-                else:
-                    logger.error(f"Hash algorithm not supported: {name}")
+                logger.error(f"Hash algorithm not supported: {property_name}")
@@ -23,12 +23,16 @@ from crawler.events.fileCrawledEventArgs import FileCrawledEventArgs
 from interfaces.iPathProcessor import IPathProcessor
 from models.path import PathModel
 from models.path_type import PathType
+from processors.processor_scope import ProcessorScope
 
 
 class KeywordsFileProcessor(IPathProcessor):
     def __init__(self, use_parent_dirs_as_keywords: bool = False) -> None:
         self.use_parent_dirs_as_keywords = use_parent_dirs_as_keywords
         super().__init__()
+        if not use_parent_dirs_as_keywords:
+            # The keywords are separated by ', ' once the dots and underscores are replaced (see `split_words`)
+            self.scope = ProcessorScope(name_contains=('.', '_', ', '))
 
     @property
     def processor_type(self) -> PathType:
@@ -7,11 +7,14 @@ from crawler.events.fileCrawledEventArgs import FileCrawledEventArgs
 from interfaces.iPathProcessor import IPathProcessor
 from models.path import PathModel
 from models.path_type import PathType
+from processors.processor_scope import ProcessorScope
 
 from models.rating import Rating
 
 
 class RatingFileProcessor(IPathProcessor):
+    scope = ProcessorScope(path_contains=('+',))  # The rating is the number of '+' in the name or the parent dirs
+
     def __init__(self) -> None:
         super().__init__()
 
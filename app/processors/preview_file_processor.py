@@ -10,11 +10,16 @@ from thumbnail import generate_thumbnail
 
 from crawler.events.fileCrawledEventArgs import FileCrawledEventArgs
 from interfaces.iPathProcessor import IPathProcessor
+from models.content import ContentFamily
 from models.path import PathModel
+from models.path_stage import PathStage
 from models.path_type import PathType
+from processors.processor_scope import ProcessorScope
 
 
 class PreviewFileProcessor(IPathProcessor):
+    path_stage = PathStage.THUMBNAIL_GENERATED
+    scope = ProcessorScope(content_families=(ContentFamily.VIDEO,))  # The thumbnails are extracted with ffmpeg
 
     def __init__(self, out_thumb_directory: Path) -> None:
         super().__init__()
@@ -0,0 +1,99 @@
+#  Copyright (c) 2023. Manuel LANG
+#  Software under GNU AGPLv3 licence
+
+import mimetypes
+from typing import Iterable
+
+from models.content import ContentFamily
+from models.path import PathModel
+from models.path_stage import PathStage
+
+
+class ProcessorScope:
+    """
+    The paths a processor applies to (see `IPathProcessor.scope`), declared with cheap criteria only: the consumer
+    checks it once per path, before scheduling the processor, so that it must not access the file itself.
+    Every given criterion must be met; the criteria left empty do not restrict the scope.
+    The content family of a path not extracted yet is guessed from its extension: a path whose family can not be
+    guessed is not excluded by the family criteria.
+    """
+
+    def __init__(self, extensions: Iterable[str] = None, excluded_extensions: Iterable[str] = None,
+                 content_families: Iterable[ContentFamily] = None,
+                 excluded_content_families: Iterable[ContentFamily] = None,
+                 min_size: int = 0, max_size: int = None, path_stages: Iterable[PathStage] = None,
+                 name_contains: Iterable[str] = None, path_contains: Iterable[str] = None) -> None:
+        """
+        :param extensions: the extensions of the files processed (as '.ext', case-insensitive)
+        :param excluded_extensions: the extensions of the files never processed
+        :param content_families: the content families processed
+        :param excluded_content_families: the content families never processed
+        :param min_size: the minimal size of the files processed, in bytes
+        :param max_size: the maximal size (excluded) of the files processed, in bytes
+        :param path_stages: the stages the paths must have reached to be processed
+        :param name_contains: the processed paths have at least one of these strings in their name
+        :param path_contains: the processed paths have at least one of these strings in their full path
+        """
+        super().__init__()
+        self.extensions: frozenset = ProcessorScope._normalize_extensions(extensions)
+        self.excluded_extensions: frozenset = ProcessorScope._normalize_extensions(excluded_extensions)
+        self.content_families: frozenset = frozenset(content_families or ())
+        self.excluded_content_families: frozenset = frozenset(excluded_content_families or ())
+        self.min_size: int = min_size or 0
+        self.max_size: int = max_size
+        self.path_stages: frozenset = frozenset(path_stages or ())
+        self.name_contains: tuple = tuple(name_contains or ())
+        self.path_contains: tuple = tuple(path_contains or ())
+
+    @staticmethod
+    def _normalize_extensions(extensions: Iterable[str]) -> frozenset:
+        return frozenset(e.lower() if e.startswith('.') else f".{e.lower()}" for e in extensions or ())
+
+    @staticmethod
+    def guess_content_family(path_model: PathModel) -> ContentFamily | None:
+        if path_model.content_family:
+            return path_model.content_family
+        if path_model.mime_type:
+            return PathModel.get_content_family_from_mime_type(mime_type=path_model.mime_type)
+        if not path_model.extension:
+            return None
+        mime_type, _ = mimetypes.guess_type(f"file{path_model.extension}", strict=False)
+        return PathModel.get_content_family_from_mime_type(mime_type=mime_type)
+
+    def applies_to(self, path_model: PathModel) -> bool:
+        if self.extensions or self.excluded_extensions:
+            extension = (path_model.extension or '').lower()
+            if self.extensions and extension not in self.extensions:
+                return False
+            if extension in self.excluded_extensions:
+                return False
+        if path_model.size < self.min_size or (self.max_size is not None and path_model.size >= self.max_size):
+            return False
+        if self.path_stages and path_model.path_stage not in self.path_stages:
+            return False
+        if self.name_contains and not any(s in path_model.name for s in self.name_contains):
+            return False
+        if self.path_contains and not any(s in path_model.full_path for s in self.path_contains):
+            return False
+        if self.content_families or self.excluded_content_families:
+            content_family = ProcessorScope.guess_content_family(path_model)
+            if content_family is not None:
+                if self.content_families and content_family not in self.content_families:
+                    return False
+                if content_family in self.excluded_content_families:
+                    return False
+        return True
+
+    def to_json(self) -> dict:
+        json_dict = {
+            "extensions": sorted(self.extensions),
+            "excluded_extensions": sorted(self.excluded_extensions),
+            "content_families": sorted(str(f) for f in self.content_families),
+            "excluded_content_families": sorted(str(f) for f in self.excluded_content_families),
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "path_stages": sorted(str(s) for s in self.path_stages),
+            "name_contains": list(self.name_contains),
+            "path_contains": list(self.path_contains)
+        }
+        return {name: value for name, value in json_dict.items() if value}
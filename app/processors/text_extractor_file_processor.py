@@ -11,13 +11,17 @@ from crawler.events.fileCrawledEventArgs import FileCrawledEventArgs
 from interfaces.iPathProcessor import IPathProcessor
 from models.content import ContentFamily
 from models.path import PathModel
+from models.path_stage import PathStage
 from models.path_type import PathType
+from processors.processor_scope import ProcessorScope
 from processors.metadata_extractor.text_extractor.itext_extractor import ITextExtractor
 from processors.metadata_extractor.text_extractor.pdf_text_extractor import PdfTextHandler
 from processors.metadata_extractor.text_extractor.picture_text_extractor import PictureTextExtractor
 
 
 class TextExtractorFileProcessor(IPathProcessor):
+    cpu_bound = True
+    path_stage = PathStage.TEXT_EXTRACTED
 
     def __init__(self, out_text_directory: Path) -> None:
         super().__init__()
@@ -25,31 +29,42 @@ class TextExtractorFileProcessor(IPathProcessor):
             raise ValueError(f"The given path is not a valid directory: '{out_text_directory}'")
         self.out_text_directory = out_text_directory
         self.max_size: int = 10 * 1024 * 1024
+        self.scope = ProcessorScope(max_size=self.max_size, excluded_content_families=(ContentFamily.VIDEO,))
 
     @property
     def processor_type(self) -> PathType:
         return PathType.FILE
 
     def process_path(self, crawl_event: FileCrawledEventArgs, path_model: PathModel):
-        logger.debug(f"Extracting file's text: {path_model}")
+        self.apply_result(path_model=path_model, result=self.compute(self.build_payload(path_model)))
+
+    def build_payload(self, path_model: PathModel) -> dict:
+        payload = super().build_payload(path_model)
+        payload.update({'extension': path_model.extension, 'content_family': path_model.content_family,
+                        'hash': path_model.hash})
+        return payload
+
+    def compute(self, payload: dict) -> dict:
+        logger.debug(f"Extracting file's text: {payload['path']}")
         text: str = ''
         try:
-            if crawl_event.size < self.max_size:
-                text = textract.process(crawl_event.path)
+            if payload['size'] < self.max_size:
+                text = textract.process(payload['path'])
         except Exception as ex:
             try:
                 text_extractor: ITextExtractor = None
-                if path_model.content_family == ContentFamily.PICTURE:
+                if payload['content_family'] == ContentFamily.PICTURE:
                     text_extractor = PictureTextExtractor()
-                elif path_model.extension == 'pdf':
+                elif payload['extension'] == 'pdf':
                     text_extractor = PdfTextHandler()
 
-                text = text_extractor.extract_text(crawl_event.path)
+                text = text_extractor.extract_text(Path(payload['path']))
             except Exception as ex2:
-                logger.error(f"Unable to extract text from file '{path_model.full_path}': {ex}")
+                logger.error(f"Unable to extract text from file '{payload['path']}': {ex}")
                 raise ex2
 
         if text:
-            text_output_path = os.path.join(self.out_text_directory, f"{path_model.hash_md5}.txt")
+            text_output_path = os.path.join(self.out_text_directory, f"{payload['hash']}.txt")
             with open(text_output_path, 'w') as f:
                 f.write(text)
+        return {}  # The text is saved in its own file